@@ -0,0 +1,89 @@
+"""
+Compares put/get/list throughput of the summary cache backends, on synthetic entries
+
+    python3 benchmarks/backends.py -n 5000 --html-size 20000
+"""
+
+import time
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, List
+
+import click
+
+from url_cache.model import Summary
+from url_cache.summary_cache import SummaryCache, SummaryDirCache
+from url_cache.sqlite_cache import SummarySQLiteCache
+from url_cache.segment_cache import SummarySegmentCache
+
+
+def _backends(base: Path) -> List[SummaryCache]:
+    return [
+        SummaryDirCache(base / "dir"),
+        SummaryDirCache(base / "dir_index", index_path=base / "index.sqlite"),
+        SummarySQLiteCache(base / "cache.sqlite"),
+        SummarySegmentCache(base / "segments"),
+    ]
+
+
+def _name(cache: SummaryCache) -> str:
+    if isinstance(cache, SummaryDirCache):
+        return "dir+index" if cache.dir_cache.index is not None else "dir"
+    if isinstance(cache, SummarySegmentCache):
+        return "segments"
+    return "sqlite"
+
+
+def _timed(func: Callable[[], None]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("-n", "--count", type=int, default=2000, help="Number of entries")
+@click.option("--html-size", type=int, default=20000, help="Size of each html_summary")
+def main(count: int, html_size: int) -> None:
+    urls = [f"https://example.com/page/{i}" for i in range(count)]
+    html = ("<p>" + "x" * 70 + "</p>\n") * (html_size // 78 + 1)
+    now = datetime.now()
+
+    click.echo(f"{'backend':<10} {'put/s':>10} {'get/s':>10} {'miss/s':>10} {'list/s':>10}")
+    with tempfile.TemporaryDirectory() as d:
+        for cache in _backends(Path(d)):
+
+            def _put() -> None:
+                for url in urls:
+                    cache.put(
+                        url,
+                        Summary(
+                            url=url,
+                            metadata={"title": url},
+                            html_summary=html,
+                            timestamp=now,
+                        ),
+                    )
+
+            def _get() -> None:
+                for url in urls:
+                    assert cache.get(url) is not None
+
+            def _miss() -> None:
+                for url in urls:
+                    assert cache.get(url + "/missing") is None
+
+            def _list() -> None:
+                assert len(list(cache.urls())) == count
+
+            put_t, get_t, miss_t, list_t = (
+                _timed(f) for f in (_put, _get, _miss, _list)
+            )
+            click.echo(
+                f"{_name(cache):<10} {count / put_t:>10.0f} {count / get_t:>10.0f} "
+                f"{count / miss_t:>10.0f} {count / list_t:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
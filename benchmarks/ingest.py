@@ -0,0 +1,62 @@
+"""
+Measures how put throughput into one shared directory cache scales with the
+number of writer processes
+
+    python3 benchmarks/ingest.py -n 4000 -p 1 -p 2 -p 4 -p 8
+"""
+
+import time
+import tempfile
+import multiprocessing
+from pathlib import Path
+from datetime import datetime
+from typing import List, Sequence
+
+import click
+
+from url_cache.model import Summary
+from url_cache.summary_cache import SummaryDirCache
+
+
+def _ingest(data_dir: str, urls: List[str], html: str) -> None:
+    cache = SummaryDirCache(Path(data_dir))
+    now = datetime.now()
+    for url in urls:
+        cache.put(
+            url, Summary(url=url, metadata={"title": url}, html_summary=html, timestamp=now)
+        )
+
+
+@click.command()
+@click.option("-n", "--count", type=int, default=4000, help="Number of entries")
+@click.option("--html-size", type=int, default=5000, help="Size of each html_summary")
+@click.option(
+    "-p", "--processes", type=int, multiple=True, default=[1, 2, 4, 8], help="Writer processes"
+)
+def main(count: int, html_size: int, processes: Sequence[int]) -> None:
+    urls = [f"https://example.com/page/{i}" for i in range(count)]
+    html = "x" * html_size
+
+    click.echo(f"{'processes':<10} {'put/s':>10} {'speedup':>10}")
+    base_rate = None
+    for n in processes:
+        with tempfile.TemporaryDirectory() as d:
+            procs = [
+                multiprocessing.Process(target=_ingest, args=(d, urls[i::n], html))
+                for i in range(n)
+            ]
+            start = time.perf_counter()
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join()
+            rate = count / (time.perf_counter() - start)
+            assert all(p.exitcode == 0 for p in procs)
+            assert len(SummaryDirCache(Path(d)).keyfiles()) == count
+        if base_rate is None:
+            base_rate = rate
+        click.echo(f"{n:<10} {rate:>10.0f} {rate / base_rate:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Counts the file system calls (stat, scandir, open, ...) and time for each
+cache hit in the directory cache, comparing reading an entry with the
+filename -> parser table to the previous rglob + FileParser.matches scan
+
+    python3 benchmarks/reads.py -n 500
+
+For the exact system calls, run it under 'strace -c -f' instead
+"""
+
+import io
+import os
+import time
+import builtins
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List
+from contextlib import contextmanager
+
+import click
+
+from url_cache.model import Summary
+from url_cache.summary_cache import SummaryDirCache, IGNORE_FILES
+
+COUNTED = [
+    (os, "stat"),
+    (os, "lstat"),
+    (os, "scandir"),
+    (os, "listdir"),
+    (os, "open"),
+    (io, "open"),
+    (builtins, "open"),
+]
+
+
+@contextmanager
+def _counting(calls: Counter) -> Iterator[None]:  # type: ignore[type-arg]
+    """Counts calls to the os/io functions in COUNTED while active"""
+    originals = [(mod, name, getattr(mod, name)) for mod, name in COUNTED]
+
+    def _wrap(name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        def _counted(*args: Any, **kwargs: Any) -> Any:
+            calls[name] += 1
+            return func(*args, **kwargs)
+
+        return _counted
+
+    for mod, name, func in originals:
+        # io.open and builtins.open are the same function
+        setattr(mod, name, _wrap("open" if name == "open" else name, func))
+    try:
+        yield
+    finally:
+        for mod, name, func in originals:
+            setattr(mod, name, func)
+
+
+def _rglob_scan(cache: SummaryDirCache, keydir: Path) -> Dict[str, Any]:
+    """How SummaryDirCache.scan_directory read entries previously"""
+    res = {}
+    for target in keydir.rglob("*"):
+        if target.name in IGNORE_FILES or target.name.startswith("."):
+            continue
+        if not target.is_file():
+            continue
+        name, data = cache.parse_file(target)
+        res[name] = data
+    return res
+
+
+@click.command()
+@click.option("-n", "--count", type=int, default=500, help="Number of entries")
+def main(count: int) -> None:
+    urls = [f"https://example.com/page/{i}" for i in range(count)]
+    now = datetime.now()
+    with tempfile.TemporaryDirectory() as d:
+        cache = SummaryDirCache(Path(d))
+        for url in urls:
+            cache.put(
+                url,
+                Summary(
+                    url=url,
+                    metadata={"title": url},
+                    html_summary="<p>text</p>",
+                    timestamp=now,
+                    status={"status_code": 200},
+                ),
+            )
+
+        reads: List[Callable[[Path], Dict[str, Any]]] = [
+            lambda keydir: _rglob_scan(cache, keydir),
+            cache.scan_directory,
+        ]
+        click.echo(f"{'read':<10} {'calls/hit':>10} {'hits/s':>10}  calls")
+        for label, read in zip(("rglob", "table"), reads):
+            calls: Counter = Counter()  # type: ignore[type-arg]
+            with _counting(calls):
+                start = time.perf_counter()
+                for url in urls:
+                    keydir = Path(cache.dir_cache.get(url))
+                    assert len(read(keydir)) > 0
+                took = time.perf_counter() - start
+            per_hit = ", ".join(
+                f"{name}={n / count:g}" for name, n in sorted(calls.items())
+            )
+            click.echo(
+                f"{label:<10} {sum(calls.values()) / count:>10g} {count / took:>10.0f}  {per_hit}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Times each summarizer in url_cache.html_utils.SUMMARIZERS over a corpus of HTML files
+
+By default, uses the html_summary files saved in the url_cache data directory
+(which are whole documents if summarize_html was disabled), else pass files/directories:
+
+    python3 benchmarks/summarizers.py ~/Downloads/pages/ page.html
+"""
+
+import time
+import statistics
+from pathlib import Path
+from typing import List, Tuple
+
+import click
+from appdirs import user_data_dir  # type: ignore[import]
+
+from url_cache.html_utils import SUMMARIZERS, get_summarizer
+
+
+def _corpus(paths: Tuple[str, ...]) -> List[Path]:
+    if not paths:
+        paths = (str(Path(user_data_dir("url_cache")) / "data"),)
+    files: List[Path] = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            files.extend(sorted(p.rglob("*.html")))
+        elif p.exists():
+            files.append(p)
+    return files
+
+
+@click.command()
+@click.option("-n", "--repeat", type=int, default=3, help="Times to summarize each file")
+@click.argument("PATHS", type=click.Path(exists=True), nargs=-1)
+def main(repeat: int, paths: Tuple[str, ...]) -> None:
+    docs = [f.read_text(errors="replace") for f in _corpus(paths)]
+    docs = [d for d in docs if d.strip()]
+    if not docs:
+        raise click.UsageError("No HTML files found")
+    total_kb = sum(len(d) for d in docs) / 1024
+    click.echo(f"{len(docs)} documents, {total_kb:.0f}KB\n")
+    click.echo(f"{'summarizer':<12} {'total (s)':>10} {'median (ms)':>12} {'max (ms)':>10} {'out/in':>8}")
+    for name in SUMMARIZERS:
+        summarizer = get_summarizer(name)
+        times: List[float] = []
+        out_size = 0
+        for doc in docs:
+            best = float("inf")
+            for _ in range(max(1, repeat)):
+                start = time.perf_counter()
+                summary = summarizer.summarize(doc)
+                best = min(best, time.perf_counter() - start)
+            times.append(best)
+            out_size += len(summary)
+        click.echo(
+            f"{name:<12} {sum(times):>10.3f} {statistics.median(times) * 1000:>12.1f} "
+            f"{max(times) * 1000:>10.1f} {out_size / (total_kb * 1024):>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -32,7 +32,8 @@ setup(
             "mypy",
             "flake8",
             "vcrpy",
-        ]
+        ],
+        "zstd": ["zstandard"],
     },
     classifiers=[
         "License :: OSI Approved :: Apache Software License",
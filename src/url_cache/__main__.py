@@ -4,8 +4,7 @@ CLI interface
 
 import sys
 import logging
-from pathlib import Path
-from typing import List, Optional, Callable, Dict
+from typing import List, Optional, Callable, Dict, Sequence
 
 import click
 
@@ -15,8 +14,11 @@ from .core import (
     DEFAULT_SLEEP_TIME,
     DEFAULT_OPTIONS,
     DEFAULT_LOGLEVEL,
+    BACKENDS,
 )
 from .model import dumps
+from .summary_cache import SummaryDirCache, migrate as migrate_summaries
+from .segment_cache import SummarySegmentCache
 
 # cache object for all commands
 ucache: Optional[URLCache] = None
@@ -25,7 +27,15 @@ OPTIONS_HELP: Dict[str, str] = {
     "subtitle_language": "Subtitle language for Youtube Subtitles",
     "skip_subtitles": "Skip downloading Youtube Subtitles",
     "summarize_html": "Use readability to summarize html. Otherwise saves the entire HTML document",
+    "summarizer": "How to summarize HTML: readability, lxml_text (fast, extracts text) or auto (lxml_text for large documents)",
+    "backend": "How to store summaries: dir (a directory for each URL), sqlite (a single database file) or segments (append-only files, for caches which are mostly read)",
+    "compress_html": "Save HTML compressed (with zstd if zstandard is installed, else gzip)",
+    "dir_index": "Keep an index of cached URLs in a SQLite database, so looking one up doesn't scan directories",
+    "fsync": "Flush cached files to disk before they're renamed into place, so an entry survives a power loss",
     "expiry_duration": "Rerequest if this amount of time has elapsed since the summary was saved (e.g. 5d, 10m)",
+    "stale_while_revalidate": "Print expired summaries immediately, and queue them for 'url_cache refresh'",
+    "negative_ttl": "Retry URLs which couldn't be requested after this amount of time, doubled after each failure",
+    "max_negative_ttl": "Maximum time to wait before retrying URLs which couldn't be requested",
 }
 
 
@@ -66,10 +76,18 @@ def _apply_option_flags(func: Callable[..., None]) -> Callable[..., None]:
     "--sleep-time",
     type=int,
     default=DEFAULT_SLEEP_TIME,
-    help="How long to sleep between requests",
+    help="How long to sleep between requests to the same host",
+)
+@click.option(
+    "--offline",
+    is_flag=True,
+    default=False,
+    help="Only print cached information, never make any requests",
 )
 @_apply_option_flags
-def main(cache_dir: str, debug: bool, sleep_time: int, **kwargs: bool) -> None:
+def main(
+    cache_dir: str, debug: bool, sleep_time: int, offline: bool, **kwargs: bool
+) -> None:
     global ucache
     # dynamically grab these from kwargs -- are created by _apply_option_flags
     options = {key: kwargs[key] for key in DEFAULT_OPTIONS.keys()}
@@ -78,6 +96,10 @@ def main(cache_dir: str, debug: bool, sleep_time: int, **kwargs: bool) -> None:
         sleep_time=sleep_time,
         cache_dir=cache_dir,
         options=options,
+        # the process exits right after printing, so stale
+        # entries are saved to the refresh queue instead
+        background_refresh=False,
+        offline=offline,
     )
 
 
@@ -89,25 +111,85 @@ def main(cache_dir: str, debug: bool, sleep_time: int, **kwargs: bool) -> None:
     default=False,
     help="Don't print output, just cache URL",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Number of hosts to request in parallel",
+)
+@click.option(
+    "--jsonl",
+    is_flag=True,
+    default=False,
+    help="Print each summary on its own line as soon as its finished, instead of one JSON array at the end",
+)
+@click.option(
+    "--summarize-workers",
+    type=int,
+    default=0,
+    show_default=True,
+    help="Number of processes to summarize HTML in, 0 summarizes in the thread which requested it",
+)
 @click.argument("url", nargs=-1, required=True)
-def get(quiet: bool, url: str) -> None:
+def get(
+    quiet: bool, jobs: int, jsonl: bool, summarize_workers: int, url: Sequence[str]
+) -> None:
     """
     Get information for one or more URLs
 
     Prints results as JSON
     """
-    sinfo_list: List[Summary] = []
-    for u in url:
-        sinfo_list.append(ucache.get(u))  # type: ignore[union-attr]
-    if not quiet:
-        click.echo(dumps(sinfo_list))
+    failed = False
+    if jsonl:
+        # print results as they finish, so nothing is kept in memory
+        for res in ucache.iter_many(url, max_workers=jobs, summarize_workers=summarize_workers):  # type: ignore[union-attr]
+            if res.error is not None:
+                click.echo(f"Error getting {res.url}: {res.error}", err=True)
+                failed = True
+            elif not quiet:
+                click.echo(dumps(res.summary))
+    else:
+        sinfo_list: List[Summary] = []
+        for res in ucache.get_many(url, max_workers=jobs, summarize_workers=summarize_workers):  # type: ignore[union-attr]
+            if res.error is not None:
+                click.echo(f"Error getting {res.url}: {res.error}", err=True)
+                failed = True
+            else:
+                assert res.summary is not None
+                sinfo_list.append(res.summary)
+        if not quiet:
+            click.echo(dumps(sinfo_list))
+    if failed:
+        sys.exit(1)
 
 
-def list_keys(cache_dir: Path) -> List[Path]:
+@main.command()
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Number of hosts to request in parallel",
+)
+def refresh(jobs: int) -> None:
     """
-    Helper function which returns the absolute path of all matched keyfiles
+    Refresh expired URLs saved to the refresh queue
+
+    Those are added when getting URLs with --stale-while-revalidate
     """
-    return [p.absolute() for p in cache_dir.rglob("*/key")]
+    if ucache.offline:  # type: ignore[union-attr]
+        click.echo("Can't refresh URLs in offline mode", err=True)
+        sys.exit(1)
+    failed = False
+    for res in ucache.refresh_queued(max_workers=jobs):  # type: ignore[union-attr]
+        if res.error is not None:
+            click.echo(f"Error refreshing {res.url}: {res.error}", err=True)
+            failed = True
+    if failed:
+        sys.exit(1)
 
 
 @main.command()
@@ -120,14 +202,17 @@ def list_keys(cache_dir: Path) -> List[Path]:
 )
 def list(location: str, json: bool) -> None:
     """List all cached URLs"""
-    keyfiles = list_keys(ucache.cache_dir)  # type: ignore[union-attr]
+    summary_cache = ucache.summary_cache  # type: ignore[union-attr]
     values = []
     if location:
-        for p in keyfiles:
+        if not isinstance(summary_cache, SummaryDirCache):
+            click.echo("Only the 'dir' backend stores URLs in directories", err=True)
+            sys.exit(1)
+        for p in summary_cache.keyfiles():
             values.append(str(p.parent))
     else:
-        for p in keyfiles:
-            values.append(p.read_text().strip())
+        for url in summary_cache.urls():
+            values.append(url.strip())
     if json:
         click.echo(dumps(values))
     else:
@@ -149,13 +234,81 @@ def in_cache(url: str) -> None:
 @main.command()
 def export() -> None:
     """Print all cached information as JSON"""
-    keyfiles: List[Path] = list_keys(ucache.cache_dir)  # type: ignore[union-attr]
+    summary_cache = ucache.summary_cache  # type: ignore[union-attr]
     sinfo_list: List[Summary] = []
-    for k in keyfiles:
-        sinfo_list.append(ucache.get(k.read_text()))  # type: ignore[union-attr]
+    for url in summary_cache.urls():
+        # read directly from the cache, so this never requests expired URLs
+        summ = summary_cache.get(url)
+        if summ is not None:
+            sinfo_list.append(summ)
     click.echo(dumps(sinfo_list))
 
 
+@main.command()
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=4,
+    show_default=True,
+    help="Number of directories to compress in parallel",
+)
+def compact(jobs: int) -> None:
+    """
+    Compress the HTML saved in the cache
+
+    To keep new HTML compressed, use --compress-html
+
+    With --backend segments, this instead rewrites the segments
+    to remove replaced/deleted entries
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    summary_cache = ucache.summary_cache  # type: ignore[union-attr]
+    if isinstance(summary_cache, SummarySegmentCache):
+        before, after = summary_cache.compact()
+        click.echo(
+            f"Compacted segments from {before} bytes to {after} bytes (saved {before - after} bytes)"
+        )
+        return
+    if not isinstance(summary_cache, SummaryDirCache):
+        click.echo("Only the 'dir' and 'segments' backends can be compacted", err=True)
+        sys.exit(1)
+    keydirs = [p.parent for p in summary_cache.keyfiles()]
+    before, after = 0, 0
+    # zlib/zstd release the GIL while compressing, so threads run in parallel
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for b, a in pool.map(summary_cache.compact, keydirs):
+            before += b
+            after += a
+    click.echo(
+        f"Checked {len(keydirs)} directories, compressed {before} bytes to {after} bytes (saved {before - after} bytes)"
+    )
+
+
+@main.command()
+@click.option(
+    "--to",
+    "to_backend",
+    type=click.Choice(BACKENDS),
+    required=True,
+    help="Backend to copy the cache to",
+)
+def migrate(to_backend: str) -> None:
+    """
+    Copy everything in the cache to another backend
+
+    Copies from the current --backend, e.g. 'url_cache migrate --to sqlite',
+    then use 'url_cache --backend sqlite ...'
+    """
+    if to_backend == ucache.options["backend"]:  # type: ignore[union-attr]
+        click.echo(f"Already using the '{to_backend}' backend", err=True)
+        sys.exit(1)
+    dest = ucache.open_summary_cache(to_backend)  # type: ignore[union-attr]
+    count = migrate_summaries(ucache.summary_cache, dest)  # type: ignore[union-attr]
+    click.echo(f"Copied {count} URLs to the '{to_backend}' backend")
+
+
 @main.command()
 def cachedir() -> None:
     """Prints the location of the local cache directory"""
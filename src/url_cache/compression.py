@@ -0,0 +1,89 @@
+"""
+Compressing files in the cache (e.g. html_summary.html.zst)
+
+Uses zstd if the zstandard module is installed, else gzip. Either
+can be read regardless of which one new files are written with
+"""
+
+import gzip
+from pathlib import Path
+from typing import NamedTuple, Callable, Dict, Optional
+
+
+class Codec(NamedTuple):
+    ext: str
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+def _gzip_compress(data: bytes) -> bytes:
+    # mtime=0 so the same data always compresses to the same bytes
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+GZIP = Codec(ext=".gz", compress=_gzip_compress, decompress=gzip.decompress)
+
+CODECS: Dict[str, Codec] = {GZIP.ext: GZIP}
+
+ZSTD: Optional[Codec] = None
+try:
+    import zstandard  # type: ignore[import]
+
+    def _zstd_compress(data: bytes) -> bytes:
+        compressed: bytes = zstandard.ZstdCompressor(level=6).compress(data)
+        return compressed
+
+    def _zstd_decompress(data: bytes) -> bytes:
+        # max_output_size, in case the frame doesn't include the content size
+        decompressed: bytes = zstandard.ZstdDecompressor().decompress(
+            data, max_output_size=1 << 30
+        )
+        return decompressed
+
+    ZSTD = Codec(ext=".zst", compress=_zstd_compress, decompress=_zstd_decompress)
+    CODECS[ZSTD.ext] = ZSTD
+except ModuleNotFoundError:
+    pass
+
+
+def default_codec() -> Codec:
+    """The codec to compress new files with"""
+    return GZIP if ZSTD is None else ZSTD
+
+
+def codec_for(p: Path) -> Optional[Codec]:
+    """
+    The codec a file was compressed with, from its extension, or None if it isn't compressed
+
+    >>> codec_for(Path("html_summary.html.gz")).ext
+    '.gz'
+    >>> codec_for(Path("html_summary.html")) is None
+    True
+    """
+    return CODECS.get(p.suffix)
+
+
+def read_bytes(p: Path) -> bytes:
+    """Reads a file, decompressing it if its compressed"""
+    codec = codec_for(p)
+    data = p.read_bytes()
+    return data if codec is None else codec.decompress(data)
+
+
+def write_bytes(data: bytes, p: Path) -> None:
+    """Writes a file, compressing it if it has a compressed extension"""
+    codec = codec_for(p)
+    p.write_bytes(data if codec is None else codec.compress(data))
+
+
+def read_text(p: Path) -> str:
+    if codec_for(p) is None:
+        return p.read_text()
+    return read_bytes(p).decode("utf-8")
+
+
+def write_text(data: str, p: Path) -> None:
+    if codec_for(p) is None:
+        p.write_text(data)
+    else:
+        write_bytes(data.encode("utf-8"), p)
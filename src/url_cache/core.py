@@ -6,36 +6,90 @@ saves that to cache. If something has already been requested, returns it from ca
 import os
 import logging
 import time
-from functools import lru_cache
+import threading
+from queue import Queue, Full, Empty
+from concurrent.futures import ThreadPoolExecutor, Future
+from functools import lru_cache, partial
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Optional, Union, Any, List, TypeVar
+from typing import (
+    Optional,
+    Union,
+    Any,
+    List,
+    Dict,
+    Tuple,
+    Set,
+    Iterable,
+    Iterator,
+    Generator,
+    NamedTuple,
+    Callable,
+    TypeVar,
+    TYPE_CHECKING,
+)
 
-import backoff  # type: ignore[import]
-from logzero import setup_logger, formatter  # type: ignore[import]
-from lassie import Lassie, LassieError  # type: ignore[import]
 from appdirs import user_data_dir, user_log_dir  # type: ignore[import]
-from requests import Response
 
-from .exceptions import URLCacheException, URLCacheRequestException
-from .summary_cache import SummaryDirCache, FileParser
+from .exceptions import (
+    URLCacheException,
+    URLCacheRequestException,
+    URLCacheNotModified,
+    URLCacheOffline,
+)
+from .summary_cache import SummaryCache, SummaryDirCache, FileParser
+from .sqlite_cache import SummarySQLiteCache
+from .segment_cache import SummarySegmentCache
 from .model import Summary
 from .utils import (
     normalize_path,
-    fibo_backoff,
-    backoff_warn,
     clean_url,
+    url_host,
     parse_timedelta_string,
 )
-from .html_utils import summarize_html
 from .sites.all import EXTRACTORS
 from .sites.abstract import AbstractSite
 from .dir_cache import DirCacheMiss
 from .common import Options, Json
-from .session import SaveSession
+from .fetch import FetchLimits, FetchResult
+from .rate_limit import RateLimit, RateLimitScheduler
+from .retry import Retrier, RetryPolicy
+from .locking import SingleFlight
+from .refresh import RefreshQueue, BackgroundRefresher
+from .memo import SummaryMemo, DEFAULT_MEMO_SIZE, content_hash
+from .html_utils import (
+    Summarizer,
+    ReadabilitySummarizer,
+    get_summarizer,
+    summarize_html,
+)
+
+# requests/lassie/readability are slow to import, and aren't needed
+# to read from the cache -- they're imported when something is requested
+if TYPE_CHECKING:
+    from requests import Response
+    from .pipeline import SummarizerPool
+    from .session import SessionConfig, RateLimitedSession
+    from .lassie_utils import ResponseLassie
 
 DEFAULT_SLEEP_TIME = 5
 DEFAULT_LOGLEVEL = logging.WARNING
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PREPROCESS_CACHE_SIZE = 2**16
+# lockfile in the hashed directory, held while requesting a URL
+FETCH_LOCKFILE = ".fetch.lock"
+# file in the base cache directory, URLs waiting for 'url_cache refresh'
+REFRESH_QUEUE_FILE = "refresh_queue"
+# directory in the base cache directory, HTML summaries by a hash of the HTML
+SUMMARY_MEMO_DIR = "summaries"
+# file in the base cache directory, the index of directories in 'data'
+DIR_INDEX_FILE = "index.sqlite"
+# file in the base cache directory, the database for the 'sqlite' backend
+SQLITE_CACHE_FILE = "cache.sqlite"
+# directory in the base cache directory, for the 'segments' backend
+SEGMENTS_DIR = "segments"
+# how summaries are stored, see URLCache.open_summary_cache
+BACKENDS = ("dir", "sqlite", "segments")
 
 # these options more refer to site-specific
 # options, not core URLCache options -- those are
@@ -46,12 +100,55 @@ DEFAULT_OPTIONS: Options = {
     "subtitle_language": "en",
     "skip_subtitles": False,
     "summarize_html": True,
+    "summarizer": "readability",
+    "backend": "dir",
+    "compress_html": False,
+    "dir_index": False,
+    "fsync": False,
     "expiry_duration": None,
+    "stale_while_revalidate": False,
+    "negative_ttl": "1d",
+    "max_negative_ttl": "30d",
 }
 
+# how often get_many checks its worker threads while its waiting for results
+RESULT_POLL_INTERVAL = 0.5
+
 T = TypeVar("T")
 
 
+class BatchResult(NamedTuple):
+    """
+    The result for one of the URLs passed to URLCache.get_many
+
+    url is the URL as it was passed in, summary is None if
+    an error was raised while getting information for it
+    """
+
+    url: str
+    summary: Optional[Summary]
+    error: Optional[Exception]
+
+
+def _put_result(
+    results: "Queue[Tuple[str, BatchResult]]",
+    item: Tuple[str, BatchResult],
+    stop: threading.Event,
+) -> bool:
+    """Puts item on the queue, returns False if the batch was stopped before it could"""
+    while True:
+        try:
+            results.put(item, timeout=0.1)
+            return True
+        except Full:
+            if stop.is_set():
+                return False
+
+
+def _offline_miss(url: str) -> URLCacheOffline:
+    return URLCacheOffline(f"{url} is not cached, and offline mode is enabled")
+
+
 class URLCache:
     def __init__(
         self,
@@ -62,13 +159,37 @@ class URLCache:
         additional_extractors: Optional[List[Any]] = None,
         file_parsers: Optional[List[FileParser[T]]] = None,
         options: Optional[Options] = None,
+        session_config: Optional["SessionConfig"] = None,
+        fetch_limits: Optional[FetchLimits] = None,
+        preprocess_cache_size: int = DEFAULT_PREPROCESS_CACHE_SIZE,
+        background_refresh: bool = True,
+        retry_policy: Optional[RetryPolicy] = None,
+        offline: bool = False,
+        summary_memo_size: int = DEFAULT_MEMO_SIZE,
     ) -> None:
         """
         Main interface to the library
 
-        sleep_time: time to wait between HTTP requests
+        sleep_time: minimum time between HTTP requests to the same host
+                    (extractors can configure different limits for the hosts they request)
         cache_dir: location the store cached data
                    uses default user cache directory if not provided
+        session_config: connection pool/timeout settings for the HTTP session
+                        shared by URLCache and the site extractors
+        fetch_limits: the maximum body size, and which content types to download
+        preprocess_cache_size: how many raw -> preprocessed URLs to remember
+        background_refresh: with the stale_while_revalidate option, refresh stale
+                            entries on a background thread. If False, they're
+                            saved to a queue which 'url_cache refresh' drains
+        retry_policy: how many times/how long to wait before retrying rate limited requests
+        offline: only return cached data, never make requests -- anything which
+                 isn't cached raises URLCacheOffline, expired data is returned as is
+        summary_memo_size: maximum size (in bytes) of the HTML summaries remembered
+                           by a hash of the HTML, so identical pages aren't summarized
+                           again. 0 disables this
+
+        The HTTP session, logger, extractors and summary cache are created
+        the first time they're used, so checking the cache stays fast
         """
 
         # handle cache dir
@@ -95,22 +216,31 @@ class URLCache:
         if not self.cache_dir.exists():
             self.cache_dir.mkdir()
 
-        # setup logging
-        self.logger: logging.Logger = setup_logger(
-            name="url_cache",
-            level=loglevel,
-            logfile=self.logpath,
-            maxBytes=int(1e7),
-            formatter=formatter(
-                "{start}[%(levelname)-7s %(asctime)s %(name)s %(filename)s:%(lineno)d]{end} %(message)s"
-            ),
-        )
+        # held while creating lazy attributes
+        self._lazy_lock = threading.RLock()
+
+        self._loglevel = loglevel
+        self._logger: Optional[logging.Logger] = None
 
         self.sleep_time = sleep_time
+        self.offline = offline
+
+        # requests only wait on other requests to the same host
+        self.scheduler = RateLimitScheduler(
+            default=[RateLimit(calls=1, period=self.sleep_time)]
+        )
 
         self.options: Options = {} if options is None else options
         self._set_option_defaults()
 
+        if self.options["backend"] not in BACKENDS:
+            raise URLCacheException(
+                f"Unknown backend {self.options['backend']}, expected one of {', '.join(BACKENDS)}"
+            )
+
+        assert isinstance(self.options["summarizer"], str)
+        self.summarizer: Summarizer = get_summarizer(self.options["summarizer"])
+
         self.expiry_duration: Optional[timedelta] = None
         if self.options["expiry_duration"] is not None:
             assert isinstance(self.options["expiry_duration"], str)
@@ -118,13 +248,44 @@ class URLCache:
                 self.options["expiry_duration"]
             )
 
-        ll: Lassie = Lassie()
-        # hackery with a requests.Session to save the most recent request object
-        ll.client = SaveSession(cb_func=self._save_http_response)
-        self.lassie: Lassie = ll
+        # how long to wait before retrying URLs which couldn't be requested,
+        # doubled after each consecutive failure, up to max_negative_ttl
+        self.negative_ttl: Optional[timedelta] = None
+        self.max_negative_ttl: Optional[timedelta] = None
+        if self.options["negative_ttl"] is not None:
+            assert isinstance(self.options["negative_ttl"], str)
+            self.negative_ttl = parse_timedelta_string(self.options["negative_ttl"])
+        if self.options["max_negative_ttl"] is not None:
+            assert isinstance(self.options["max_negative_ttl"], str)
+            self.max_negative_ttl = parse_timedelta_string(
+                self.options["max_negative_ttl"]
+            )
+
+        self._session_config = session_config
+        self._session: Optional["RateLimitedSession"] = None
+        self._retry_policy = retry_policy
+        self._retrier: Optional[Retrier] = None
+        self.fetch_limits = FetchLimits() if fetch_limits is None else fetch_limits
+        self._lassie: Optional["ResponseLassie"] = None
+        self.summary_memo: Optional[SummaryMemo] = None
+        if summary_memo_size > 0:
+            self.summary_memo = SummaryMemo(
+                self._base_cache_dir / SUMMARY_MEMO_DIR, max_bytes=summary_memo_size
+            )
 
-        # default 'last response received' to None
-        self._response: Optional[Response] = None
+        # the 'last response received' is stored per-thread, so
+        # get_many can run request_data in multiple threads at once
+        self._local = threading.local()
+        # only one thread requests a URL at a time, others wait for its result
+        self._single_flight: SingleFlight[Summary] = SingleFlight()
+
+        # where stale entries go when stale_while_revalidate is enabled
+        self.refresh_queue = RefreshQueue(self._base_cache_dir / REFRESH_QUEUE_FILE)
+        self._refresher: Optional[BackgroundRefresher] = None
+        if background_refresh:
+            self._refresher = BackgroundRefresher(
+                self.refresh, logging.getLogger("url_cache")
+            )
 
         # initialize site-specific parsers
         self.extractor_classes = EXTRACTORS
@@ -133,21 +294,171 @@ class URLCache:
                 if not issubclass(ext, AbstractSite):
                     self.logger.warning(f"{ext} is not a subclass of AbstractSite")
                 self.extractor_classes.append(ext)
+        self._extractors: Optional[List[AbstractSite]] = None
+        self._host_index: Dict[str, List[int]] = {}
+        self._any_host_extractors: List[int] = []
+
+        # memoize raw -> preprocessed URLs, running every extractor is
+        # the most expensive part of checking if something is in cache
+        self._preprocess_memo: Callable[[str], str] = lru_cache(
+            maxsize=preprocess_cache_size
+        )(self._preprocess_url)
+
+        self._file_parsers: List[FileParser[Any]] = (
+            [] if file_parsers is None else file_parsers
+        )
+        self._summary_cache: Optional[SummaryCache] = None
+
+    @property
+    def logger(self) -> logging.Logger:
+        if self._logger is None:
+            with self._lazy_lock:
+                if self._logger is None:
+                    from logzero import setup_logger, formatter  # type: ignore[import]
+
+                    self._logger = setup_logger(
+                        name="url_cache",
+                        level=self._loglevel,
+                        logfile=self.logpath,
+                        maxBytes=int(1e7),
+                        formatter=formatter(
+                            "{start}[%(levelname)-7s %(asctime)s %(name)s %(filename)s:%(lineno)d]{end} %(message)s"
+                        ),
+                    )
+        assert self._logger is not None
+        return self._logger
+
+    @property
+    def session(self) -> "RateLimitedSession":
+        """
+        One pooled session, shared with the extractors so connections get reused
+        """
+        if self._session is None:
+            with self._lazy_lock:
+                if self._session is None:
+                    from .session import build_session
+
+                    self._session = build_session(
+                        scheduler=self.scheduler, config=self._session_config
+                    )
+        assert self._session is not None
+        return self._session
+
+    @property
+    def retrier(self) -> Retrier:
+        """
+        Retries 429s, and slows down requests to hosts that send them
+        """
+        if self._retrier is None:
+            with self._lazy_lock:
+                if self._retrier is None:
+                    self._retrier = Retrier(
+                        policy=self._retry_policy,
+                        scheduler=self.scheduler,
+                        logger=self.logger,
+                    )
+        assert self._retrier is not None
+        return self._retrier
+
+    @property
+    def lassie(self) -> "ResponseLassie":
+        """
+        Parses the response from fetch_response, doesn't make requests itself
+        """
+        if self._lassie is None:
+            with self._lazy_lock:
+                if self._lassie is None:
+                    from .lassie_utils import ResponseLassie
 
-        self.extractors: List[AbstractSite] = [
-            e(uc=self) for e in self.extractor_classes
-        ]
+                    self._lassie = ResponseLassie()
+        assert self._lassie is not None
+        return self._lassie
 
+    @property
+    def extractors(self) -> List[AbstractSite]:
+        """
+        The site extractors, created the first time they're needed
+        """
+        if self._extractors is None:
+            with self._lazy_lock:
+                if self._extractors is None:
+                    self._extractors = self._load_extractors()
+        return self._extractors
+
+    def _load_extractors(self) -> List[AbstractSite]:
+        extractors: List[AbstractSite] = [e(uc=self) for e in self.extractor_classes]
+
+        # index extractors by the hosts they handle, so each URL is only
+        # passed to the extractors for its host (and ones that match any host)
+        for i, ext in enumerate(extractors):
+            if not ext.hosts:
+                self._any_host_extractors.append(i)
+            for host in ext.hosts:
+                self._host_index.setdefault(host.casefold(), []).append(i)
+
+        # let extractors override the rate limits for hosts they request
+        for ext in extractors:
+            for host, limits in ext.rate_limits().items():
+                self.scheduler.configure(host, limits)
+        return extractors
+
+    @property
+    def summary_cache(self) -> SummaryCache:
+        if self._summary_cache is None:
+            with self._lazy_lock:
+                if self._summary_cache is None:
+                    assert isinstance(self.options["backend"], str)
+                    self._summary_cache = self.open_summary_cache(
+                        self.options["backend"]
+                    )
+        return self._summary_cache
+
+    def open_summary_cache(self, backend: str) -> SummaryCache:
+        """
+        Creates the storage for summaries in the cache directory
+
+        dir: a directory for each URL in 'data', with a file for each attribute
+        sqlite: a single SQLite database, cache.sqlite
+        segments: append-only files in 'segments', for caches which are mostly read
+        """
         # loop through each extractors file_parsers function
         # to append custom file parsers to the summary cache
-        all_file_parsers = [] if file_parsers is None else file_parsers
+        all_file_parsers = list(self._file_parsers)
         for ext in self.extractors:
             all_file_parsers.extend(ext.file_parsers())
-
-        self.summary_cache = SummaryDirCache(
-            self.cache_dir, file_parsers=all_file_parsers
+        if backend == "dir":
+            return SummaryDirCache(
+                self.cache_dir,
+                file_parsers=all_file_parsers,
+                compress=bool(self.options["compress_html"]),
+                index_path=(
+                    self._base_cache_dir / DIR_INDEX_FILE
+                    if self.options["dir_index"]
+                    else None
+                ),
+                fsync=bool(self.options["fsync"]),
+            )
+        elif backend == "sqlite":
+            return SummarySQLiteCache(
+                self._base_cache_dir / SQLITE_CACHE_FILE, file_parsers=all_file_parsers
+            )
+        elif backend == "segments":
+            return SummarySegmentCache(
+                self._base_cache_dir / SEGMENTS_DIR, file_parsers=all_file_parsers
+            )
+        raise URLCacheException(
+            f"Unknown backend {backend}, expected one of {', '.join(BACKENDS)}"
         )
 
+    @property
+    def _response(self) -> Optional["Response"]:
+        resp: Optional["Response"] = getattr(self._local, "response", None)
+        return resp
+
+    @_response.setter
+    def _response(self, resp: Optional["Response"]) -> None:
+        self._local.response = resp
+
     def _set_option_defaults(self) -> None:
         for key, val in DEFAULT_OPTIONS.items():
             if key not in self.options:
@@ -157,87 +468,203 @@ class URLCache:
         """
         Runs each preprocess_url function from each enabled extractor,
         along with the default unquoting/strip
+
+        Results are memoized, see preprocess_cache_size
         """
+        return self._preprocess_memo(url)
+
+    def _preprocess_url(self, url: str) -> str:
         uurl: str = clean_url(url)
-        for extractor in self.extractors:
+        for extractor in self.extractors_for(uurl):
             uurl = extractor.preprocess_url(uurl)
         return uurl
 
+    def extractors_for(self, url: str) -> List[AbstractSite]:
+        """
+        Returns the extractors which could match this URL -- ones
+        which list its host (or a parent domain) in 'hosts', and ones which
+        don't list any hosts. Keeps the order of self.extractors
+        """
+        extractors = self.extractors
+        parts: List[str] = url_host(url).split(".")
+        matched: Set[int] = set(self._any_host_extractors)
+        for i in range(len(parts)):
+            matched.update(self._host_index.get(".".join(parts[i:]), []))
+        return [extractors[i] for i in sorted(matched)]
+
     def request_data(self, url: str, preprocess_url: bool = True) -> Summary:
         """
         Given a URL:
 
-        Uses lassie to grab metadata
+        Requests the URL (one GET request), uses lassie to grab metadata
         Parses/minifies the HTML text with readablity/lxml
 
         Calls each enabled 'site' extractor, to extract additional information if a site matches the URL
         e.g. If this is a youtube URL, this requests youtube subtitles
 
         returns all the requested/parsed info as a models.Summary object
+
+        summary.status records how the request went (see Summary), if
+        the page couldn't be requested its 'failures' is 1
+
+        When called while refreshing an expired Summary which has validators,
+        this makes a conditional request, and raises URLCacheNotModified if
+        the page hasn't changed
         """
+        self._check_online(url)
+
+        from .fetch import response_validators
+
         uurl: str
         if preprocess_url:
             uurl = self.preprocess_url(url)
         else:
             uurl = url
+        # before requesting anything, so the extractors configure their rate limits
+        extractors = self.extractors_for(uurl)
 
-        summary = Summary(url=uurl, timestamp=datetime.now())
+        now = datetime.now()
+        summary = Summary(url=uurl, timestamp=now)
 
         self._response = None
+        # updated by _fetch_lassie
+        status: Json = {"status_code": None, "error": None, "attempts": 0}
+        self._local.status = status
 
-        # try to fetch metadata data with lassie, requests.Session saves the response object using a callback
-        # to self._response
+        # request the page and parse metadata with lassie, this saves the response to self._response
         try:
-            lassie_metadata = self._fetch_lassie(uurl)
+            lassie_metadata = self._fetch_lassie(
+                uurl, getattr(self._local, "validators", None)
+            )
             if lassie_metadata is not None:
                 summary.metadata = lassie_metadata
-        except URLCacheRequestException:
-            # failed after waiting 13, 21, 34 seconds successively
-            pass
-
-        self.sleep()
-
-        if self._response is not None:  # type: ignore[unreachable]
-            # mypy can't figure out this isn't none because of the callback
-            assert self._response is not None  # type: ignore[unreachable]
-            # use readability lib to parse self._response.text
-            # if we're at this point, that should always be the latest
-            # response, see https://github.com/michaelhelmick/lassie/blob/dd525e6243a989f083534921a1a1206931e608ec/lassie/core.py#L244-L266
+        except URLCacheRequestException as e:
+            # still rate limited after retrying
+            status["error"] = type(e).__name__
+        finally:
+            self._local.status = None
+
+        resp: Optional["Response"] = self._response
+        failed = resp is None or resp.status_code >= 400
+        status["failures"] = 1 if failed else 0
+        status["checked_at"] = int(now.timestamp())
+        summary.status = status
+        deferred = False
+        if resp is not None:
+            if resp.ok:
+                summary.validators = response_validators(resp)
+            # use readability lib to parse the same body lassie parsed
+            # this is empty if the response wasn't HTML
             if self.options["summarize_html"]:
-                if len(self._response.text) > 0:  # type: ignore[unreachable]
-                    summary.html_summary = summarize_html(self._response.text)  # type: ignore[unreachable]
+                if len(resp.text) > 0:
+                    memoized = self._memoized_summary(resp.text)
+                    if memoized is not None:
+                        summary.html_summary = memoized
+                    elif getattr(self._local, "defer_summary", False):
+                        # get_many summarizes this in a worker process instead,
+                        # its saved without a summary until then, so the full
+                        # HTML is never saved (or read) as the summary
+                        self._local.deferred_html = resp.text
+                        deferred = True
+                    else:
+                        summary.html_summary = self._summarize(resp.text)
             else:
                 # if user overrode to specify not to summarize, save the
                 # entire html text to the summary file
-                summary.html_summary = self._response.text
+                summary.html_summary = resp.text
 
         # call hooks for other extractors, if the URL matches
-        for ext in self.extractors:
+        for ext in extractors:
             if ext.matches_site(uurl):
                 summary = ext.extract_info(uurl, summary)
+        if deferred:
+            self._local.deferred = summary
+        return summary
+
+    def _memoized_summary(self, html: str) -> Optional[str]:
+        if self.summary_memo is None:
+            return None
+        return self.summary_memo.get(content_hash(html, self.summarizer.name))
+
+    def _memoize_summary(self, html: str, summary: str) -> None:
+        if self.summary_memo is not None:
+            self.summary_memo.put(content_hash(html, self.summarizer.name), summary)
+
+    def _summarize(self, html: str) -> str:
+        """
+        summarize_html, memoized by a hash of the HTML
+
+        If another summarizer can't parse the document, falls back to readability
+        """
+        try:
+            summary = summarize_html(html, self.summarizer)
+        except Exception as e:
+            if isinstance(self.summarizer, ReadabilitySummarizer):
+                raise
+            self.logger.warning(
+                f"Could not summarize HTML with {self.summarizer.name}, using readability: {e}"
+            )
+            summary = summarize_html(html, ReadabilitySummarizer())
+        self._memoize_summary(html, summary)
         return summary
 
-    @backoff.on_exception(
-        fibo_backoff, URLCacheRequestException, max_tries=3, on_backoff=backoff_warn  # type: ignore[arg-type]
-    )
-    def _fetch_lassie(self, url: str) -> Optional[Json]:
+    def _fetch_lassie(
+        self, url: str, validators: Optional[Json] = None
+    ) -> Optional[Json]:
+        from requests import RequestException
+        from lassie import LassieError  # type: ignore[import]
+        from .fetch import fetch_response
+
         self.logger.debug("Fetching metadata for {}".format(url))
+        self._response = None
+        status: Json = getattr(self._local, "status", None) or {}
+
+        def _attempt() -> FetchResult:
+            status["attempts"] = status.get("attempts", 0) + 1
+            return fetch_response(self.session, url, validators, self.fetch_limits)
+
         try:
-            meta: Json = self.lassie.fetch(
+            resp, mimetype, truncated = self.retrier.call(
+                url, _attempt, response=lambda res: res.response
+            )
+        except RequestException as re:
+            self.logger.warning(f"Could not request {url}: {re}")
+            status["error"] = type(re).__name__
+            return None
+        self._response = resp
+        status["status_code"] = resp.status_code
+        status["error"] = None
+        if validators and resp.status_code == 304:
+            raise URLCacheNotModified(f"{url} has not been modified")
+        if resp.status_code == 429:
+            raise URLCacheRequestException(
+                "Received 429 for URL {}, out of retries".format(url)
+            )
+        try:
+            meta: Json = self.lassie.parse(
                 url,
+                resp,
+                mimetype,
                 favicon=True,
                 handle_file_content=True,
                 all_images=True,
                 parser="lxml",
             )
-            return meta
         except LassieError as le:
             self.logger.warning("Could not retrieve metadata from lassie: " + str(le))
-        if self._response is not None and self._response.status_code == 429:
-            raise URLCacheRequestException(
-                "Received 429 for URL {}, waiting to retry...".format(url)
+            status["error"] = type(le).__name__
+            return None
+        if mimetype not in self.fetch_limits.allowed_types:
+            # the body wasn't downloaded, save what the headers say it was
+            meta["content_type"] = mimetype
+            if resp.headers.get("Content-Length", "").isdigit():
+                meta["content_length"] = int(resp.headers["Content-Length"])
+        if truncated:
+            self.logger.warning(
+                f"Response for {url} was larger than {self.fetch_limits.max_body_size} bytes, truncated"
             )
-        return None
+            meta["truncated"] = True
+        return meta
 
     @property
     def logpath(self) -> str:
@@ -247,57 +674,447 @@ class URLCache:
         return f
 
     def sleep(self) -> None:
+        """
+        Sleep for sleep_time seconds
+
+        The requests made by URLCache/extractors are rate limited per-host
+        by self.scheduler instead, this is kept for subclasses which make
+        requests themselves
+        """
         time.sleep(self.sleep_time)
 
-    def _save_http_response(self, resp: Response) -> None:
+    def _negative_ttl(self, failures: int) -> Optional[timedelta]:
+        """How long to wait before retrying a URL which failed 'failures' times in a row"""
+        if self.negative_ttl is None:
+            return None
+        # cap the exponent, so this can't overflow
+        ttl = self.negative_ttl * (1 << min(max(failures - 1, 0), 16))
+        if self.max_negative_ttl is not None:
+            ttl = min(ttl, self.max_negative_ttl)
+        return ttl
+
+    def _is_expired(self, summary: Summary) -> bool:
         """
-        callback function to save the most recent request that lassie made
+        Returns True if the cached summary is older than the expiry_duration,
+        or if the last request for it failed and its negative TTL has passed
+
+        While the negative TTL hasn't passed, a failed URL isn't expired, even if its
+        timestamp (from the last successful request) is older than the expiry_duration
         """
-        # do I need to save multiple? lassie makes a HEAD
-        # request to get the content type, and then another
-        # to get the content, so this should access the
-        # response I want; with the main page content
-        self._response = resp
+        failures: int = summary.status.get("failures", 0)
+        if failures > 0:
+            ttl = self._negative_ttl(failures)
+            checked_at: Optional[int] = summary.status.get("checked_at")
+            if ttl is not None and checked_at is not None:
+                return datetime.now() - datetime.fromtimestamp(checked_at) > ttl
+        if self.expiry_duration is None or summary.timestamp is None:
+            return False
+        return datetime.now() - summary.timestamp > self.expiry_duration
+
+    def _refresh(self, uurl: str, cached: Summary) -> Summary:
+        """
+        Called when a cached summary has expired. If the cached
+        response had validators, makes a conditional request, and only
+        updates the timestamp if the page hasn't changed
+
+        If the page couldn't be requested, keeps the cached data and
+        only updates its status, so its retried after the negative TTL
+        """
+        max_age: Optional[int] = cached.validators.get("max_age")
+        if max_age is not None and cached.timestamp is not None:
+            # the server said this is still fresh, don't need to request it
+            if datetime.now() - cached.timestamp < timedelta(seconds=max_age):
+                return cached
+        # saved per-thread instead of passing to request_data, so
+        # subclasses which override request_data still work
+        self._local.validators = cached.validators
+        try:
+            data = self.request_data(uurl, preprocess_url=False)
+        except URLCacheNotModified:
+            self.logger.debug(f"{uurl} not modified, updating timestamp")
+            now = datetime.now()
+            cached.timestamp = now
+            self.summary_cache.touch(uurl, cached.timestamp)
+            # the request succeeded, reset any failures from earlier refreshes
+            cached.status = {
+                **cached.status,
+                "status_code": 304,
+                "error": None,
+                "failures": 0,
+                "checked_at": int(now.timestamp()),
+            }
+            self.summary_cache.put_status(uurl, cached.status)
+            return cached
+        finally:
+            self._local.validators = None
+        if data.status.get("failures", 0) > 0:
+            # the website may be gone now, don't replace what was saved
+            self.logger.warning(f"Could not refresh {uurl}, keeping cached data")
+            data.status["failures"] = cached.status.get("failures", 0) + 1
+            cached.status = data.status
+            self.summary_cache.put_status(uurl, cached.status)
+            return cached
+        self.summary_cache.put(uurl, data)
+        return data
+
+    def _serve_cached(self, uurl: str, cached: Summary) -> bool:
+        """
+        Returns True if the cached summary can be returned -- it
+        hasn't expired, or it has and stale_while_revalidate is enabled,
+        in which case this schedules a refresh
+        """
+        if self.offline or not self._is_expired(cached):
+            return True
+        if not self.options["stale_while_revalidate"]:
+            return False
+        if self._refresher is not None:
+            self._refresher.submit(uurl)
+        else:
+            self.refresh_queue.push(uurl)
+        return True
+
+    def refresh(self, url: str) -> Summary:
+        """
+        Requests the URL again (as a conditional request, if the cached
+        summary has validators) and saves the result
+        """
+        uurl: str = self.preprocess_url(url)
+        self._check_online(uurl)
+        return self._single_flight.do(
+            uurl, lambda: self._request_and_save(uurl, refresh=True)
+        )
+
+    def refresh_queued(
+        self, *, max_workers: int = DEFAULT_MAX_WORKERS
+    ) -> List[BatchResult]:
+        """
+        Refreshes every URL in the refresh queue, saved there by
+        instances with stale_while_revalidate enabled and background_refresh disabled
+
+        Like get_many, each host is requested from one worker thread
+        """
+        if self.offline:
+            raise URLCacheOffline("Can't refresh URLs in offline mode")
+        by_host: Dict[str, List[str]] = {}
+        for uurl in self.refresh_queue.pop_all():
+            by_host.setdefault(url_host(uurl), []).append(uurl)
+
+        def _refresh_host(urls: List[str]) -> List[BatchResult]:
+            res: List[BatchResult] = []
+            for uurl in urls:
+                try:
+                    res.append(
+                        BatchResult(url=uurl, summary=self.refresh(uurl), error=None)
+                    )
+                except Exception as e:
+                    self.logger.warning(f"Failed to refresh {uurl}: {e}")
+                    res.append(BatchResult(url=uurl, summary=None, error=e))
+            return res
+
+        results: List[BatchResult] = []
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            for host_results in pool.map(_refresh_host, by_host.values()):
+                results.extend(host_results)
+        return results
+
+    def _check_online(self, url: str) -> None:
+        if self.offline:
+            raise _offline_miss(url)
 
     def get(self, url: str) -> Summary:
         """
         Gets metadata/summary for a URL
         Save the parsed information in a local data directory
         If the URL already has cached data locally, returns that instead
+
+        If multiple threads/processes try to get the same URL at the same
+        time, only one makes the request, the others wait and use its result
+
+        With the stale_while_revalidate option, expired summaries are
+        returned immediately, and refreshed in the background
+
+        In offline mode, raises URLCacheOffline if the URL isn't cached
         """
-        uurl: str = self.preprocess_url(url)
-        if not self.in_cache(uurl):
-            data: Summary = self.request_data(uurl)
-            self.summary_cache.put(uurl, data)
-            return data
+        return self._get_preprocessed(self.preprocess_url(url))
+
+    def _get_preprocessed(self, uurl: str) -> Summary:
+        """get for a URL which has already been preprocessed"""
         # returns None if not present
         fdata: Optional[Summary] = self.summary_cache.get(uurl)
-        if fdata is None:
-            raise URLCacheException(
-                f"Failure retrieving information from cache for {url}"
-            )
-        elif self.expiry_duration is not None and fdata.timestamp is not None:
-            if datetime.now() - fdata.timestamp > self.expiry_duration:
+        if fdata is not None and self._serve_cached(uurl, fdata):
+            return fdata
+        self._check_online(uurl)
+        return self._single_flight.do(uurl, lambda: self._request_and_save(uurl))
+
+    def _request_and_save(self, uurl: str, refresh: bool = False) -> Summary:
+        """
+        Requests and caches the (preprocessed) URL while holding a lockfile,
+        unless another process cached it while this was waiting for the lock
+
+        If refresh is True, refreshes the cached summary even if it hasn't expired
+        """
+        with self.summary_cache.lock(uurl, FETCH_LOCKFILE):
+            cached: Optional[Summary] = self.summary_cache.get(uurl)
+            if cached is None:
+                data: Summary = self.request_data(uurl, preprocess_url=False)
+                self.summary_cache.put(uurl, data)
+                return data
+            elif refresh or self._is_expired(cached):
                 # hmm -- only replace keys that were fetched from request_data
                 # rmtree'ing the directory means we may lose
                 # data that may be gone forever, since the website
                 # is gone now
-                data = self.request_data(uurl)
-                self.summary_cache.put(uurl, data)
-                return data
-        return fdata
+                return self._refresh(uurl, cached)
+            return cached
 
-    def in_cache(self, url: str) -> bool:
+    def get_many(
+        self,
+        urls: Iterable[str],
+        *,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        summarize_workers: int = 0,
+    ) -> List[BatchResult]:
+        """
+        Gets metadata/summaries for multiple URLs
+
+        URLs are deduplicated after preprocessing, and anything already
+        in cache is returned without making a request. The remaining URLs are
+        grouped by host -- each host is requested from one worker thread,
+        so requests to the same host are still made one at a time (and are
+        rate limited by the scheduler), while different hosts are requested in parallel
+
+        If summarize_workers is more than 0, HTML is summarized in that many
+        worker processes, instead of in the thread which requested it, so those
+        threads can move on to the next URL
+
+        Returns a BatchResult for each URL, in the order they were passed.
+        If getting information for a URL raises an error, that is attached
+        to its BatchResult instead of stopping the entire batch
+        """
+        url_list: List[str] = list(urls)
+        # original url -> preprocessed url, or the error raised while preprocessing
+        canonical: Dict[str, Union[str, Exception]] = {}
+        # preprocessed url -> result
+        done: Dict[str, BatchResult] = {}
+        for uurl, res in self._iter_many(
+            url_list, max_workers, summarize_workers, canonical=canonical
+        ):
+            done[uurl] = res
+
+        results: List[BatchResult] = []
+        for url in url_list:
+            target = canonical[url]
+            if isinstance(target, Exception):
+                results.append(BatchResult(url=url, summary=None, error=target))
+            else:
+                results.append(done[target]._replace(url=url))
+        return results
+
+    def iter_many(
+        self,
+        urls: Iterable[str],
+        *,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        summarize_workers: int = 0,
+    ) -> Generator[BatchResult, None, None]:
+        """
+        Like get_many, but yields each BatchResult as soon as its finished,
+        so results are in the order they complete, not the order they were passed
+
+        Only the first URL which preprocesses to some URL is yielded, duplicates are skipped.
+        Doesn't keep the results in memory, so this can be used for any number of URLs
+        """
+        for _, res in self._iter_many(urls, max_workers, summarize_workers):
+            yield res
+
+    def _iter_many(
+        self,
+        urls: Iterable[str],
+        max_workers: int,
+        summarize_workers: int = 0,
+        canonical: Optional[Dict[str, Union[str, Exception]]] = None,
+    ) -> Iterator[Tuple[str, BatchResult]]:
+        """
+        Yields (preprocessed url, result) for each unique URL, returning
+        items from cache immediately and requesting the rest in a thread pool
+
+        If canonical is passed, saves what each URL preprocessed to
+        """
+        seen: Set[str] = set()
+        by_host: Dict[str, List[Tuple[str, str]]] = {}
+
+        for url in urls:
+            if canonical is not None and url in canonical:
+                continue
+            try:
+                uurl = self.preprocess_url(url)
+            except Exception as e:
+                if canonical is not None:
+                    canonical[url] = e
+                yield url, BatchResult(url=url, summary=None, error=e)
+                continue
+            if canonical is not None:
+                canonical[url] = uurl
+            if uurl in seen:
+                continue
+            seen.add(uurl)
+            cached: Optional[Summary] = self.summary_cache.get(uurl)
+            if cached is not None and self._serve_cached(uurl, cached):
+                yield uurl, BatchResult(url=url, summary=cached, error=None)
+            elif self.offline:
+                err = _offline_miss(uurl)
+                yield uurl, BatchResult(url=url, summary=None, error=err)
+            else:
+                by_host.setdefault(url_host(uurl), []).append((url, uurl))
+
+        if not by_host:
+            return
+
+        # bounded, so results don't pile up in memory if the consumer is slow
+        workers = max(1, max_workers)
+        results: "Queue[Tuple[str, BatchResult]]" = Queue(maxsize=workers * 2)
+        stop = threading.Event()
+        summarizer: Optional["SummarizerPool"] = None
+        if summarize_workers > 0 and self.options["summarize_html"]:
+            from .pipeline import SummarizerPool
+
+            summarizer = SummarizerPool(summarize_workers, self.summarizer)
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            hosts: List["Future[None]"] = [
+                pool.submit(self._get_serially, host_urls, results, stop, summarizer)
+                for host_urls in by_host.values()
+            ]
+            remaining = sum(len(v) for v in by_host.values())
+            while remaining > 0:
+                try:
+                    item = results.get(timeout=RESULT_POLL_INTERVAL)
+                except Empty:
+                    # a worker which died won't put the rest of its results
+                    # on the queue, raise its error instead of waiting forever
+                    for fut in hosts:
+                        if fut.done():
+                            died = fut.exception()
+                            if died is not None:
+                                raise died
+                    continue
+                remaining -= 1
+                yield item
+        finally:
+            # if the consumer stopped early, tell workers
+            # to stop requesting and unblock them
+            stop.set()
+            while not results.empty():
+                results.get_nowait()
+            pool.shutdown(wait=True)
+            if summarizer is not None:
+                summarizer.shutdown()
+
+    def _get_serially(
+        self,
+        urls: List[Tuple[str, str]],
+        results: "Queue[Tuple[str, BatchResult]]",
+        stop: threading.Event,
+        summarizer: Optional["SummarizerPool"] = None,
+    ) -> None:
+        """
+        Runs get for each (url, preprocessed url), one after another and
+        puts the results on the queue. Used to request URLs for a single host
+
+        If summarizer is passed, HTML for pages which were requested is
+        summarized there, and the result is put on the queue once thats done
+        """
+        self._local.defer_summary = summarizer is not None
+        try:
+            for url, uurl in urls:
+                if stop.is_set():
+                    return
+                self._local.deferred = None
+                self._local.deferred_html = None
+                try:
+                    summ = self._get_preprocessed(uurl)
+                    # only summarize if this was just requested, not read from cache
+                    if summarizer is not None and summ is self._local.deferred:
+                        # unless an extractor set its own summary
+                        if summ.html_summary is None:
+                            html: str = self._local.deferred_html
+                            self._submit_summary(
+                                summarizer,
+                                html,
+                                partial(
+                                    self._summarized, url, uurl, summ, html, results, stop
+                                ),
+                            )
+                            continue
+                except Exception as e:
+                    self.logger.warning(f"Failed to get information for {uurl}: {e}")
+                    res = BatchResult(url=url, summary=None, error=e)
+                else:
+                    res = BatchResult(url=url, summary=summ, error=None)
+                if not _put_result(results, (uurl, res), stop):
+                    return
+        finally:
+            self._local.defer_summary = False
+            self._local.deferred = None
+            self._local.deferred_html = None
+
+    def _submit_summary(
+        self,
+        summarizer: "SummarizerPool",
+        html: str,
+        callback: Callable[["Future[str]"], None],
+    ) -> None:
+        """
+        Summarizes the HTML in the summarizer, or in this thread if it
+        can't accept work (e.g. a worker process was killed)
+        """
+        try:
+            summarizer.submit(html, callback)
+            return
+        except Exception as e:
+            self.logger.warning(f"Could not summarize in a worker process, summarizing here: {e}")
+        fut: "Future[str]" = Future()
+        try:
+            fut.set_result(self._summarize(html))
+        except Exception as e:
+            fut.set_exception(e)
+        callback(fut)
+
+    def _summarized(
+        self,
+        url: str,
+        uurl: str,
+        summary: Summary,
+        html: str,
+        results: "Queue[Tuple[str, BatchResult]]",
+        stop: threading.Event,
+        fut: "Future[str]",
+    ) -> None:
+        """Saves HTML summarized by the SummarizerPool, and puts the result on the queue"""
+        try:
+            html_summary = fut.result()
+            self._memoize_summary(html, html_summary)
+            self.summary_cache.put_attr(uurl, "html_summary", html_summary)
+            summary.html_summary = html_summary
+        except Exception as e:
+            # saved without a summary, like a page which wasn't HTML
+            self.logger.warning(f"Could not summarize HTML for {uurl}: {e}")
+        _put_result(results, (uurl, BatchResult(url=url, summary=summary, error=None)), stop)
+
+    def in_cache(self, url: str, preprocess_url: bool = True) -> bool:
         """Returns True if the URL already has cached information"""
-        uurl: str = self.preprocess_url(url)
+        uurl: str = self.preprocess_url(url) if preprocess_url else url
         return self.summary_cache.has(uurl)
 
-    def get_cache_dir(self, url: str) -> Optional[str]:
+    def get_cache_dir(self, url: str, preprocess_url: bool = True) -> Optional[str]:
         """
         If this URL is in cache, returns the location of the cache directory
-        Returns None if it couldn't find a matching directory
+        Returns None if it couldn't find a matching directory, or
+        if the backend doesn't store URLs in directories
         """
-        uurl: str = self.preprocess_url(url)
+        uurl: str = self.preprocess_url(url) if preprocess_url else url
+        if not isinstance(self.summary_cache, SummaryDirCache):
+            return None
         try:
             return self.summary_cache.dir_cache.get(uurl)
         except DirCacheMiss:
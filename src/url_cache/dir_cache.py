@@ -4,19 +4,44 @@ An hash-based, file system cache
 
 import os
 import shutil
-from typing import List
+import tempfile
+from typing import List, Optional
 from hashlib import md5
 
+from .locking import FileLock
+from .dir_index import DirIndex
+
 
 class DirCacheMiss(Exception):
     pass
 
 
+# entries are built in a directory starting with this in the hashed
+# directory, and then renamed to 000, 001, ... once they're complete
+STAGING_PREFIX = ".tmp-"
+
+# held while a directory is published into the hashed directory, so processes
+# can't claim the same slot, or create two directories for the same key,
+# and while files in its directories are replaced (see entry_lock)
+PUBLISH_LOCKFILE = ".publish.lock"
+
+
 def subdirs(path: str) -> List[str]:
     """
     Returns a list of subdirectores (that exist) for a existing directory
+
+    Ignores hidden directories, e.g. entries which are still being written
     """
-    return [f.path for f in os.scandir(path) if f.is_dir()]
+    return [f.path for f in os.scandir(path) if f.is_dir() and not f.name.startswith(".")]
+
+
+def fsync_path(path: str) -> None:
+    """Flushes a file (or a directory, so renames in it are saved) to disk"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
 
 
 def keyfile_matches_contents(key: str, path: str) -> bool:
@@ -44,26 +69,75 @@ class DirCache:
 
     The input/key to the cache is a string, which is typically a URL.
     This stores the key at <target_dir>/key
+
+    If index_path is given, keeps a DirIndex there, so a lookup is one query
+    instead of scanning the hash directory and reading each key file
+
+    If fsync is True, directories are flushed to disk before they're published
+
+    Any number of threads/processes can put into the same directory, publishing
+    a directory takes a lock on its hashed directory (files are written before
+    that, so different keys only wait on each other if their hashes collide)
     """
 
-    def __init__(self, loc: str):
+    def __init__(
+        self, loc: str, index_path: Optional[str] = None, fsync: bool = False
+    ):
         self.base: str = loc
+        self.fsync = fsync
         os.makedirs(self.base, exist_ok=True)
+        self.index: Optional[DirIndex] = None
+        if index_path is not None:
+            self.index = DirIndex(index_path, self.base)
+
+    def _indexed(self, key: str) -> Optional[str]:
+        """
+        The directory for the key from the index, if it still has a matching key file
+        """
+        assert self.index is not None
+        kdir = self.index.get(key)
+        if kdir is None:
+            return None
+        try:
+            if keyfile_matches_contents(key, os.path.join(kdir, "key")):
+                return kdir
+        except FileNotFoundError:
+            pass
+        # deleted/moved since it was indexed
+        self.index.remove(key)
+        return None
 
     def get(self, key: str) -> str:
         """
         Receives some string key as input.
         Returns the directory for that key if it exists, else raises DirCacheMiss
         """
+        if self.index is not None:
+            kdir = self._indexed(key)
+            if kdir is not None:
+                return kdir
         base: str = self.base_dir_hashed_path(key)
-        if not os.path.exists(base):
+        try:
+            kdir = self._scan(key, base)
+        except FileNotFoundError:
             raise DirCacheMiss("Base dir for hash doesn't exist: {}".format(base))
-        # check if keyfile matches any of the existing directories
+        if kdir is None:
+            raise DirCacheMiss("No matching keyfile found!")
+        return kdir
+
+    def _scan(self, key: str, base: str) -> Optional[str]:
+        """Checks if keyfile matches any of the existing directories in base"""
         for s in subdirs(base):
             target_key = os.path.join(s, "key")
-            if os.path.exists(target_key) and keyfile_matches_contents(key, target_key):
-                return s
-        raise DirCacheMiss("No matching keyfile found!")
+            try:
+                if keyfile_matches_contents(key, target_key):
+                    # created without the index (e.g. by another version, or moved by hand)
+                    if self.index is not None:
+                        self.index.put(key, s)
+                    return s
+            except FileNotFoundError:  # no keyfile, or deleted while scanning
+                continue
+        return None
 
     def put(self, key: str) -> str:
         """
@@ -85,26 +159,73 @@ class DirCache:
         If a hash collision occurs (a different key already exists there), this creates
         a new directory, starting with 001, 002, 003
         """
+        try:
+            return self.get(key)
+        except DirCacheMiss:
+            return self.publish(key, self.stage(key))
+
+    def stage(self, key: str) -> str:
+        """
+        Creates a hidden directory (with the keyfile) in the hashed directory for this key,
+        where files can be written before the directory is published
+        """
         base: str = self.base_dir_hashed_path(key)
         os.makedirs(base, exist_ok=True)
-        # check if keyfile matches any of the existing directories
-        for s in subdirs(base):
-            target_key = os.path.join(s, "key")
-            if os.path.exists(target_key) and keyfile_matches_contents(key, target_key):
-                return s
-        # if keyfile didn't match an existing one, put it in the first 'open' directory
-        # in this folder. Most of the time, this will be unique and just return
-        # ../000/
-        i = 0
-        while True:
-            possible_dir = os.path.join(base, str(i).zfill(3))
-            if not os.path.exists(possible_dir):
-                # create keyfile, and return directory
-                os.makedirs(possible_dir)
-                with open(os.path.join(possible_dir, "key"), "w") as kf:
-                    kf.write(key)
-                return possible_dir
-            i += 1
+        staged = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=base)
+        with open(os.path.join(staged, "key"), "w") as kf:
+            kf.write(key)
+        return staged
+
+    def publish(self, key: str, staged: str) -> str:
+        """
+        Renames a directory from stage into the first 'open' directory in the hashed
+        directory (most of the time, this will be unique and just return ../000/)
+
+        The rename is atomic, so other threads/processes see either
+        nothing or the complete directory. If another thread/process published
+        a directory for this key first, the staged files replace the files there
+        """
+        base: str = os.path.dirname(staged)
+        if self.fsync:
+            for root, _, files in os.walk(staged):
+                for name in files:
+                    fsync_path(os.path.join(root, name))
+                fsync_path(root)
+        with self.entry_lock(staged):
+            kdir = self._scan(key, base)
+            if kdir is not None:
+                self._merge(staged, kdir)
+                return kdir
+            i = 0
+            while True:
+                possible_dir = os.path.join(base, str(i).zfill(3))
+                if not os.path.exists(possible_dir):
+                    try:
+                        os.rename(staged, possible_dir)
+                    except OSError:
+                        # claimed by something which doesn't take the lock
+                        # (e.g. an older version, or without fcntl)
+                        if not os.path.exists(possible_dir):
+                            raise
+                        i += 1
+                        continue
+                    if self.fsync:
+                        fsync_path(base)
+                    if self.index is not None:
+                        self.index.put(key, possible_dir)
+                    return possible_dir
+                i += 1
+
+    def _merge(self, staged: str, kdir: str) -> None:
+        """Moves each file from a staged directory into kdir, replacing the files there"""
+        for root, _, files in os.walk(staged):
+            dest_dir = os.path.join(kdir, os.path.relpath(root, staged))
+            os.makedirs(dest_dir, exist_ok=True)
+            for name in files:
+                os.replace(os.path.join(root, name), os.path.join(dest_dir, name))
+            if self.fsync:
+                fsync_path(dest_dir)
+        shutil.rmtree(staged, ignore_errors=True)
 
     def exists(self, key: str) -> bool:
         """
@@ -125,10 +246,31 @@ class DirCache:
         try:
             kdir = self.get(key)
             shutil.rmtree(kdir)
+            if self.index is not None:
+                self.index.remove(key)
             return True
         except DirCacheMiss:
             return False
 
+    def entry_lock(self, kdir: str) -> FileLock:
+        """
+        Returns the FileLock for the hashed directory which contains kdir, which is
+        held while publishing a directory there, or changing files in one
+
+        Reading doesn't need the lock. This isn't reentrant, so it can't be held
+        while calling publish
+        """
+        return FileLock(os.path.join(os.path.dirname(kdir), PUBLISH_LOCKFILE))
+
+    def lock(self, key: str, name: str = ".lock") -> FileLock:
+        """
+        Returns a FileLock for a lockfile in the hashed base directory for this key,
+        which can be used to synchronize work on a key across processes
+
+        The lock is shared by any keys whose hash collides
+        """
+        return FileLock(os.path.join(self.base_dir_hashed_path(key), name))
+
     def base_dir_hashed_path(self, key: str) -> str:
         """
         Receives the key as input. Computes the corresponding base directory for the hash
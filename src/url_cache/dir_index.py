@@ -0,0 +1,82 @@
+"""
+An optional SQLite index in front of DirCache, mapping each key to its directory
+
+The directories are still the source of truth, the index is just a hint:
+a directory from the index is checked against its key file before its used,
+and keys which aren't in the index are searched for in the directory tree
+(and then added), so deleting or adding directories by hand still works
+"""
+
+import os
+import glob
+import sqlite3
+from typing import Optional, List, Tuple
+
+from .sqlite_utils import ThreadLocalConnection
+
+SCHEMA = ["CREATE TABLE IF NOT EXISTS dirs (key TEXT PRIMARY KEY, dir TEXT NOT NULL)"]
+
+
+class DirIndex:
+    """
+    Maps keys to directories (relative to 'base') in a SQLite database at 'path'
+
+    If the database doesn't exist, its built from the key files in 'base'
+    """
+
+    def __init__(self, path: str, base: str):
+        self.path = path
+        self.base = base
+        self._db = ThreadLocalConnection(self.path, SCHEMA)
+        if not os.path.exists(self.path):
+            self.rebuild()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self._db.conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the (absolute) directory for the key, if its in the index"""
+        row = self._conn.execute("SELECT dir FROM dirs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return os.path.join(self.base, row[0])
+
+    def put(self, key: str, path: str) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO dirs (key, dir) VALUES (?, ?)",
+            (key, os.path.relpath(path, self.base)),
+        )
+
+    def remove(self, key: str) -> None:
+        self._conn.execute("DELETE FROM dirs WHERE key = ?", (key,))
+
+    def __len__(self) -> int:
+        count: int = self._conn.execute("SELECT COUNT(*) FROM dirs").fetchone()[0]
+        return count
+
+    def rebuild(self) -> int:
+        """
+        Replaces the index with the key files in the directory tree,
+        returns how many keys were found
+        """
+        rows: List[Tuple[str, str]] = []
+        # <base>/4/3/7/b930db84b8079c2dd804a71936b5f/000/key
+        pattern = os.path.join(glob.escape(self.base), "?", "?", "?", "*", "*", "key")
+        for keyfile in glob.iglob(pattern):
+            try:
+                with open(keyfile, "r") as f:
+                    key = f.read()
+            except FileNotFoundError:  # deleted while scanning
+                continue
+            rows.append((key, os.path.relpath(os.path.dirname(keyfile), self.base)))
+        conn = self._conn
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM dirs")
+            conn.executemany("INSERT OR REPLACE INTO dirs (key, dir) VALUES (?, ?)", rows)
+        return len(rows)
+
+    def close(self) -> None:
+        """Closes this threads connection"""
+        self._db.close()
@@ -6,3 +6,15 @@ class URLCacheRequestException(URLCacheException):
     """Encountered a request error while requesting a URL"""
 
     pass
+
+
+class URLCacheNotModified(URLCacheException):
+    """A conditional request returned 304, the cached data is still up to date"""
+
+    pass
+
+
+class URLCacheOffline(URLCacheException):
+    """Offline mode is enabled, and this would have to make a request (e.g. the URL isn't cached)"""
+
+    pass
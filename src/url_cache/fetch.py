@@ -0,0 +1,185 @@
+"""
+Requests a URL with a single streamed GET request
+
+The response is shared between lassie (to extract metadata) and
+the HTML summarizer, instead of lassie making its own HEAD and GET requests
+(see lassie_utils.ResponseLassie)
+"""
+
+import re
+from typing import Optional, Tuple, List, Dict, NamedTuple, FrozenSet, TYPE_CHECKING
+
+from .common import Json
+
+if TYPE_CHECKING:
+    from requests import Response, Session
+
+HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml"}
+
+# content types which are too generic to trust, checks the body instead
+GENERIC_CONTENT_TYPES = {
+    "",
+    "application/octet-stream",
+    "binary/octet-stream",
+    "text/plain",
+}
+
+MAGIC_NUMBERS: List[Tuple[bytes, str]] = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF-", "application/pdf"),
+]
+
+HTML_MARKERS: Tuple[bytes, ...] = (
+    b"<!doctype html",
+    b"<html",
+    b"<head",
+    b"<body",
+    b"<title",
+)
+
+SNIFF_SIZE = 512
+CHUNK_SIZE = 64 * 1024
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class FetchLimits(NamedTuple):
+    """
+    Limits how much of a response is downloaded
+
+    max_body_size: number of bytes to read, larger bodies are truncated
+    allowed_types: content types to download the body for; for anything
+                   else the connection is closed after the headers
+    """
+
+    max_body_size: int = 5 * 1024 * 1024
+    allowed_types: FrozenSet[str] = frozenset(HTML_CONTENT_TYPES)
+
+
+class FetchResult(NamedTuple):
+    response: "Response"
+    # sniffed content type, without any parameters
+    mimetype: str
+    # if the body was larger than max_body_size and was cut off
+    truncated: bool
+
+
+def sniff_content_type(header: Optional[str], head: bytes) -> str:
+    """
+    Returns the mimetype (without parameters like charset) for a response
+
+    Uses the Content-Type header, unless its missing or too generic to
+    trust, in which case this checks the first bytes of the body
+
+    >>> sniff_content_type("text/html; charset=utf-8", b"")
+    'text/html'
+    >>> sniff_content_type("application/octet-stream", b"  <!DOCTYPE html><html>")
+    'text/html'
+    >>> sniff_content_type(None, b"\\x89PNG\\r\\n\\x1a\\n...")
+    'image/png'
+    """
+    mimetype = (header or "").split(";")[0].strip().casefold()
+    if mimetype not in GENERIC_CONTENT_TYPES:
+        return mimetype
+    for magic, sniffed in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return sniffed
+    # strip whitespace and the UTF-8 BOM
+    start = head.lstrip(b" \t\r\n\xef\xbb\xbf").lower()
+    if start.startswith(HTML_MARKERS) or b"<html" in start:
+        return "text/html"
+    return mimetype or "application/octet-stream"
+
+
+def is_html(mimetype: str) -> bool:
+    return mimetype in HTML_CONTENT_TYPES
+
+
+def response_validators(resp: "Response") -> Json:
+    """
+    Saves the headers used to revalidate a response later
+    (etag, last_modified, and max_age in seconds from Cache-Control)
+    """
+    validators: Json = {}
+    if "ETag" in resp.headers:
+        validators["etag"] = resp.headers["ETag"]
+    if "Last-Modified" in resp.headers:
+        validators["last_modified"] = resp.headers["Last-Modified"]
+    max_age = MAX_AGE_RE.search(resp.headers.get("Cache-Control", ""))
+    if max_age is not None:
+        validators["max_age"] = int(max_age.group(1))
+    return validators
+
+
+def conditional_headers(validators: Json) -> Dict[str, str]:
+    """
+    Converts the saved validators to headers for a conditional request
+    """
+    headers: Dict[str, str] = {}
+    if "etag" in validators:
+        headers["If-None-Match"] = validators["etag"]
+    if "last_modified" in validators:
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _needs_sniffing(header: Optional[str]) -> bool:
+    return (header or "").split(";")[0].strip().casefold() in GENERIC_CONTENT_TYPES
+
+
+def fetch_response(
+    session: "Session",
+    url: str,
+    validators: Optional[Json] = None,
+    limits: Optional[FetchLimits] = None,
+) -> FetchResult:
+    """
+    Makes a streamed GET request to the URL
+
+    The body is only downloaded if the content type is in limits.allowed_types
+    (HTML, by default). Otherwise the connection is closed after the headers
+    (or after the first few bytes, if the content type has to be sniffed), like
+    lassie does with 'handle_file_content' (it only saves metadata for files).
+    Bodies larger than limits.max_body_size are truncated
+
+    If validators (from response_validators) are passed, this makes a
+    conditional request, which returns a 304 if the page hasn't changed
+    """
+    from lassie.utils import determine_user_agent  # type: ignore[import]
+
+    lim = FetchLimits() if limits is None else limits
+    headers: Dict[str, str] = {
+        "User-Agent": determine_user_agent(session.headers.get("User-Agent"))
+    }
+    if validators:
+        headers.update(conditional_headers(validators))
+    resp: "Response" = session.get(url, stream=True, headers=headers)
+    content_type: Optional[str] = resp.headers.get("Content-Type")
+    head: bytes = b""
+    if _needs_sniffing(content_type):
+        head = resp.raw.read(min(SNIFF_SIZE, lim.max_body_size), decode_content=True)
+    mimetype = sniff_content_type(content_type, head)
+
+    truncated = False
+    if mimetype in lim.allowed_types and resp.status_code != 304:
+        parts: List[bytes] = [head]
+        size = len(head)
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            if size + len(chunk) > lim.max_body_size:
+                parts.append(chunk[: lim.max_body_size - size])
+                truncated = True
+                break
+            parts.append(chunk)
+            size += len(chunk)
+        body = b"".join(parts)
+    else:
+        body = b""
+    # release the connection, or close it if the rest of the body wasn't read
+    resp.close()
+    # save the body on the response, so resp.text/resp.content work as usual
+    resp._content = body
+    resp._content_consumed = True
+    return FetchResult(response=resp, mimetype=mimetype, truncated=truncated)
@@ -1,20 +1,170 @@
 """
 Methods to parse HTML
+
+Summarizers convert a HTML document into a (smaller) summary. Which one
+URLCache uses is set with the 'summarizer' option, additional summarizers
+can be added to SUMMARIZERS
 """
 
-import readability  # type: ignore[import]
+import re
+import html
+from abc import ABC, abstractmethod
+from typing import Dict, List, Type, Union
 
 from .exceptions import URLCacheException
 
+# tags which are never part of the main text of a page
+BOILERPLATE_TAGS: List[str] = [
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "iframe",
+    "svg",
+    "canvas",
+    "form",
+    "button",
+    "select",
+    "nav",
+    "header",
+    "footer",
+    "aside",
+    "head",
+]
+
+BLOCK_TAGS: List[str] = [
+    "p",
+    "div",
+    "li",
+    "pre",
+    "blockquote",
+    "td",
+    "th",
+    "dd",
+    "dt",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "section",
+    "article",
+    "br",
+]
+
+# lxml doesn't accept an encoding declaration in an (already decoded) str,
+# e.g. <?xml version="1.0" encoding="utf-8"?> at the start of XHTML pages
+XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+# a private use character, marks the end of a block while extracting text
+BLOCK_SEP = "\ue000"
+
+# documents larger than this are summarized with the fast summarizer by 'auto'
+AUTO_SIZE_THRESHOLD = 512 * 1024
+
+
+class Summarizer(ABC):
+    """
+    Converts a HTML document into a summary, which is saved to the html_summary file
+
+    Summarizers are pickled and sent to worker processes by get_many
+    (see summarize_workers), so they shouldn't hold any unpicklable state
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    def summarize(self, html_text: str) -> str:
+        raise NotImplementedError
+
+
+class ReadabilitySummarizer(Summarizer):
+    """
+    Uses readability to extract the main content, keeps its HTML structure
+    """
+
+    name = "readability"
+
+    def summarize(self, html_text: str) -> str:
+        import readability  # type: ignore[import]
+
+        doc: readability.Document = readability.Document(html_text)
+        summary: str = doc.summary()
+        return summary
+
+
+class LxmlTextSummarizer(Summarizer):
+    """
+    Parses the document once with lxml, removes boilerplate tags (scripts,
+    navigation, footers) and returns the remaining text, one <p> for each block
+
+    Much faster and uses less memory than readability, but keeps less structure
+    """
+
+    name = "lxml_text"
+
+    def summarize(self, html_text: str) -> str:
+        import lxml.html  # type: ignore[import]
+
+        doc = lxml.html.document_fromstring(XML_DECLARATION.sub("", html_text, count=1))
+        for el in list(doc.iter(*BOILERPLATE_TAGS)):
+            # drop_tree keeps the tail, the text after the element in its parent
+            el.drop_tree()
+        # mark the end of each block, so text from different blocks isn't joined
+        # (newlines in the source are just whitespace, like a browser renders them)
+        for el in doc.iter(*BLOCK_TAGS):
+            el.tail = BLOCK_SEP + (el.tail or "")
+        text: str = doc.text_content()
+        paragraphs = [" ".join(blk.split()) for blk in text.split(BLOCK_SEP)]
+        return "\n".join(
+            f"<p>{html.escape(para, quote=False)}</p>" for para in paragraphs if para
+        )
+
+
+class AutoSummarizer(Summarizer):
+    """
+    Uses readability for normal sized documents, and the
+    lxml text summarizer for documents larger than 'threshold' characters
+    """
+
+    name = "auto"
+
+    def __init__(self, threshold: int = AUTO_SIZE_THRESHOLD):
+        self.threshold = threshold
+        self.readability = ReadabilitySummarizer()
+        self.lxml_text = LxmlTextSummarizer()
+
+    def summarize(self, html_text: str) -> str:
+        if len(html_text) > self.threshold:
+            return self.lxml_text.summarize(html_text)
+        return self.readability.summarize(html_text)
+
+
+SUMMARIZERS: Dict[str, Type[Summarizer]] = {
+    ReadabilitySummarizer.name: ReadabilitySummarizer,
+    LxmlTextSummarizer.name: LxmlTextSummarizer,
+    AutoSummarizer.name: AutoSummarizer,
+}
+
+
+def get_summarizer(name: str) -> Summarizer:
+    """Create the summarizer registered in SUMMARIZERS with this name"""
+    if name not in SUMMARIZERS:
+        raise URLCacheException(
+            f"Unknown summarizer {name}, expected one of {', '.join(SUMMARIZERS)}"
+        )
+    return SUMMARIZERS[name]()
+
 
 def summarize_html(
-    html_text: str,
+    html_text: str, summarizer: Union[str, Summarizer] = "readability"
 ) -> str:
     """
-    Uses readability to summarize the HTML response into a summary
+    Uses a summarizer (readability, by default) to summarize the HTML response into a summary
     """
     if html_text.strip() == "":
         raise URLCacheException("No html provided to summarize")
-    doc: readability.Document = readability.Document(html_text)
-    summary: str = doc.summary()
-    return summary
+    if isinstance(summarizer, str):
+        summarizer = get_summarizer(summarizer)
+    return summarizer.summarize(html_text)
@@ -0,0 +1,47 @@
+"""
+Extracts page metadata with lassie
+"""
+
+import threading
+from typing import Tuple, Any
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+from lassie import Lassie  # type: ignore[import]
+
+from .common import Json
+from .fetch import is_html
+
+
+class ResponseLassie(Lassie):  # type: ignore[misc]
+    """
+    A Lassie which parses a response that was already fetched
+    with fetch_response, instead of making its own requests
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        # the response being parsed, per-thread so this can be shared
+        self._local = threading.local()
+
+    def parse(self, url: str, resp: Response, mimetype: str, **kwargs: Any) -> Json:
+        """
+        Extract metadata from the response. kwargs are passed to Lassie.fetch
+        """
+        self._local.response = (resp, mimetype)
+        try:
+            data: Json = self.fetch(url, **kwargs)
+            return data
+        finally:
+            self._local.response = None
+
+    def _retrieve_headers(self, url: str) -> Tuple[Any, int]:
+        resp, mimetype = self._local.response
+        headers: CaseInsensitiveDict[str] = CaseInsensitiveDict(resp.headers)
+        # lassie only treats 'text/html' as a page, replace it with the sniffed type
+        headers["Content-Type"] = "text/html" if is_html(mimetype) else mimetype
+        return headers, resp.status_code
+
+    def _retrieve_content(self, url: str) -> Tuple[str, int]:
+        resp, _ = self._local.response
+        return resp.text, resp.status_code
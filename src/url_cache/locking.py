@@ -0,0 +1,102 @@
+"""
+Makes sure only one request for a key is in flight at a time,
+across threads (SingleFlight) and processes (FileLock)
+"""
+
+import os
+import threading
+from types import TracebackType
+from typing import Dict, Generic, TypeVar, Callable, Optional, Type
+
+try:
+    import fcntl
+
+    HAS_FCNTL = True
+except ImportError:  # windows
+    HAS_FCNTL = False
+
+
+T = TypeVar("T")
+
+
+class FileLock:
+    """
+    An exclusive advisory lock (flock) on a file, blocks until its acquired
+
+    On platforms without fcntl, this doesn't lock anything
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if HAS_FCNTL:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        if HAS_FCNTL:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.release()
+
+
+class _Call(Generic[T]):
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesces concurrent calls for the same key -- the first caller runs
+    the function, and any callers for that key which arrive while its
+    running wait for and receive the same result (or exception)
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call[T]] = {}
+
+    def do(self, key: str, func: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            assert call.result is not None
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
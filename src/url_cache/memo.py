@@ -0,0 +1,102 @@
+"""
+Remembers HTML summaries by a hash of the HTML they were created from,
+so summarizing the same document again (e.g. refreshing a page which
+hasn't changed, or URLs which redirect to the same page) is just a file read
+"""
+
+import os
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, List, Tuple
+
+DEFAULT_MEMO_SIZE = 64 * 1024 * 1024
+# when the memo is larger than max_bytes, evicts till its this fraction of it
+LOW_WATER_MARK = 0.9
+
+
+def content_hash(html: str, salt: str = "") -> str:
+    """
+    >>> content_hash("<p>hi</p>")[:16]
+    '0a4735281db70022'
+    """
+    h = hashlib.sha256(salt.encode())
+    h.update(html.encode("utf-8", errors="surrogatepass"))
+    return h.hexdigest()
+
+
+class SummaryMemo:
+    """
+    A directory of summaries, each named by the hash of the HTML it summarizes
+
+    Once the summaries take up more than max_bytes, the least recently used
+    ones are removed. A hit updates the files mtime, so mtime is the last use
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MEMO_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # estimated size of the directory, scanned the first time its needed
+        self._size: Optional[int] = None
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key[2:]
+
+    def get(self, key: str) -> Optional[str]:
+        p = self._path(key)
+        try:
+            summary = p.read_text()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(p)
+        except FileNotFoundError:  # evicted by another process
+            pass
+        return summary
+
+    def put(self, key: str, summary: str) -> None:
+        p = self._path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file and rename, so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=str(p.parent), prefix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(summary)
+        os.replace(tmp, p)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += p.stat().st_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _files(self) -> List[Tuple[float, int, Path]]:
+        files: List[Tuple[float, int, Path]] = []
+        for p in self.directory.glob("*/*"):
+            if p.name.startswith("."):
+                continue
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        return files
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._files())
+
+    def _evict(self) -> None:
+        files = sorted(self._files())
+        size = sum(size for _, size, _ in files)
+        target = self.max_bytes * LOW_WATER_MARK
+        for _, fsize, p in files:
+            if size <= target:
+                break
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            size -= fsize
+        self._size = size
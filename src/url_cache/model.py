@@ -17,6 +17,9 @@ class Summary:
     HTML Summary (parsed with readability)
     Timestamp (when this information was scraped)
     Data (any other data extracted from this site)
+    Validators (ETag/Last-Modified/max-age, to revalidate the page when it expires)
+    Status (how the last request went -- status_code, error (class name),
+            attempts, consecutive failures, checked_at (epoch))
     """
 
     url: str
@@ -26,6 +29,8 @@ class Summary:
     metadata: Json = field(default_factory=dict)
     html_summary: Optional[str] = None
     timestamp: Optional[datetime] = None
+    validators: Json = field(default_factory=dict)
+    status: Json = field(default_factory=dict)
 
 
 def _default(o: Any) -> Any:
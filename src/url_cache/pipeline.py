@@ -0,0 +1,59 @@
+"""
+Summarizes HTML in worker processes, so that threads fetching URLs
+in get_many aren't blocked by (CPU-bound) readability
+"""
+
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Callable, Optional
+
+from .html_utils import summarize_html, Summarizer
+
+
+class SummarizerPool:
+    """
+    Runs summarize_html with the summarizer in a process pool
+
+    At most 'max_pending' documents are queued/being summarized at a time,
+    submit blocks until there's room, so fetching can't get too far ahead
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        summarizer: Summarizer,
+        max_pending: Optional[int] = None,
+    ):
+        self.summarizer = summarizer
+        self.workers = max(1, workers)
+        self.max_pending = self.workers * 2 if max_pending is None else max_pending
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        # spawn instead of fork, the parent process is running fetch threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def submit(self, html: str, callback: Callable[["Future[str]"], None]) -> None:
+        """
+        Summarize the html in a worker process, callback is called
+        with the finished future (in a thread in this process)
+        """
+        self._slots.acquire()
+        try:
+            fut: "Future[str]" = self._executor.submit(
+                summarize_html, html, self.summarizer
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+
+        def _done(f: "Future[str]") -> None:
+            self._slots.release()
+            callback(f)
+
+        fut.add_done_callback(_done)
+
+    def shutdown(self) -> None:
+        """Waits for any pending documents to be summarized"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,147 @@
+"""
+Per-host rate limiting, so that a request only waits if
+the host it is going to has been requested recently
+"""
+
+import time
+import threading
+from collections import deque
+from typing import NamedTuple, List, Dict, Deque, Optional
+
+from .utils import url_host
+
+# a throttled host is never slowed down to less than this fraction of its rate
+MIN_RATE_SCALE = 1 / 64
+# how much of the configured rate is given back after each successful request
+RATE_INCREASE = 0.05
+
+
+class RateLimit(NamedTuple):
+    """
+    Allow at most 'calls' requests in any 'period' seconds
+    """
+
+    calls: int
+    period: float
+
+
+class HostLimiter:
+    """
+    Keeps track of when requests to a single host were made, and
+    how long the next request has to wait to stay under its RateLimits
+
+    After the host rate limits us, 'throttle' halves the allowed rate,
+    and each successful request ('recover') adds a bit of it back (AIMD)
+    """
+
+    def __init__(self, limits: List[RateLimit]):
+        # a limit with no period doesn't limit anything
+        self.limits: List[RateLimit] = [
+            lim for lim in limits if lim.calls > 0 and lim.period > 0
+        ]
+        maxlen = max((lim.calls for lim in self.limits), default=1)
+        # start times of the most recent requests, in ascending order
+        self._history: Deque[float] = deque(maxlen=maxlen)
+        # fraction of the configured rate currently allowed
+        self.scale: float = 1.0
+        # no requests are made before this time, set by 'pause'
+        self._blocked_until: float = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Reserves a slot for the next request to this host,
+        returns how many seconds the caller should wait before making it
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._blocked_until)
+            for lim in self.limits:
+                if len(self._history) >= lim.calls:
+                    # the request made 'calls' requests ago has to be at least 'period' seconds old
+                    start = max(
+                        start, self._history[-lim.calls] + lim.period / self.scale
+                    )
+            self._history.append(start)
+            return start - now
+
+    def wait(self) -> None:
+        """Blocks until the next request to this host is allowed"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Don't allow any requests to this host for the next 'seconds'"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def throttle(self) -> None:
+        """The host rate limited a request, halve the allowed rate"""
+        with self._lock:
+            self.scale = max(MIN_RATE_SCALE, self.scale / 2)
+
+    def recover(self) -> None:
+        """A request succeeded, slowly increase the allowed rate back to the configured limits"""
+        with self._lock:
+            self.scale = min(1.0, self.scale + RATE_INCREASE)
+
+
+class RateLimitScheduler:
+    """
+    Maps hosts to HostLimiters
+
+    Hosts configured with 'configure' also match their subdomains, so
+    configuring 'youtube.com' also applies to 'www.youtube.com', and they
+    share the same budget. Any other host gets its own limiter using the default limits
+    """
+
+    def __init__(self, default: Optional[List[RateLimit]] = None):
+        self.default: List[RateLimit] = [] if default is None else default
+        self.host_limits: Dict[str, List[RateLimit]] = {}
+        self._limiters: Dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, host: str, limits: List[RateLimit]) -> None:
+        """Set the rate limits for a host (and its subdomains)"""
+        host = host.casefold()
+        with self._lock:
+            self.host_limits[host] = limits
+            # reset the limiter, if requests were already made
+            self._limiters.pop(host, None)
+
+    def _configured_host(self, host: str) -> Optional[str]:
+        parts = host.split(".")
+        for i in range(len(parts)):
+            suffix = ".".join(parts[i:])
+            if suffix in self.host_limits:
+                return suffix
+        return None
+
+    def limiter(self, url: str) -> HostLimiter:
+        """Returns the HostLimiter which applies to this URL"""
+        host = url_host(url)
+        with self._lock:
+            configured = self._configured_host(host)
+            key = host if configured is None else configured
+            if key not in self._limiters:
+                limits = (
+                    self.default if configured is None else self.host_limits[configured]
+                )
+                self._limiters[key] = HostLimiter(limits)
+            return self._limiters[key]
+
+    def wait(self, url: str) -> None:
+        """Blocks until a request to this URL is allowed"""
+        self.limiter(url).wait()
+
+    def throttle(self, url: str, pause: float = 0) -> None:
+        """Slow down requests to this URLs host, and don't make any for 'pause' seconds"""
+        limiter = self.limiter(url)
+        limiter.throttle()
+        if pause > 0:
+            limiter.pause(pause)
+
+    def recover(self, url: str) -> None:
+        """Speed requests to this URLs host back up"""
+        self.limiter(url).recover()
@@ -0,0 +1,88 @@
+"""
+Refreshing expired entries in the background, used when
+the stale_while_revalidate option is enabled
+"""
+
+import os
+import logging
+import threading
+from queue import Queue
+from pathlib import Path
+from typing import Callable, List, Set, Optional, Any
+
+from .locking import FileLock
+
+
+class RefreshQueue:
+    """
+    A persistent queue of URLs which should be refreshed, saved one
+    per line in a file so another process (url_cache refresh) can drain it
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock_path = str(path.parent / f".{path.name}.lock")
+
+    def push(self, url: str) -> None:
+        with FileLock(self._lock_path):
+            with self.path.open("a") as f:
+                f.write(url + "\n")
+
+    def pop_all(self) -> List[str]:
+        """Returns (unique) queued URLs in the order they were added, and empties the queue"""
+        with FileLock(self._lock_path):
+            if not self.path.exists():
+                return []
+            lines = self.path.read_text().splitlines()
+            os.truncate(self.path, 0)
+        return list(dict.fromkeys(ln for ln in lines if ln.strip()))
+
+    def __len__(self) -> int:
+        if not self.path.exists():
+            return 0
+        return len(set(ln for ln in self.path.read_text().splitlines() if ln.strip()))
+
+
+class BackgroundRefresher:
+    """
+    Runs func for each submitted URL on a daemon thread, one at a time.
+    A URL which is already waiting to be refreshed isn't added again
+    """
+
+    def __init__(self, func: Callable[[str], Any], logger: logging.Logger):
+        self.func = func
+        self.logger = logger
+        self._queue: "Queue[str]" = Queue()
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, url: str) -> bool:
+        """Returns False if this URL was already queued"""
+        with self._lock:
+            if url in self._pending:
+                return False
+            self._pending.add(url)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="url_cache-refresh", daemon=True
+                )
+                self._thread.start()
+        self._queue.put(url)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            url = self._queue.get()
+            try:
+                self.func(url)
+            except Exception as e:
+                self.logger.warning(f"Failed to refresh {url}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(url)
+                self._queue.task_done()
+
+    def join(self) -> None:
+        """Blocks till every submitted URL has been refreshed"""
+        self._queue.join()
@@ -0,0 +1,212 @@
+"""
+Retries requests which were rate limited (or failed to connect),
+shared by URLCache and the site extractors
+
+Waits as long as the server asks to with the Retry-After header, else
+uses exponential backoff. Each delay is jittered, and each host has a
+budget of retries, so a host which keeps failing doesn't hold up a batch
+"""
+
+import time
+import random
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import (
+    NamedTuple,
+    Optional,
+    Callable,
+    Dict,
+    Deque,
+    Tuple,
+    Type,
+    TypeVar,
+    TYPE_CHECKING,
+)
+
+from .rate_limit import RateLimitScheduler
+from .utils import url_host
+
+if TYPE_CHECKING:
+    from requests import Response, RequestException
+
+# statuses which mean 'try again later'
+RETRY_STATUSES = frozenset([429, 503])
+
+T = TypeVar("T")
+
+
+class RetryPolicy(NamedTuple):
+    """
+    max_tries: total number of attempts for a request
+    base_delay: delay before the first retry if the server doesn't send
+                Retry-After, doubled for each retry after that
+    max_delay: the longest to wait before a retry, even if Retry-After is longer
+    jitter: up to this fraction of each delay is randomized
+    budget: at most this many retries to a host in any 'budget_period' seconds
+    """
+
+    max_tries: int = 3
+    base_delay: float = 2.0
+    max_delay: float = 120.0
+    jitter: float = 0.25
+    budget: int = 10
+    budget_period: float = 60.0
+
+
+def parse_retry_after(
+    value: Optional[str], now: Optional[datetime] = None
+) -> Optional[float]:
+    """
+    Parses a Retry-After header, which is either a number of seconds or
+    a HTTP-date. Returns None if its missing or can't be parsed
+
+    >>> parse_retry_after("120")
+    120.0
+    >>> parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=datetime(2015, 10, 21, 7, 27, tzinfo=timezone.utc))
+    60.0
+    >>> parse_retry_after("soon") is None
+    True
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    if now is None:
+        now = datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+class RetryBudget:
+    """
+    Keeps track of how many retries were made to each host recently
+    """
+
+    def __init__(self, budget: int, period: float):
+        self.budget = budget
+        self.period = period
+        self._retries: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, host: str) -> bool:
+        """Returns True if there's a retry left for this host, and uses it"""
+        with self._lock:
+            now = time.monotonic()
+            history = self._retries.setdefault(host, deque())
+            while history and history[0] <= now - self.period:
+                history.popleft()
+            if len(history) >= self.budget:
+                return False
+            history.append(now)
+            return True
+
+
+def _retryable_error(e: BaseException) -> bool:
+    # a connection error, or a HTTPError (from raise_for_status) with a retryable status
+    resp: Optional["Response"] = getattr(e, "response", None)
+    return resp is None or resp.status_code in RETRY_STATUSES or resp.status_code >= 500
+
+
+class Retrier:
+    """
+    Calls a function which makes a request, retrying it if the response has a
+    RETRY_STATUSES status code, or if it raises one of 'retry_on'
+
+    When a host asks us to slow down, this throttles the host in the scheduler,
+    and each successful request lets the scheduler speed it back up
+    """
+
+    def __init__(
+        self,
+        policy: Optional[RetryPolicy] = None,
+        scheduler: Optional[RateLimitScheduler] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.policy = RetryPolicy() if policy is None else policy
+        self.scheduler = scheduler
+        self.logger = logging.getLogger(__name__) if logger is None else logger
+        self.budget = RetryBudget(self.policy.budget, self.policy.budget_period)
+
+    def delay(self, attempt: int, resp: Optional["Response"] = None) -> float:
+        """How long to wait after the 'attempt'th try, before trying again"""
+        pol = self.policy
+        retry_after: Optional[float] = None
+        if resp is not None:
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+        if retry_after is not None:
+            # wait at least as long as the server asked, add jitter on top
+            return min(pol.max_delay, retry_after * (1 + pol.jitter * random.random()))
+        backoff = min(pol.max_delay, pol.base_delay * (2.0 ** (attempt - 1)))
+        return backoff * (1 - pol.jitter * random.random())
+
+    def call(
+        self,
+        url: str,
+        func: Callable[[], T],
+        *,
+        response: Optional[Callable[[T], "Response"]] = None,
+        retry_on: Tuple[Type["RequestException"], ...] = (),
+    ) -> T:
+        """
+        Calls func, retrying it up to policy.max_tries times
+
+        response: gets the Response from what func returns, if func doesn't return one
+        retry_on: exceptions to retry on, else they're raised immediately
+
+        If all the retries are used up (or the host is out of its retry budget),
+        returns the last result, or raises the last exception
+        """
+        from requests import Response
+
+        host = url_host(url)
+        attempt = 0
+        while True:
+            attempt += 1
+            resp: Optional["Response"] = None
+            try:
+                result = func()
+            except retry_on as e:
+                if not _retryable_error(e) or not self._can_retry(host, attempt):
+                    raise
+                resp = getattr(e, "response", None)
+                self.logger.warning(f"Request to {url} failed: {e}")
+            else:
+                if response is not None:
+                    resp = response(result)
+                elif isinstance(result, Response):
+                    resp = result
+                if resp is None or resp.status_code not in RETRY_STATUSES:
+                    if self.scheduler is not None:
+                        self.scheduler.recover(url)
+                    return result
+                if not self._can_retry(host, attempt):
+                    return result
+            wait = self.delay(attempt, resp)
+            if (
+                self.scheduler is not None
+                and resp is not None
+                and resp.status_code in RETRY_STATUSES
+            ):
+                # slow down every request to this host, not just this one
+                self.scheduler.throttle(url, pause=wait)
+            self.logger.warning(
+                f"Waiting {wait:0.1f} seconds before retrying {url} (attempt {attempt})"
+            )
+            time.sleep(wait)
+
+    def _can_retry(self, host: str, attempt: int) -> bool:
+        if attempt >= self.policy.max_tries:
+            return False
+        if not self.budget.take(host):
+            self.logger.warning(f"Out of retries for {host}, not retrying")
+            return False
+        return True
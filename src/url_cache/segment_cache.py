@@ -0,0 +1,565 @@
+"""
+An append-only SummaryCache for large, read-mostly caches
+
+Summaries are serialized into records, which are appended to segment files
+(000001.seg, 000002.seg, ...). A sorted index of the MD5 hash of each URL
+(the same hash DirCache uses) to the (segment, offset, length) of its
+latest record is read with mmap, so a lookup is a binary search in
+the index and one pread, instead of walking directories
+
+Replacing or deleting a URL appends a new record, the old one is left in
+its segment until compaction rewrites the live records into new segments
+
+The segments are the source of truth, the index file is rewritten every
+FLUSH_EVERY writes (and by flush/compact), records appended after that
+are found by scanning the end of the segments when the cache is opened
+"""
+
+import os
+import mmap
+import zlib
+import struct
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Optional,
+    List,
+    Dict,
+    Any,
+    Iterator,
+    Tuple,
+    NamedTuple,
+)
+
+from .model import Summary
+from .dir_cache import DirCache, DirCacheMiss
+from .locking import FileLock
+from .summary_cache import SummaryCache, FileParser, hashed_lock
+
+# magic, flags, length of the url, length of the fields, crc32 of the url and fields
+RECORD_HEADER = struct.Struct("<4sBIII")
+RECORD_MAGIC = b"UCR1"
+# length of the name, length of the value
+FIELD_HEADER = struct.Struct("<HI")
+# the record for a url which was deleted
+TOMBSTONE = 1
+
+# magic, version, the segment and offset the index includes records up to, number of entries
+INDEX_HEADER = struct.Struct("<4sIIQQ")
+INDEX_MAGIC = b"UCIX"
+INDEX_VERSION = 1
+# md5 digest of the url, segment, offset, length
+INDEX_ENTRY = struct.Struct("<16sIQI")
+INDEX_FILE = "index"
+WRITE_LOCKFILE = ".write.lock"
+
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+# rewrite the index after this many records were appended since it was written
+FLUSH_EVERY = 4096
+# compact in the background when more than this fraction of the segments is superseded records
+COMPACT_RATIO = 0.5
+COMPACT_MIN_BYTES = 16 * 1024 * 1024
+
+
+class Location(NamedTuple):
+    segment: int
+    offset: int
+    length: int
+
+
+class Record(NamedTuple):
+    url: str
+    flags: int
+    fields: List[Tuple[str, bytes]]
+
+
+def _digest(url: str) -> bytes:
+    return bytes.fromhex(DirCache.hash_key(url))
+
+
+def encode_record(url: str, fields: List[Tuple[str, bytes]], flags: int = 0) -> bytes:
+    """
+    >>> data = encode_record("https://a.com", [("metadata", b"{}")])
+    >>> decode_record(data)
+    Record(url='https://a.com', flags=0, fields=[('metadata', b'{}')])
+    """
+    body = bytearray()
+    for name, value in fields:
+        bname = name.encode()
+        body += FIELD_HEADER.pack(len(bname), len(value))
+        body += bname
+        body += value
+    burl = url.encode()
+    crc = zlib.crc32(body, zlib.crc32(burl))
+    return RECORD_HEADER.pack(RECORD_MAGIC, flags, len(burl), len(body), crc) + burl + body
+
+
+def _record_length(data: bytes, pos: int) -> Optional[int]:
+    """
+    The length of the record at 'pos', or None if its incomplete or corrupt
+    (e.g. a write which was interrupted by a crash)
+    """
+    if len(data) - pos < RECORD_HEADER.size:
+        return None
+    magic, _, url_len, body_len, crc = RECORD_HEADER.unpack_from(data, pos)
+    length: int = RECORD_HEADER.size + url_len + body_len
+    if magic != RECORD_MAGIC or len(data) - pos < length:
+        return None
+    start = pos + RECORD_HEADER.size
+    url_crc = zlib.crc32(data[start : start + url_len])
+    if zlib.crc32(data[start + url_len : pos + length], url_crc) != crc:
+        return None
+    return length
+
+
+def decode_record(data: bytes) -> Record:
+    _, flags, url_len, body_len, _ = RECORD_HEADER.unpack_from(data, 0)
+    pos = RECORD_HEADER.size
+    url = data[pos : pos + url_len].decode()
+    pos += url_len
+    end = pos + body_len
+    fields: List[Tuple[str, bytes]] = []
+    while pos < end:
+        name_len, value_len = FIELD_HEADER.unpack_from(data, pos)
+        pos += FIELD_HEADER.size
+        name = data[pos : pos + name_len].decode()
+        pos += name_len
+        fields.append((name, bytes(data[pos : pos + value_len])))
+        pos += value_len
+    return Record(url=url, flags=flags, fields=fields)
+
+
+class SummarySegmentCache(SummaryCache):
+    """
+    Stores records in append-only segment files in 'directory', see the module docstring
+
+    One process writes at a time (appends are serialized with a lockfile), any
+    number of threads/processes can read. Before each lookup, this checks if
+    another process appended to (or compacted) the segments, and reads any new records
+
+    URLs with colliding MD5 hashes replace each other (get checks the URL
+    in the record, so it never returns data for a different URL)
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        file_parsers: Optional[List[FileParser[Any]]] = None,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        auto_compact: bool = True,
+    ):
+        super().__init__(file_parsers=file_parsers)
+        self.directory: Path = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self.auto_compact = auto_compact
+        self.lock_dir: Path = self.directory / ".locks"
+        self.logger = logging.getLogger(__name__)
+        self._write_lock_path = str(self.directory / WRITE_LOCKFILE)
+        # held while reading/changing any of the state below
+        self._lock = threading.RLock()
+        self._fds: Dict[int, int] = {}
+        self._append_fd: Optional[Tuple[int, int]] = None
+        self._mm: Optional[mmap.mmap] = None
+        self._count = 0
+        # records newer than the index file, None if the url was deleted
+        self._recent: Dict[bytes, Optional[Location]] = {}
+        # (segment, offset) of the end of the last record that's been read
+        self._tail = (1, 0)
+        self._total_bytes = 0
+        self._live_bytes = 0
+        self._compactor: Optional[threading.Thread] = None
+        self.reload()
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:06d}.seg")
+
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(name[:-4])
+            for name in os.listdir(self.directory)
+            if name.endswith(".seg") and name[:-4].isdigit()
+        )
+
+    def _fd(self, segment: int) -> int:
+        fd = self._fds.get(segment)
+        if fd is None:
+            fd = os.open(self._segment_path(segment), os.O_RDONLY)
+            self._fds[segment] = fd
+        return fd
+
+    def _segments_size(self, before: Optional[int] = None) -> int:
+        """Total size of the segments (with a number less than 'before')"""
+        total = 0
+        for seg in self._segments():
+            if before is not None and seg >= before:
+                continue
+            try:
+                total += os.path.getsize(self._segment_path(seg))
+            except FileNotFoundError:  # removed by compaction
+                pass
+        return total
+
+    def _close_files(self) -> None:
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+        if self._append_fd is not None:
+            os.close(self._append_fd[1])
+            self._append_fd = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def reload(self) -> None:
+        """Re-reads the index and segments, e.g. after another process compacted them"""
+        with self._lock:
+            self._close_files()
+            self._recent.clear()
+            self._count = 0
+            segments = self._segments()
+            self._tail = (segments[0] if segments else 1, 0)
+            self._live_bytes = 0
+            index_path = os.path.join(self.directory, INDEX_FILE)
+            try:
+                with open(index_path, "rb") as f:
+                    self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                pass
+            if self._mm is not None:
+                magic, version, seg, off, count = INDEX_HEADER.unpack_from(self._mm, 0)
+                if magic == INDEX_MAGIC and version == INDEX_VERSION:
+                    self._count = count
+                    self._tail = (seg, off)
+                    for entry in self._index_entries():
+                        self._live_bytes += entry[1].length
+            # the bytes the index covers, _catch_up adds the rest
+            self._total_bytes = self._segments_size(before=self._tail[0]) + self._tail[1]
+            self._catch_up()
+
+    def _index_entries(self) -> Iterator[Tuple[bytes, Location]]:
+        if self._mm is None:
+            return
+        for i in range(self._count):
+            digest, seg, off, length = INDEX_ENTRY.unpack_from(
+                self._mm, INDEX_HEADER.size + i * INDEX_ENTRY.size
+            )
+            yield digest, Location(seg, off, length)
+
+    def _index_get(self, digest: bytes) -> Optional[Location]:
+        """Binary search for the digest in the index"""
+        mm = self._mm
+        if mm is None:
+            return None
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = INDEX_HEADER.size + mid * INDEX_ENTRY.size
+            found = mm[pos : pos + 16]
+            if found < digest:
+                lo = mid + 1
+            elif found > digest:
+                hi = mid
+            else:
+                _, seg, off, length = INDEX_ENTRY.unpack_from(mm, pos)
+                return Location(seg, off, length)
+        return None
+
+    def _locate(self, digest: bytes) -> Optional[Location]:
+        if digest in self._recent:
+            return self._recent[digest]
+        return self._index_get(digest)
+
+    def _added(self, digest: bytes, loc: Location, flags: int) -> None:
+        """Updates the state after a record is appended/found at the end of a segment"""
+        old = self._locate(digest)
+        if old is not None:
+            self._live_bytes -= old.length
+        if flags & TOMBSTONE:
+            self._recent[digest] = None
+        else:
+            self._recent[digest] = loc
+            self._live_bytes += loc.length
+
+    def _catch_up(self, repair: bool = False) -> bool:
+        """
+        Reads any records appended (by another process) after the last one this has read,
+        returns True if there were any
+
+        If repair is True (only while holding the write lock), truncates an incomplete
+        record at the end of the last segment, left by a writer which crashed
+        """
+        found = False
+        seg, off = self._tail
+        while True:
+            path = self._segment_path(seg)
+            try:
+                size = os.path.getsize(path)
+            except FileNotFoundError:
+                if seg == self._tail[0] and self._segments():
+                    # compacted by another process
+                    self.reload()
+                    return True
+                break
+            if size > off:
+                data = os.pread(self._fd(seg), size - off, off)
+                pos = 0
+                while pos < len(data):
+                    length = _record_length(data, pos)
+                    if length is None:
+                        break
+                    rec = data[pos : pos + length]
+                    _, flags, url_len, _, _ = RECORD_HEADER.unpack_from(rec, 0)
+                    url = rec[RECORD_HEADER.size : RECORD_HEADER.size + url_len].decode()
+                    self._added(_digest(url), Location(seg, off + pos, length), flags)
+                    found = True
+                    pos += length
+                if pos < len(data) and repair:
+                    self.logger.warning(
+                        f"Truncating incomplete record at {path}:{off + pos}"
+                    )
+                    os.truncate(path, off + pos)
+                self._total_bytes += pos
+                off += pos
+            self._tail = (seg, off)
+            if not os.path.exists(self._segment_path(seg + 1)):
+                break
+            seg, off = seg + 1, 0
+        return found
+
+    def _stale(self) -> bool:
+        """
+        Returns True if another process appended records or compacted the segments
+        since the last record this has read. Usually one fstat of the last segment
+        """
+        seg, off = self._tail
+        try:
+            st = os.fstat(self._fd(seg))
+        except FileNotFoundError:  # nothing written yet, or compacted
+            return True
+        # grew, or removed by another process compacting
+        if st.st_size > off or st.st_nlink == 0:
+            return True
+        # the next record didn't fit, and was appended to a new segment
+        return os.path.exists(self._segment_path(seg + 1))
+
+    def _read(self, loc: Location) -> bytes:
+        return os.pread(self._fd(loc.segment), loc.length, loc.offset)
+
+    def _find(self, url: str) -> Optional[Record]:
+        digest = _digest(url)
+        with self._lock:
+            if self._stale():
+                self._catch_up()
+            loc = self._locate(digest)
+            if loc is None:
+                return None
+            try:
+                data = self._read(loc)
+            except FileNotFoundError:
+                # the segment was removed by another process compacting
+                self.reload()
+                loc = self._locate(digest)
+                if loc is None:
+                    return None
+                data = self._read(loc)
+        rec = decode_record(data)
+        if rec.url != url or rec.flags & TOMBSTONE:
+            return None
+        return rec
+
+    def get(self, url: str) -> Optional[Summary]:
+        rec = self._find(url)
+        if rec is None:
+            return None
+        return self._build_summary(
+            url,
+            [(name, self.attr_file_parsers[name].loads(value)) for name, value in rec.fields],
+        )
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        """
+        Held while appending records, reads any records other processes appended first
+
+        flock locks aren't reentrant, so this can't be nested
+        """
+        with self._lock, FileLock(self._write_lock_path):
+            self._catch_up(repair=True)
+            yield
+        self._maybe_compact()
+
+    def _write(self, url: str, fields: List[Tuple[str, bytes]], flags: int = 0) -> None:
+        """Appends a record to the last segment, in _writing"""
+        record = encode_record(url, fields, flags)
+        seg, off = self._tail
+        if off > 0 and off + len(record) > self.segment_size:
+            seg, off = seg + 1, 0
+        if self._append_fd is None or self._append_fd[0] != seg:
+            if self._append_fd is not None:
+                os.close(self._append_fd[1])
+            fd = os.open(
+                self._segment_path(seg), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644
+            )
+            self._append_fd = (seg, fd)
+        view = memoryview(record)
+        while view:
+            written = os.write(self._append_fd[1], view)
+            view = view[written:]
+        self._total_bytes += len(record)
+        self._added(_digest(url), Location(seg, off, len(record)), flags)
+        self._tail = (seg, off + len(record))
+        if len(self._recent) >= FLUSH_EVERY:
+            self._write_index()
+
+    def put(self, url: str, data: Summary) -> Optional[str]:
+        fields = self._serialize(data)
+        with self._writing():
+            self._write(url, fields)
+        return None
+
+    def put_attr(self, url: str, attr: str, val: Any) -> None:
+        value = self.attr_file_parsers[attr].dumps(val)
+        with self._writing():
+            rec = self._find(url)
+            if rec is None:
+                raise DirCacheMiss(f"No cached data for {url}")
+            if value is not None:
+                fields = [(name, v) for name, v in rec.fields if name != attr]
+                fields.append((attr, value))
+                self._write(url, fields)
+
+    def has(self, url: str) -> bool:
+        return self._find(url) is not None
+
+    def delete(self, url: str) -> bool:
+        with self._writing():
+            if self._find(url) is None:
+                return False
+            self._write(url, [], TOMBSTONE)
+            return True
+
+    def _live(self) -> List[Location]:
+        """Location of every live record, in the order they're stored"""
+        locs: Dict[bytes, Optional[Location]] = dict(self._index_entries())
+        locs.update(self._recent)
+        return sorted(loc for loc in locs.values() if loc is not None)
+
+    def urls(self) -> Iterator[str]:
+        with self._lock:
+            self._catch_up()
+            locs = self._live()
+        for loc in locs:
+            with self._lock:
+                try:
+                    header = self._read(Location(loc.segment, loc.offset, RECORD_HEADER.size))
+                    _, _, url_len, _, _ = RECORD_HEADER.unpack(header)
+                    url = os.pread(
+                        self._fd(loc.segment), url_len, loc.offset + RECORD_HEADER.size
+                    ).decode()
+                except FileNotFoundError:  # compacted while iterating
+                    continue
+            yield url
+
+    def lock(self, url: str, name: str) -> FileLock:
+        return hashed_lock(self.lock_dir, url, name)
+
+    def _write_index(self) -> None:
+        """Replaces the index file with every live record (holding the write lock)"""
+        locs: Dict[bytes, Optional[Location]] = dict(self._index_entries())
+        locs.update(self._recent)
+        entries = sorted((d, loc) for d, loc in locs.items() if loc is not None)
+        fd, tmp = tempfile.mkstemp(dir=str(self.directory), prefix=".index")
+        with os.fdopen(fd, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, *self._tail, len(entries)))
+            for digest, loc in entries:
+                f.write(INDEX_ENTRY.pack(digest, *loc))
+        os.replace(tmp, os.path.join(self.directory, INDEX_FILE))
+        if self._mm is not None:
+            self._mm.close()
+        with open(os.path.join(self.directory, INDEX_FILE), "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._count = len(entries)
+        self._recent.clear()
+
+    def flush(self) -> None:
+        """Writes the index, so the next time this is opened it doesn't have to scan segments"""
+        with self._lock, FileLock(self._write_lock_path):
+            self._catch_up(repair=True)
+            if self._recent:
+                self._write_index()
+
+    @property
+    def garbage_bytes(self) -> int:
+        """Size of the superseded/deleted records in the segments"""
+        return self._total_bytes - self._live_bytes
+
+    def compact(self) -> Tuple[int, int]:
+        """
+        Rewrites the live records into new segments and removes the old ones,
+        returns the size of the segments before and after
+        """
+        with self._lock, FileLock(self._write_lock_path):
+            self._catch_up(repair=True)
+            before = self._total_bytes
+            old_segments = self._segments()
+            live = self._live()
+            seg = (old_segments[-1] if old_segments else 0) + 1
+            off = 0
+            out = open(self._segment_path(seg), "wb")
+            try:
+                for loc in live:
+                    data = self._read(loc)
+                    if off > 0 and off + len(data) > self.segment_size:
+                        out.close()
+                        seg, off = seg + 1, 0
+                        out = open(self._segment_path(seg), "wb")
+                    url = decode_record(data).url
+                    self._recent[_digest(url)] = Location(seg, off, len(data))
+                    out.write(data)
+                    off += len(data)
+            finally:
+                out.close()
+            self._tail = (seg, off)
+            # the new index only refers to the new segments
+            self._write_index()
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+            if self._append_fd is not None:
+                os.close(self._append_fd[1])
+                self._append_fd = None
+            for old in old_segments:
+                os.unlink(self._segment_path(old))
+            self._total_bytes = self._segments_size()
+            self._live_bytes = self._total_bytes
+            return before, self._total_bytes
+
+    def _maybe_compact(self) -> None:
+        if not self.auto_compact:
+            return
+        garbage = self.garbage_bytes
+        if garbage < COMPACT_MIN_BYTES or garbage < self._total_bytes * COMPACT_RATIO:
+            return
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(
+                target=self._compact_in_background, name="url_cache-compact", daemon=True
+            )
+            self._compactor.start()
+
+    def _compact_in_background(self) -> None:
+        try:
+            before, after = self.compact()
+            self.logger.info(f"Compacted segments from {before} to {after} bytes")
+        except Exception as e:
+            self.logger.warning(f"Failed to compact segments: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_files()
@@ -1,30 +1,76 @@
-from typing import Callable
+from typing import Optional, NamedTuple, TYPE_CHECKING
 from requests import Response, Session, PreparedRequest
+from requests.adapters import HTTPAdapter
 
+if TYPE_CHECKING:
+    from .rate_limit import RateLimitScheduler
 
-class SaveSession(Session):
+
+class SessionConfig(NamedTuple):
+    """
+    Connection pool settings for the session shared by URLCache and the extractors
+
+    pool_connections: number of hosts to keep connection pools for
+    pool_maxsize: number of connections to keep open per host
+    pool_block: if True, pool_maxsize is a hard limit on connections
+                per host, requests wait for a free connection
+    timeout: seconds to wait to connect/for data, if a request doesn't specify one
+    keep_alive: reuse connections between requests
     """
-    A subclass of requests.Session which runs a callback function
-    after each request.
 
-    Allows me to expose the request objects after requests using lassie
+    pool_connections: int = 16
+    pool_maxsize: int = 4
+    pool_block: bool = False
+    timeout: Optional[float] = 30
+    keep_alive: bool = True
+
+
+class RateLimitedSession(Session):
     """
+    A subclass of requests.Session which waits for the
+    RateLimitScheduler before sending each request
 
-    # requests.Session doesn't accept any arguments
-    def __init__(self, cb_func: Callable[[Response], None]) -> None:
-        """
-        cb_func: A callback function which saves the response
-        """
-        self.cb_func = cb_func
+    Redirects are sent through here as well, so each hop
+    waits for the host its going to
+    """
+
+    def __init__(
+        self,
+        scheduler: Optional["RateLimitScheduler"] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.scheduler = scheduler
+        self.timeout = timeout
         super().__init__()
 
     # type annotations for kwargs must specify kwargs for *one* of the kwargs; quite arbitrarily chosen
     # https://stackoverflow.com/a/37032111/9348376
     # https://github.com/psf/requests/blob/4f6c0187150af09d085c03096504934eb91c7a9e/requests/sessions.py#L626
     def send(self, request: PreparedRequest, **kwargs: bool) -> Response:  # type: ignore[override]
-        """
-        Save the latest response for a requests.Session
-        """
+        if self.scheduler is not None and request.url is not None:
+            self.scheduler.wait(request.url)
+        if kwargs.get("timeout") is None and self.timeout is not None:
+            kwargs["timeout"] = self.timeout  # type: ignore[assignment]
         resp: Response = super().send(request, **kwargs)  # type: ignore[no-untyped-call,arg-type]
-        self.cb_func(resp)
         return resp
+
+
+def build_session(
+    scheduler: Optional["RateLimitScheduler"] = None,
+    config: Optional[SessionConfig] = None,
+) -> RateLimitedSession:
+    """
+    Creates the pooled, rate limited session that all requests go through
+    """
+    cfg = SessionConfig() if config is None else config
+    session = RateLimitedSession(scheduler=scheduler, timeout=cfg.timeout)
+    adapter = HTTPAdapter(
+        pool_connections=cfg.pool_connections,
+        pool_maxsize=cfg.pool_maxsize,
+        pool_block=cfg.pool_block,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not cfg.keep_alive:
+        session.headers["Connection"] = "close"
+    return session
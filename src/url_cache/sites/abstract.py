@@ -1,14 +1,15 @@
 import logging
-from typing import Optional, TYPE_CHECKING, List, Any
+from typing import Optional, TYPE_CHECKING, List, Dict, Tuple, Any
 from abc import ABC, abstractmethod
 
-from requests import Response
-
 from ..model import Summary
 from ..summary_cache import FileParser
+from ..rate_limit import RateLimit
+from ..retry import Retrier
 
 
 if TYPE_CHECKING:
+    from requests import Response, Session
     from ..core import URLCache  # to prevent cyclic imports
 
 
@@ -16,8 +17,14 @@ class AbstractSite(ABC):
     """
     These are always run after the 'core' lassie/summarization information has been done,
     so these have access to the cached response through self._uc
+
+    'hosts' lists the hostnames this Site handles (subdomains match as well), so
+    URLCache only calls it for URLs on those hosts. If its empty, the Site
+    is called for every URL, so it can do any sort of matching in matches_site
     """
 
+    hosts: Tuple[str, ...] = ()
+
     def __init__(self, uc: "URLCache"):
         self._uc = uc
 
@@ -28,6 +35,14 @@ class AbstractSite(ABC):
         """
         return []
 
+    def rate_limits(self) -> Dict[str, List[RateLimit]]:
+        """
+        Lets Sites specify how often the hosts they request can be requested
+        Maps a host (which also matches its subdomains) to its limits, hosts
+        which aren't configured use the URLCache's sleep_time
+        """
+        return {}
+
     @abstractmethod
     def matches_site(self, url: str) -> bool:  # type: ignore[misc]
         """
@@ -52,12 +67,30 @@ class AbstractSite(ABC):
         return url
 
     @property
-    def response(self) -> Optional[Response]:
+    def response(self) -> Optional["Response"]:
         return self._uc._response
 
+    @property
+    def session(self) -> "Session":
+        """
+        The pooled, rate limited session shared by all extractors
+        """
+        return self._uc.session
+
+    @property
+    def retrier(self) -> Retrier:
+        """
+        Retries rate limited requests, honoring Retry-After
+        """
+        return self._uc.retrier
+
     @property
     def logger(self) -> logging.Logger:
         return self._uc.logger
 
     def sleep(self) -> None:
+        """
+        Requests made through the rate limited sessions wait automatically,
+        this is kept for Sites which make requests some other way
+        """
         self._uc.sleep()
@@ -1,17 +1,15 @@
-import time
 from typing import Optional, List, TYPE_CHECKING, Dict
 
-import requests
-import backoff  # type: ignore[import]
-
 from ...model import Summary
 from ...summary_cache import FileParser, _load_file_json, _dump_file_json
-from ...utils import backoff_warn
 from ...common import Json
+from ...rate_limit import RateLimit
 from ..abstract import AbstractSite
 
 from .urls.v4 import Version4, MalParseResult
 
+JIKAN_HOST = "api.jikan.moe"
+
 if TYPE_CHECKING:
     from ...core import URLCache  # to prevent cyclic imports
 
@@ -22,11 +20,11 @@ class MyAnimeList(AbstractSite):
     https://jikan.moe/
     """
 
+    hosts = ("myanimelist.net",)
+
     def __init__(self, uc: "URLCache"):
         super().__init__(uc)
         self.url_parser = Version4()
-        self.jikan_session = requests.Session()
-        self.jikan_sleep_time = 1
 
     def file_parsers(self) -> List[FileParser[Json]]:
         return [
@@ -38,20 +36,28 @@ class MyAnimeList(AbstractSite):
             )
         ]
 
+    def rate_limits(self) -> Dict[str, List[RateLimit]]:
+        # https://docs.api.jikan.moe/#section/Information/Rate-Limiting
+        return {
+            JIKAN_HOST: [
+                RateLimit(calls=3, period=1),
+                RateLimit(calls=60, period=60),
+            ]
+        }
+
     def matches_site(self, url: str) -> bool:
         m: Optional[MalParseResult] = self.url_parser.parse_url(url)
         return m is not None
 
-    def sleep(self) -> None:
-        time.sleep(self.jikan_sleep_time)
-
-    @backoff.on_exception(
-        backoff.fibo, requests.RequestException, max_tries=3, on_backoff=backoff_warn  # type: ignore[arg-type]
-    )
     def _jikan_request(self, url: str) -> Json:
+        import requests
+
         self.logger.debug(f"Jikan Request: {url}")
-        resp = self.jikan_session.get(url)
-        self.sleep()
+        resp = self.retrier.call(
+            url,
+            lambda: self.session.get(url),
+            retry_on=(requests.ConnectionError, requests.Timeout),
+        )
         resp.raise_for_status()
         data: Json = resp.json()
         return data
@@ -60,11 +66,13 @@ class MyAnimeList(AbstractSite):
         m: Optional[MalParseResult] = self.url_parser.parse_url(url)
         if m is None:
             return summary
+        from requests import RequestException
+
         data: Dict[str, Json] = {}
         for url in m.jikan_urls:
             try:
                 data[url] = self._jikan_request(url)
-            except requests.RequestException as r:
+            except RequestException as r:
                 self.logger.warning(str(r))
 
         summary.data["jikan"] = data
@@ -10,6 +10,8 @@ class StackOverflow(AbstractSite):
     StackOverflow extractor to normalize question IDs/extract question/answers
     """
 
+    hosts = ("stackoverflow.com",)
+
     def extract_question_id(self, url: str) -> Optional[int]:
         """
         Extract a stackoverflow question ID from a URL
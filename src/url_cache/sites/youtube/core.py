@@ -1,9 +1,10 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
 from urllib.parse import urlparse, parse_qs, ParseResult
 
 from .subtitles_downloader import YoutubeSubtitlesException, download_subs
 from ...model import Summary
 from ...summary_cache import FileParser, _load_file_text, _dump_file_text
+from ...rate_limit import RateLimit
 from ..abstract import AbstractSite
 
 
@@ -49,6 +50,8 @@ class Youtube(AbstractSite):
     Youtube site extractor to get subtitles for videos
     """
 
+    hosts = ("youtube.com", "youtu.be", "youtube-nocookie.com")
+
     def file_parsers(self) -> List[FileParser[str]]:
         return [
             FileParser(
@@ -59,6 +62,11 @@ class Youtube(AbstractSite):
             )
         ]
 
+    def rate_limits(self) -> Dict[str, List[RateLimit]]:
+        # the page, video info and subtitles for a video can be requested
+        # back to back, but then wait before requesting the next video
+        return {"youtube.com": [RateLimit(calls=3, period=self._uc.sleep_time)]}
+
     def matches_site(self, url: str) -> bool:
         return get_yt_video_id(url) is not None
 
@@ -74,16 +82,12 @@ class Youtube(AbstractSite):
             try:
                 self.logger.debug(f"Downloading subtitles for Youtube ID: {yt_id}")
                 summary.data["subtitles"] = download_subs(
-                    yt_id, self._uc.options["subtitle_language"]
+                    yt_id, self._uc.options["subtitle_language"], self.session
                 )
-                self.sleep()
             except (
                 YoutubeSubtitlesException
             ) as ye:  # this catches both request and track/subtitle exceptions
                 self.logger.debug(str(ye))
-                # sleep even if it failed to parse, still made the request to youtube
-                # won't sleep if url doesn't match youtube
-                self.sleep()
         return summary
 
     def preprocess_url(self, url: str) -> str:
@@ -5,36 +5,54 @@ Downloads subtitles from youtube
 import json
 import html
 import urllib.parse
-from typing import Dict, Any
-
-import requests
-
-# TODO: use other helper funcs for better error warnings?
-from pytube.extract import video_info_url  # type: ignore[import]
+from typing import Dict, Any, Optional, TYPE_CHECKING
 
 from .srt_converter import to_srt
 
+# requests/pytube are imported when subtitles are downloaded
+if TYPE_CHECKING:
+    import requests
+
 
 class YoutubeSubtitlesException(Exception):
     pass
 
 
-def download_subs(video_identifier: str, target_language: str) -> str:
+def _get(url: str, session: Optional["requests.Session"]) -> "requests.Response":
+    if session is None:
+        import requests
+
+        return requests.get(url)
+    return session.get(url)
+
+
+def download_subs(
+    video_identifier: str,
+    target_language: str,
+    session: Optional["requests.Session"] = None,
+) -> str:
+    from requests import RequestException
+
     try:
-        video_info: Dict[str, Any] = get_video_info(video_identifier)
+        video_info: Dict[str, Any] = get_video_info(video_identifier, session)
         track_urls: Dict[str, Any] = get_sub_track_urls(video_info)
         target_track_url: str = select_target_lang_track_url(
             track_urls, target_language
         )
-        subs_data: str = get_subs_data(target_track_url)
+        subs_data: str = get_subs_data(target_track_url, session)
         return to_srt(subs_data)
-    except (requests.exceptions.RequestException, YoutubeSubtitlesException) as e:
+    except (RequestException, YoutubeSubtitlesException) as e:
         raise YoutubeSubtitlesException(str(e))
 
 
-def get_video_info(video_id: str) -> Dict[str, Any]:
+def get_video_info(
+    video_id: str, session: Optional["requests.Session"] = None
+) -> Dict[str, Any]:
+    # TODO: use other helper funcs for better error warnings?
+    from pytube.extract import video_info_url  # type: ignore[import]
+
     url = video_info_url(video_id, f"https://www.youtube.com/watch?v={video_id}")
-    resp: requests.Response = requests.get(url)
+    resp: "requests.Response" = _get(url, session)
     return urllib.parse.parse_qs(resp.text)
 
 
@@ -65,6 +83,8 @@ def select_target_lang_track_url(
         )
 
 
-def get_subs_data(subs_url: str) -> str:
-    resp: requests.Response = requests.get(subs_url)
+def get_subs_data(
+    subs_url: str, session: Optional["requests.Session"] = None
+) -> str:
+    resp: "requests.Response" = _get(subs_url, session)
     return html.unescape(resp.text)
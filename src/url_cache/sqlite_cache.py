@@ -0,0 +1,112 @@
+"""
+A SummaryCache which stores everything in a single SQLite database,
+instead of a directory (and a few files) for each URL
+"""
+
+from pathlib import Path
+from typing import Optional, List, Any, Iterator, Tuple
+
+from .exceptions import URLCacheException
+from .model import Summary
+from .dir_cache import DirCacheMiss
+from .locking import FileLock
+from .sqlite_utils import ThreadLocalConnection
+from .summary_cache import SummaryCache, FileParser, hashed_lock
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY) WITHOUT ROWID",
+    # one row for each FileParser, with the data it serialized
+    """CREATE TABLE IF NOT EXISTS fields (
+        url TEXT NOT NULL,
+        field TEXT NOT NULL,
+        value BLOB NOT NULL,
+        PRIMARY KEY (url, field)
+    ) WITHOUT ROWID""",
+]
+
+
+class SummarySQLiteCache(SummaryCache):
+    """
+    Stores one row for each URL, and a row for each of its attributes
+    (serialized with FileParser.dumps) in the database at 'path'
+
+    Uses WAL, so any number of threads/processes can read while one writes
+    Lockfiles (for SummaryCache.lock) are kept in a directory next to the database
+    """
+
+    def __init__(
+        self, path: Path, *, file_parsers: Optional[List[FileParser[Any]]] = None
+    ):
+        super().__init__(file_parsers=file_parsers)
+        self.path: Path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock_dir: Path = self.path.parent / f"{self.path.name}.locks"
+        self._db = ThreadLocalConnection(str(self.path), SCHEMA)
+
+    def get(self, url: str) -> Optional[Summary]:
+        rows: List[Tuple[Optional[str], Optional[bytes]]] = self._db.conn.execute(
+            "SELECT f.field, f.value FROM urls u LEFT JOIN fields f ON f.url = u.url WHERE u.url = ?",
+            (url,),
+        ).fetchall()
+        if not rows:
+            return None
+        items: List[Tuple[str, Any]] = []
+        for field, value in rows:
+            # NULL if the url has no fields
+            if field is None or value is None:
+                continue
+            psr = self.attr_file_parsers.get(field)
+            if psr is None:
+                raise URLCacheException(f"No way to parse {field} for {url}")
+            items.append((field, psr.loads(value)))
+        return self._build_summary(url, items)
+
+    def put(self, url: str, data: Summary) -> Optional[str]:
+        fields = self._serialize(data)
+        conn = self._db.conn
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT OR IGNORE INTO urls (url) VALUES (?)", (url,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO fields (url, field, value) VALUES (?, ?, ?)",
+                [(url, name, value) for name, value in fields],
+            )
+        return None
+
+    def put_attr(self, url: str, attr: str, val: Any) -> None:
+        value = self.attr_file_parsers[attr].dumps(val)
+        conn = self._db.conn
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if not self.has(url):
+                raise DirCacheMiss(f"No cached data for {url}")
+            if value is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO fields (url, field, value) VALUES (?, ?, ?)",
+                    (url, attr, value),
+                )
+
+    def has(self, url: str) -> bool:
+        row = self._db.conn.execute("SELECT 1 FROM urls WHERE url = ?", (url,)).fetchone()
+        return row is not None
+
+    def delete(self, url: str) -> bool:
+        conn = self._db.conn
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM fields WHERE url = ?", (url,))
+            deleted: int = conn.execute("DELETE FROM urls WHERE url = ?", (url,)).rowcount
+        return deleted > 0
+
+    def urls(self) -> Iterator[str]:
+        # fetch them all at once, so this isn't holding a read transaction open
+        rows = self._db.conn.execute("SELECT url FROM urls").fetchall()
+        for (url,) in rows:
+            yield url
+
+    def lock(self, url: str, name: str) -> FileLock:
+        return hashed_lock(self.lock_dir, url, name)
+
+    def close(self) -> None:
+        """Closes this threads connection"""
+        self._db.close()
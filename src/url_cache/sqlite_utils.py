@@ -0,0 +1,44 @@
+"""
+Shared setup for the SQLite databases in the cache
+"""
+
+import sqlite3
+import threading
+from typing import Optional, Sequence
+
+
+class ThreadLocalConnection:
+    """
+    Opens a connection to the database at 'path' for each thread which uses it
+    (sqlite3 connections can't be shared across threads)
+
+    Uses WAL, so readers in other threads/processes aren't blocked by a writer,
+    and runs each 'schema' statement when a connection is opened
+    """
+
+    def __init__(self, path: str, schema: Sequence[str]):
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit, transactions are started with an explicit BEGIN
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # in WAL mode, NORMAL doesn't risk corruption, only
+            # losing the last few transactions on a power loss
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for stmt in self.schema:
+                conn.execute(stmt)
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Closes this threads connection"""
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -1,4 +1,9 @@
+import os
 import json
+import shutil
+import tempfile
+import threading
+from abc import ABC, abstractmethod
 from datetime import datetime
 from typing import (
     Optional,
@@ -10,13 +15,18 @@ from typing import (
     Callable,
     TypeVar,
     Set,
+    Iterator,
+    Iterable,
 )
 from pathlib import Path
 
 from .exceptions import URLCacheException
+from .compression import CODECS, Codec, codec_for, default_codec
+from . import compression
 from .common import Json
 from .model import Summary
-from .dir_cache import DirCache
+from .dir_cache import DirCache, DirCacheMiss, fsync_path
+from .locking import FileLock
 
 
 T = TypeVar("T")
@@ -25,6 +35,14 @@ T = TypeVar("T")
 class FileParser(Generic[T]):
     """
     Encapsulates some function which parses an underlying file for a field on the metadata
+
+    If compressible, the file may also be saved compressed (e.g. html_summary.html.zst),
+    the load/dump functions receive the compressed path and should
+    use the functions in url_cache.compression to read/write it
+
+    loads_func/dumps_func convert the data to/from bytes, for backends which
+    don't store files (e.g. SummarySQLiteCache). If they're not provided, that
+    goes through a temporary file with load_func/dump_func instead
     """
 
     def __init__(
@@ -34,6 +52,9 @@ class FileParser(Generic[T]):
         *,
         load_func: Callable[[Path], T],
         dump_func: Callable[[T, Path], None],
+        compressible: bool = False,
+        loads_func: Optional[Callable[[bytes], T]] = None,
+        dumps_func: Optional[Callable[[T], Optional[bytes]]] = None,
     ):
         # basename of a file, not a full path, just what
         # this is meant to match against
@@ -41,18 +62,31 @@ class FileParser(Generic[T]):
         self.ext = ext
         self.load_func = load_func
         self.dump_func = dump_func
+        self.compressible = compressible
+        self.loads_func = loads_func
+        self.dumps_func = dumps_func
 
     @property
     def filename(self) -> str:
         return self.name + self.ext
 
+    @property
+    def filenames(self) -> List[str]:
+        """All the names this could be saved as, compressed or not"""
+        if not self.compressible:
+            return [self.filename]
+        return [self.filename] + [self.filename + ext for ext in CODECS]
+
     def matches(self, p: Path) -> bool:
         # instead of checking the extension directly, this just
         # checks if it starts/ends with what was provided
         # that way, you can have filenames like
         # epoch.datetime.txt to specify the loaded
         # type of some data
-        return p.name.startswith(self.name) and p.name.endswith(self.ext)
+        name = p.name
+        if self.compressible and codec_for(p) is not None:
+            name = name[: -len(p.suffix)]
+        return name.startswith(self.name) and name.endswith(self.ext)
 
     def load(self, p: Path) -> T:
         return self.load_func(p)
@@ -60,6 +94,23 @@ class FileParser(Generic[T]):
     def dump(self, data: T, p: Path) -> None:
         self.dump_func(data, p)
 
+    def loads(self, data: bytes) -> T:
+        if self.loads_func is not None:
+            return self.loads_func(data)
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / self.filename
+            p.write_bytes(data)
+            return self.load(p)
+
+    def dumps(self, data: T) -> Optional[bytes]:
+        """Returns None if there's nothing to save (the dump function wrote no file)"""
+        if self.dumps_func is not None:
+            return self.dumps_func(data)
+        with tempfile.TemporaryDirectory() as d:
+            p = Path(d) / self.filename
+            self.dump(data, p)
+            return p.read_bytes() if p.exists() else None
+
 
 # functions to load/dump the supported types from files
 
@@ -79,6 +130,16 @@ try:
             return
         p.write_bytes(orjson.dumps(data))
 
+    def _loads_json(data: bytes) -> Json:
+        loaded: Json = orjson.loads(data)
+        return loaded
+
+    def _dumps_json(data: Json) -> Optional[bytes]:
+        if data == {}:
+            return None
+        dumped: bytes = orjson.dumps(data)
+        return dumped
+
 except ModuleNotFoundError:
 
     def _load_file_json(p: Path) -> Json:
@@ -90,9 +151,18 @@ except ModuleNotFoundError:
             return
         p.write_text(json.dumps(data))
 
+    def _loads_json(data: bytes) -> Json:
+        loaded: Json = json.loads(data)
+        return loaded
+
+    def _dumps_json(data: Json) -> Optional[bytes]:
+        if data == {}:
+            return None
+        return json.dumps(data).encode()
+
 
 def _load_file_text(p: Path) -> str:
-    return p.read_text()
+    return compression.read_text(p)
 
 
 def _load_file_datetime(p: Path) -> datetime:
@@ -100,31 +170,70 @@ def _load_file_datetime(p: Path) -> datetime:
 
 
 def _dump_file_text(data: str, p: Path) -> None:
-    p.write_text(data)
+    compression.write_text(data, p)
 
 
 def _dump_file_datetime(data: datetime, p: Path) -> None:
     p.write_text(str(int(data.timestamp())))
 
 
+def _loads_text(data: bytes) -> str:
+    return data.decode("utf-8")
+
+
+def _dumps_text(data: str) -> Optional[bytes]:
+    return data.encode("utf-8")
+
+
+def _loads_datetime(data: bytes) -> datetime:
+    return datetime.fromtimestamp(int(data))
+
+
+def _dumps_datetime(data: datetime) -> Optional[bytes]:
+    return str(int(data.timestamp())).encode()
+
+
 DEFAULT_FILE_PARSERS: List[FileParser[Any]] = [
     FileParser(
         name="metadata",
         ext=".json",
         load_func=_load_file_json,
         dump_func=_dump_file_json,
+        loads_func=_loads_json,
+        dumps_func=_dumps_json,
     ),
     FileParser(
         name="timestamp",
         ext=".datetime.txt",
         load_func=_load_file_datetime,
         dump_func=_dump_file_datetime,
+        loads_func=_loads_datetime,
+        dumps_func=_dumps_datetime,
     ),
     FileParser(
         name="html_summary",
         ext=".html",
         load_func=_load_file_text,
         dump_func=_dump_file_text,
+        compressible=True,
+        loads_func=_loads_text,
+        dumps_func=_dumps_text,
+    ),
+    FileParser(
+        name="validators",
+        ext=".json",
+        load_func=_load_file_json,
+        dump_func=_dump_file_json,
+        loads_func=_loads_json,
+        dumps_func=_dumps_json,
+    ),
+    FileParser(
+        name="status",
+        ext=".json",
+        load_func=_load_file_json,
+        dump_func=_dump_file_json,
+        loads_func=_loads_json,
+        dumps_func=_dumps_json,
     ),
 ]
 
@@ -133,22 +242,20 @@ SUMMARY_ATTRS: Set[str] = set(Summary.__annotations__.keys())
 # url is already stored as the 'key' file, don't need store again
 SUMMARY_ATTRS.remove("url")
 IGNORE_FILES: Set[str] = set(["key", "url.txt"])
+# how many times to read an entry if files are removed while its being read
+SCAN_ATTEMPTS = 3
 
 
-class SummaryDirCache:
+class SummaryCache(ABC):
     """
-    Interface to the underlying DirCache, which serializes/deserializes information
-    from the Summary object into each individual file
+    A storage backend for Summary objects, each attribute (and each item
+    in 'data') is serialized with the FileParser with the same name
 
     additional FileParser objects can be provided to parse custom data
     """
 
-    def __init__(
-        self, data_dir: Path, *, file_parsers: Optional[List[FileParser[Any]]] = None
-    ):
-        self.data_dir: Path = data_dir
-        self.dir_cache = DirCache(str(self.data_dir))
-        self.file_parsers: List[FileParser[Any]] = DEFAULT_FILE_PARSERS
+    def __init__(self, *, file_parsers: Optional[List[FileParser[Any]]] = None):
+        self.file_parsers: List[FileParser[Any]] = list(DEFAULT_FILE_PARSERS)
         if file_parsers is not None:
             self.file_parsers.extend(file_parsers)
         # map name of attribute to the parsers
@@ -156,45 +263,67 @@ class SummaryDirCache:
             parser.name: parser for parser in self.file_parsers
         }
 
-    def parse_file(self, p: Path) -> Tuple[str, Any]:
+    @abstractmethod
+    def get(self, url: str) -> Optional[Summary]:
         """
-        Takes a path and tries to parse it with each self.file_parsers
+        Get data for the 'url' from cache, or None if it doesn't exist
         """
-        for parser in self.file_parsers:
-            if parser.matches(p):
-                return parser.name, parser.load(p)
-        # hmm - warning instead?
-        raise URLCacheException(f"No way to parse {str(p)}")
+        raise NotImplementedError
 
-    def scan_directory(self, keydir: Path) -> Dict[str, Any]:
+    @abstractmethod
+    def put(self, url: str, data: Summary) -> Optional[str]:
         """
-        Given the target directory, recursively scans for files
-        and applies the 'file_parsers' against each file
+        Puts/Replaces the information from 'data' for the url
+
+        Returns the directory its saved in, if this backend uses directories
         """
-        res = {}
-        for target in keydir.rglob("*"):
-            if not target.is_file():
-                continue
-            # ignore the key file, used to handle hashing/storing the URL
-            if target.name in IGNORE_FILES:
-                continue
-            name, data = self.parse_file(target)
-            res[name] = data
-        return res
+        raise NotImplementedError
 
-    def get(self, url: str) -> Optional[Summary]:
+    @abstractmethod
+    def put_attr(self, url: str, attr: str, val: Any) -> None:
         """
-        Get data for the 'url' from cache, or None if it doesn't exist
+        Replaces one top-level attribute (e.g. 'html_summary') for a
+        cached url, without rewriting any of the others
+
+        If the item isn't in cache, raises DirCacheMiss
         """
-        if not self.has(url):
-            return None
+        raise NotImplementedError
 
-        key: Path = Path(self.dir_cache.get(url))
+    @abstractmethod
+    def has(self, url: str) -> bool:
+        """
+        Returns true/false, signifying whether or not the information
+        for this url is already cached
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, url: str) -> bool:
+        """Deletes the data for a url, returns True if something was deleted"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def urls(self) -> Iterator[str]:
+        """Every cached url"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def lock(self, url: str, name: str) -> FileLock:
+        """
+        Returns a FileLock which can be used to synchronize work on a url
+        across processes, 'name' is the name of the lockfile
+        """
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Saves anything this backend is buffering in memory"""
 
+    def _build_summary(self, url: str, items: Iterable[Tuple[str, Any]]) -> Summary:
+        """Creates a Summary from (parser name, loaded data) pairs"""
         # store info for this in a dict and splat onto dataclass at end
         sdict: Dict[str, Any] = {"url": url}
 
-        for attr_name, data in self.scan_directory(key).items():
+        for attr_name, data in items:
             # top level attr on Summary dataclass
             if attr_name in SUMMARY_ATTRS:
                 sdict[attr_name] = data
@@ -207,6 +336,167 @@ class SummaryDirCache:
 
         return Summary(**sdict)  # type: ignore[call-arg]
 
+    def _serialize(self, data: Summary) -> List[Tuple[str, bytes]]:
+        """
+        (parser name, bytes) for each attribute, for backends which don't store
+        files. Skips attributes the parser has nothing to save for
+        """
+        fields: List[Tuple[str, bytes]] = []
+        for attr in SUMMARY_ATTRS:
+            val: Optional[Any] = getattr(data, attr, None)
+            if val is None:
+                continue
+            if attr == "data":
+                assert isinstance(val, dict)
+                items = list(val.items())
+            else:
+                items = [(attr, val)]
+            for name, item in items:
+                dumped = self.attr_file_parsers[name].dumps(item)
+                if dumped is not None:
+                    fields.append((name, dumped))
+        return fields
+
+    def touch(self, url: str, timestamp: datetime) -> None:
+        """
+        Updates the timestamp for a cached url
+
+        If the item isn't in cache, raises DirCacheMiss
+        """
+        self.put_attr(url, "timestamp", timestamp)
+
+    def put_status(self, url: str, status: Json) -> None:
+        """
+        Replaces the status for a cached url
+
+        If the item isn't in cache, raises DirCacheMiss
+        """
+        self.put_attr(url, "status", status)
+
+    def has_null_value(self, url: str) -> bool:
+        """
+        If the item isn't in cache, raises DirCacheMiss
+        If the item is in cache, but it doesn't have any values (i.e. empty
+        json file and no srt data), or its status says the request failed,
+        then return True
+        else return False (this has data)
+
+        meant to be used to 'retry' getting url metadata, in case none was retrieved
+        """
+        summary = self.get(url)
+        if summary is None:
+            raise DirCacheMiss(f"No cached data for {url}")
+        if summary.status.get("failures", 0) > 0:
+            return True
+        return not (summary.metadata or summary.html_summary or summary.data)
+
+
+class SummaryDirCache(SummaryCache):
+    """
+    Interface to the underlying DirCache, which serializes/deserializes information
+    from the Summary object into each individual file
+
+    if compress is True, files for compressible parsers are saved compressed
+    if index_path is given, the DirCache keeps an index of its directories there
+
+    Readers never see a partially written entry: a new entry is written to a hidden
+    directory and renamed into place, and each file in an existing entry is written
+    to a hidden file and renamed over the old one. If fsync is True, files
+    are flushed to disk before they're renamed
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        *,
+        file_parsers: Optional[List[FileParser[Any]]] = None,
+        compress: bool = False,
+        index_path: Optional[Path] = None,
+        fsync: bool = False,
+    ):
+        super().__init__(file_parsers=file_parsers)
+        self.data_dir: Path = data_dir
+        self.codec: Optional[Codec] = default_codec() if compress else None
+        self.fsync = fsync
+        self.dir_cache = DirCache(
+            str(self.data_dir),
+            index_path=None if index_path is None else str(index_path),
+            fsync=fsync,
+        )
+        # map each name a parser saves files as to the parser, so reading an entry
+        # doesn't have to try each parser against each file. Earlier parsers take
+        # precedence, like in parse_file
+        self.filename_parsers: Dict[str, FileParser[Any]] = {}
+        for parser in self.file_parsers:
+            for filename in parser.filenames:
+                self.filename_parsers.setdefault(filename, parser)
+
+    def parse_file(self, p: Path) -> Tuple[str, Any]:
+        """
+        Takes a path and tries to parse it with each self.file_parsers
+        """
+        for parser in self.file_parsers:
+            if parser.matches(p):
+                return parser.name, parser.load(p)
+        # hmm - warning instead?
+        raise URLCacheException(f"No way to parse {str(p)}")
+
+    def scan_directory(self, keydir: Path) -> Dict[str, Any]:
+        """
+        Given the target directory, recursively scans for files
+        and applies the 'file_parsers' against each file
+
+        If the directory doesn't exist (e.g. it was deleted), raises FileNotFoundError
+        """
+        res: Dict[str, Any] = {}
+        for _ in range(SCAN_ATTEMPTS):
+            res = {}
+            # a file can be removed while this is reading, when its saved with a
+            # different compression or compacted. The file replacing it is written
+            # first, so scanning again finds it
+            if not self._scan_into(str(keydir), res):
+                break
+        return res
+
+    def _scan_into(self, path: str, res: Dict[str, Any]) -> bool:
+        """Returns True if any files were removed while they were being read"""
+        vanished = False
+        # uses the file types from scandir, so this doesn't stat each file
+        with os.scandir(path) as it:
+            for entry in it:
+                # ignore the key file, used to handle hashing/storing the URL,
+                # and hidden (temporary) files
+                if entry.name in IGNORE_FILES or entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir():
+                        vanished |= self._scan_into(entry.path, res)
+                        continue
+                    if not entry.is_file():
+                        continue
+                    parser = self.filename_parsers.get(entry.name)
+                    if parser is None:
+                        # e.g. a custom name which a parser matches by prefix/suffix
+                        name, data = self.parse_file(Path(entry.path))
+                    else:
+                        name, data = parser.name, parser.load(Path(entry.path))
+                except FileNotFoundError:
+                    vanished = True
+                    continue
+                res[name] = data
+        return vanished
+
+    def get(self, url: str) -> Optional[Summary]:
+        """
+        Get data for the 'url' from cache, or None if it doesn't exist
+        """
+        try:
+            key: Path = Path(self.dir_cache.get(url))
+            items = self.scan_directory(key).items()
+        except (DirCacheMiss, FileNotFoundError):  # deleted while reading
+            return None
+        return self._build_summary(url, items)
+
     def put(self, url: str, data: Summary) -> str:
         """
         Puts/Replaces the information from 'data' into the
@@ -214,10 +504,23 @@ class SummaryDirCache:
 
         Overwrites previous files/information if it exists for the URL
         """
+        try:
+            skey: str = self.dir_cache.get(url)
+        except DirCacheMiss:
+            staged = self.dir_cache.stage(url)
+            try:
+                self._write_attrs(Path(staged), data)
+            except BaseException:
+                shutil.rmtree(staged, ignore_errors=True)
+                raise
+            return self.dir_cache.publish(url, staged)
+        with self.dir_cache.entry_lock(skey):
+            self._write_attrs(Path(skey), data)
+            if self.fsync:
+                fsync_path(skey)
+        return skey
 
-        skey: str = self.dir_cache.put(url)
-        key: Path = Path(skey)
-
+    def _write_attrs(self, key: Path, data: Summary) -> None:
         for attr in SUMMARY_ATTRS:
             # get the value from the Summary dataclass
             val: Optional[Any] = getattr(data, attr, None)
@@ -233,27 +536,94 @@ class SummaryDirCache:
                 if val.keys():
                     base.mkdir(parents=True, exist_ok=True)
                 for data_key, data_val in val.items():
-                    psr = self.attr_file_parsers[data_key]
-                    psr.dump(data_val, base / psr.filename)
+                    self._dump(self.attr_file_parsers[data_key], data_val, base)
+                if self.fsync and val.keys():
+                    fsync_path(str(base))
             else:
-                psr = self.attr_file_parsers[attr]
-                psr.dump(val, base / psr.filename)
+                self._dump(self.attr_file_parsers[attr], val, base)
 
-        return skey
+    def _replace(self, dest: Path, write: Callable[[Path], Any]) -> None:
+        """
+        Calls write with a hidden path next to dest, and renames it to dest,
+        so readers see either the old file or the complete new one
+        """
+        # keep the extension, which decides the compression
+        tmp = dest.with_name(f".tmp-{os.getpid()}-{threading.get_ident()}-{dest.name}")
+        try:
+            write(tmp)
+            if not tmp.exists():  # nothing to save
+                return
+            if self.fsync:
+                fsync_path(str(tmp))
+            os.replace(tmp, dest)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def _dump(self, psr: FileParser[Any], val: Any, base: Path) -> None:
+        filename = psr.filename
+        if psr.compressible and self.codec is not None:
+            filename += self.codec.ext
+        self._replace(base / filename, lambda p: psr.dump(val, p))
+        # remove the previous file, if it was saved with a different compression
+        for other in psr.filenames:
+            if other != filename:
+                try:
+                    (base / other).unlink()
+                except FileNotFoundError:
+                    pass
+
+    def compact(self, keydir: Path, codec: Optional[Codec] = None) -> Tuple[int, int]:
+        """
+        Compresses the files for compressible parsers in a cache directory
+        which aren't compressed with 'codec' (by default, zstd if its installed else gzip)
 
-    def has_null_value(self, url: str) -> bool:
+        Returns the size of those files before and after
+
+        Each file is compacted while holding the entry lock, so a concurrent
+        put can't replace it between it being read and removed
         """
-        Currently not Implemented
+        if codec is None:
+            codec = default_codec()
+        before, after = 0, 0
+        for target in keydir.rglob("*"):
+            if target.name in IGNORE_FILES or target.name.startswith("."):
+                continue
+            if codec_for(target) is codec:
+                continue
+            if not target.is_file():
+                continue
+            psr = next((p for p in self.file_parsers if p.matches(target)), None)
+            if psr is None or not psr.compressible:
+                continue
+            with self.dir_cache.entry_lock(str(keydir)):
+                try:
+                    data = compression.read_bytes(target)
+                except FileNotFoundError:  # replaced by a put since it was listed
+                    continue
+                name = target.name
+                if codec_for(target) is not None:
+                    name = name[: -len(target.suffix)]
+                dest = target.with_name(name + codec.ext)
+                compressed = codec.compress(data)
+                self._replace(dest, lambda p: p.write_bytes(compressed))
+                before += target.stat().st_size
+                after += dest.stat().st_size
+                target.unlink()
+        return before, after
+
+    def put_attr(self, url: str, attr: str, val: Any) -> None:
+        """
+        Replaces one top-level attribute (e.g. 'html_summary') for a
+        cached url, without rewriting any of the other files
 
         If the item isn't in cache, raises DirCacheMiss
-        If the item is in cache, but it doesn't have any values (i.e. empty
-        json file and no srt data), then return True
-        else return False (this has data)
-
-        meant to be used to 'retry' getting url metadata, in case none was retrieved
         """
-        # TODO: implement? may not be needed
-        raise NotImplementedError
+        key: Path = Path(self.dir_cache.get(url))
+        with self.dir_cache.entry_lock(str(key)):
+            self._dump(self.attr_file_parsers[attr], val, key)
+            if self.fsync:
+                fsync_path(str(key))
 
     def has(self, url: str) -> bool:
         """
@@ -263,3 +633,51 @@ class SummaryDirCache:
         calls the underlying DirCache.exists function
         """
         return self.dir_cache.exists(url)
+
+    def delete(self, url: str) -> bool:
+        return self.dir_cache.delete(url)
+
+    def keyfiles(self) -> List[Path]:
+        """The absolute path of each key file in the cache"""
+        return [
+            p.absolute()
+            for p in self.data_dir.rglob("*/key")
+            # skip entries which are still being written
+            if not p.parent.name.startswith(".")
+        ]
+
+    def urls(self) -> Iterator[str]:
+        for p in self.keyfiles():
+            try:
+                yield p.read_text()
+            except FileNotFoundError:  # deleted while iterating
+                pass
+
+    def lock(self, url: str, name: str) -> FileLock:
+        return self.dir_cache.lock(url, name)
+
+
+def migrate(src: SummaryCache, dest: SummaryCache) -> int:
+    """
+    Copies every entry from one backend to another, replacing any
+    data for the same url in 'dest'. Returns how many entries were copied
+    """
+    count = 0
+    for url in src.urls():
+        summary = src.get(url)
+        if summary is None:
+            continue
+        dest.put(url, summary)
+        count += 1
+    dest.flush()
+    return count
+
+
+def hashed_lock(lock_dir: Path, url: str, name: str) -> FileLock:
+    """
+    A FileLock for backends which don't have a directory for each url,
+    shared by urls whose hash starts with the same 3 characters,
+    so there are at most 4096 lockfiles for each name
+    """
+    os.makedirs(lock_dir, exist_ok=True)
+    return FileLock(str(lock_dir / f"{DirCache.hash_key(url)[:3]}{name}"))
@@ -1,11 +1,8 @@
 import re
-import warnings
 from datetime import timedelta
-from urllib.parse import unquote
+from urllib.parse import unquote, urlparse
 from pathlib import Path
-from typing import Union, Generator, Dict, Any
-
-import backoff  # type: ignore[import]
+from typing import Union
 
 
 def normalize_path(p: Union[str, Path]) -> Path:
@@ -19,24 +16,6 @@ def normalize_path(p: Union[str, Path]) -> Path:
     return pth.expanduser().absolute()
 
 
-def fibo_backoff() -> Generator[float, None, None]:
-    """
-    Fibonacci backoff, with the first 6 elements consumed.
-    In other words, this starts at 13, 21, ....
-    """
-    fib = backoff.fibo()
-    for _ in range(6):
-        next(fib)
-    yield from fib
-
-
-def backoff_warn(details: Dict[str, Any]) -> None:
-    warning_msg: str = "Backing off {wait:0.1f} seconds afters {tries} tries with {args} {kwargs}".format(
-        **details
-    )
-    warnings.warn(warning_msg)
-
-
 def clean_url(urlstr: str) -> str:
     """
     unquotes and removes whitespace from URLs
@@ -45,6 +24,24 @@ def clean_url(urlstr: str) -> str:
     return unquote(urlstr).strip()
 
 
+def url_host(urlstr: str) -> str:
+    """
+    Returns the (lowercased) hostname for a URL, or an empty string if there isn't one
+    If the URL has no scheme (e.g. 'youtu.be/...'), assumes its http
+
+    >>> url_host("https://www.Youtube.com/watch?v=_lOT2p_FCvA")
+    'www.youtube.com'
+    >>> url_host("youtu.be/_lOT2p_FCvA")
+    'youtu.be'
+    """
+    if "://" not in urlstr:
+        urlstr = "http://" + urlstr
+    try:
+        return urlparse(urlstr).hostname or ""
+    except ValueError:
+        return ""
+
+
 timedelta_regex = re.compile(
     r"^((?P<weeks>[\.\d]+?)w)?((?P<days>[\.\d]+?)d)?((?P<hours>[\.\d]+?)h)?((?P<minutes>[\.\d]+?)m)?((?P<seconds>[\.\d]+?)s)?$"
 )
@@ -1,10 +1,25 @@
 import os
+import time
 import tempfile
 import shutil
-from typing import Generator
+import threading
+from datetime import datetime
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import (
+    Any,
+    Callable,
+    Counter,
+    Dict,
+    Generator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import pytest
-from url_cache.core import URLCache
+from url_cache.core import URLCache, Summary
 
 
 @pytest.fixture()
@@ -15,3 +30,142 @@ def ucache() -> Generator[URLCache, None, None]:  # type: ignore[misc]
 
 
 tests_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+class FakeRequestCache(URLCache):
+    """
+    Doesn't make any requests, just records which thread
+    each URL was requested from and when
+    """
+
+    def __init__(self, *args, **kwargs) -> None:  # type: ignore[no-untyped-def]
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.requested: List[Tuple[str, str, float]] = []
+
+    def request_data(self, url: str, preprocess_url: bool = True) -> Summary:
+        if "broken" in url:
+            raise ValueError(f"could not request {url}")
+        with self.lock:
+            self.requested.append((url, threading.current_thread().name, time.time()))
+        time.sleep(0.05)
+        return Summary(url=url, metadata={"title": url}, timestamp=datetime.now())
+
+
+# compared after a round trip, which drops microseconds
+TIMESTAMP = datetime(2021, 5, 11, 20, 0, 31)
+
+
+def make_summary(
+    url: str,
+    *,
+    title: Optional[str] = None,
+    html: str = "<p>text</p>",
+    data: Optional[Dict[str, Any]] = None,
+) -> Summary:
+    """A summary to put in a cache, titled with the URL unless title is given"""
+    return Summary(
+        url=url,
+        metadata={"title": url if title is None else title},
+        html_summary=html,
+        timestamp=TIMESTAMP,
+        data={} if data is None else data,
+        status={"status_code": 200, "failures": 0},
+    )
+
+
+class Page(NamedTuple):
+    """A response from the local server started by the 'pages' fixture"""
+
+    status: int = 200
+    body: bytes = b""
+    content_type: Optional[str] = "text/html; charset=utf-8"
+    # if this includes an ETag, requests with a matching If-None-Match get a 304
+    headers: Optional[Dict[str, str]] = None
+
+
+def html_page(
+    title: str = "Page", text: str = "Some text on the page, long enough to keep."
+) -> bytes:
+    return f"<html><head><title>{title}</title></head><body><p>{text}</p></body></html>".encode()
+
+
+class PageServer:
+    """
+    What the local server responds with for each path, which tests can change
+    while its running. A list of pages is served in order (the last one
+    is repeated), default is used for paths which aren't in routes, and
+    can be a function which receives the path
+    """
+
+    def __init__(self) -> None:
+        self.url = ""
+        self.routes: Dict[str, Union[Page, List[Page]]] = {}
+        self.default: Union[None, Page, Callable[[str], Page]] = None
+        # number of requests for each path
+        self.hits: Counter[str] = Counter()
+        # (path, headers with lowercase names) for each request
+        self.requests: List[Tuple[str, Dict[str, str]]] = []
+        self._lock = threading.Lock()
+
+    def header(self, name: str) -> List[Optional[str]]:
+        """The value of a request header, for each request"""
+        return [headers.get(name.lower()) for _, headers in self.requests]
+
+    def respond(self, path: str, headers: Dict[str, str]) -> Page:
+        with self._lock:
+            served = self.hits[path]
+            self.hits[path] += 1
+            self.requests.append((path, {k.lower(): v for k, v in headers.items()}))
+            page = self.routes.get(path, self.default)
+        if isinstance(page, list):
+            return page[min(served, len(page) - 1)]
+        if callable(page):
+            return page(path)
+        return Page(status=404) if page is None else page
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    server: "PageHTTPServer"
+
+    def do_GET(self) -> None:
+        page = self.server.pages.respond(self.path, dict(self.headers))
+        headers = page.headers or {}
+        etag = headers.get("ETag")
+        if etag is not None and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(page.status)
+        if page.content_type is not None:
+            self.send_header("Content-Type", page.content_type)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(page.body)))
+        self.end_headers()
+        try:
+            self.wfile.write(page.body)
+        except (BrokenPipeError, ConnectionResetError):  # e.g. stopped at max_body_size
+            pass
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class PageHTTPServer(HTTPServer):
+    def __init__(self, pages: PageServer):
+        super().__init__(("127.0.0.1", 0), PageHandler)
+        self.pages = pages
+
+
+@pytest.fixture()
+def pages() -> Generator[PageServer, None, None]:  # type: ignore[misc]
+    """Runs a local HTTP server on a background thread, which serves PageServer.routes"""
+    server = PageServer()
+    httpd = PageHTTPServer(server)
+    server.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    th = threading.Thread(target=httpd.serve_forever, daemon=True)
+    th.start()
+    yield server
+    httpd.shutdown()
+    httpd.server_close()
@@ -0,0 +1,153 @@
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Generator, List
+
+import pytest
+
+from url_cache.dir_cache import DirCache
+from url_cache.dir_index import DirIndex
+from url_cache.summary_cache import FileParser, SummaryDirCache, _dump_file_text
+from url_cache.compression import GZIP
+
+from .fixture import make_summary
+
+
+def _fail(val: str, p: Path) -> None:
+    # write part of the file, then crash
+    _dump_file_text(val[:2], p)
+    raise RuntimeError("crashed while writing")
+
+
+def _load_text(p: Path) -> str:
+    return p.read_text()
+
+
+FAILING = FileParser(
+    name="subtitles", ext=".srt", load_func=_load_text, dump_func=_fail
+)
+
+
+@pytest.fixture()
+def data_dir() -> Generator[Path, None, None]:  # type: ignore[misc]
+    with tempfile.TemporaryDirectory() as d:
+        yield Path(d)
+
+
+def test_staged_entry_is_invisible(data_dir: Path) -> None:
+    dd = DirCache(str(data_dir))
+    staged = dd.stage("key1")
+    assert os.path.basename(staged).startswith(".tmp-")
+    assert not dd.exists("key1")
+    assert DirIndex(str(data_dir / "index.sqlite"), str(data_dir)).rebuild() == 0
+    cache = SummaryDirCache(data_dir)
+    assert list(cache.urls()) == []
+
+    published = dd.publish("key1", staged)
+    assert published.endswith("000")
+    assert dd.get("key1") == published
+    assert not os.path.exists(staged)
+
+
+def test_failed_put_leaves_nothing(data_dir: Path) -> None:
+    cache = SummaryDirCache(data_dir, file_parsers=[FAILING])
+    url = "https://example.com/a"
+    s = make_summary(url)
+    s.data["subtitles"] = "1\n00:00:01,000 --> 00:00:02,000\nhi"
+    with pytest.raises(RuntimeError):
+        cache.put(url, s)
+    assert not cache.has(url)
+    assert list(cache.urls()) == []
+    # the staged directory was removed
+    assert [p for p in data_dir.rglob("*") if p.name.startswith(".")] == []
+
+
+def test_failed_update_keeps_old_value(data_dir: Path) -> None:
+    cache = SummaryDirCache(data_dir, file_parsers=[FAILING])
+    url = "https://example.com/a"
+    cache.put(url, make_summary(url, html="<p>old</p>"))
+    with pytest.raises(RuntimeError):
+        cache.put_attr(url, "subtitles", "new subtitles")
+    got = cache.get(url)
+    assert got is not None
+    assert got.html_summary == "<p>old</p>"
+    assert "subtitles" not in got.data
+
+
+def test_readers_never_see_partial_entries(data_dir: Path) -> None:
+    writer = SummaryDirCache(data_dir)
+    reader = SummaryDirCache(data_dir)
+    urls = [f"https://example.com/{i}" for i in range(50)]
+    done = threading.Event()
+    errors: List[str] = []
+
+    def _read() -> None:
+        while not done.is_set():
+            for url in urls:
+                got = reader.get(url)
+                if got is None:
+                    continue
+                if got.html_summary is None or got.timestamp is None:
+                    errors.append(url)
+
+    t = threading.Thread(target=_read)
+    t.start()
+    try:
+        for _ in range(3):
+            for url in urls:
+                writer.put(url, make_summary(url, html="<p>" + "x" * 10000 + "</p>"))
+    finally:
+        done.set()
+        t.join()
+    assert errors == []
+    assert sorted(writer.urls()) == sorted(urls)
+
+
+def test_fsync(data_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: List[int] = []
+    real_fsync = os.fsync
+
+    def _fsync(fd: int) -> None:
+        calls.append(fd)
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", _fsync)
+    url = "https://example.com/a"
+    SummaryDirCache(data_dir).put(url, make_summary(url))
+    assert calls == []
+
+    cache = SummaryDirCache(data_dir, fsync=True)
+    cache.put("https://example.com/b", make_summary("https://example.com/b"))
+    assert len(calls) > 0
+    got = cache.get("https://example.com/b")
+    assert got is not None and got.html_summary == "<p>text</p>"
+
+
+def test_files_removed_while_reading(
+    data_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache = SummaryDirCache(data_dir)
+    url = "https://example.com/a"
+    keydir = Path(cache.put(url, make_summary(url)))
+    real_load = FileParser.load
+    compacted: List[int] = []
+
+    def _load(self: FileParser, p: Path) -> Any:  # type: ignore[type-arg]
+        # compacted after the directory was listed, before the file is read
+        if p.name == "html_summary.html" and not compacted:
+            compacted.append(1)
+            cache.compact(keydir, GZIP)
+        return real_load(self, p)
+
+    monkeypatch.setattr(FileParser, "load", _load)
+    got = cache.get(url)
+    assert compacted == [1]
+    assert got is not None and got.html_summary == "<p>text</p>"
+    assert (keydir / "html_summary.html.gz").exists()
+
+    # the directory is deleted after its found
+    monkeypatch.setattr(cache.dir_cache, "get", lambda _: str(keydir))
+    shutil.rmtree(keydir)
+    assert cache.get(url) is None
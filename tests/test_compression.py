@@ -0,0 +1,101 @@
+import json
+import tempfile
+import threading
+from pathlib import Path
+from typing import List
+
+import pytest
+from click.testing import CliRunner
+
+from url_cache.summary_cache import SummaryDirCache
+from url_cache import compression
+from url_cache.compression import default_codec, GZIP
+from url_cache.__main__ import main
+
+from .fixture import make_summary
+
+HTML = "<p>" + "some repetitive page text " * 200 + "</p>"
+
+
+def _files(keydir: str) -> List[str]:
+    return sorted(p.name for p in Path(keydir).iterdir())
+
+
+def test_compressed_put_get() -> None:
+    url = "https://example.com/a"
+    with tempfile.TemporaryDirectory() as d:
+        plain = SummaryDirCache(Path(d))
+        keydir = plain.put(url, make_summary(url, title="page", html=HTML))
+        assert "html_summary.html" in _files(keydir)
+
+        packed = SummaryDirCache(Path(d), compress=True)
+        # reads uncompressed entries written before compression was enabled
+        s = packed.get(url)
+        assert s is not None and s.html_summary == HTML
+
+        packed.put(url, make_summary(url, title="page", html=HTML))
+        ext = default_codec().ext
+        files = _files(keydir)
+        assert f"html_summary.html{ext}" in files
+        assert "html_summary.html" not in files
+        assert (Path(keydir) / f"html_summary.html{ext}").stat().st_size < len(HTML)
+        for cache in (plain, packed):
+            s = cache.get(url)
+            assert s is not None and s.html_summary == HTML
+
+        # writing uncompressed again replaces the compressed file
+        plain.put_attr(url, "html_summary", "<p>new</p>")
+        assert f"html_summary.html{ext}" not in _files(keydir)
+        s = packed.get(url)
+        assert s is not None and s.html_summary == "<p>new</p>"
+
+
+def test_compact() -> None:
+    with tempfile.TemporaryDirectory() as d:
+        # where URLCache stores entries, for --cache-dir d
+        cache = SummaryDirCache(Path(d) / "data")
+        keydirs = [cache.put(u, make_summary(u, title="page", html=HTML)) for u in ("https://a.com", "https://b.com")]
+        before, after = cache.compact(Path(keydirs[0]), GZIP)
+        assert before == len(HTML) and 0 < after < before
+        assert "html_summary.html.gz" in _files(keydirs[0])
+        # already compressed
+        assert cache.compact(Path(keydirs[0]), GZIP) == (0, 0)
+
+        res = CliRunner().invoke(main, ["--cache-dir", d, "compact", "-j", "2"])
+        assert res.exit_code == 0, res.output
+        assert "Checked 2 directories" in res.output
+        ext = default_codec().ext
+        for keydir in keydirs:
+            files = _files(keydir)
+            assert f"html_summary.html{ext}" in files
+            assert "html_summary.html" not in files
+
+        res = CliRunner().invoke(main, ["--cache-dir", d, "--offline", "export"])
+        assert res.exit_code == 0, res.output
+        assert [s["html_summary"] for s in json.loads(res.output)] == [HTML, HTML]
+
+
+def test_compact_concurrent_put(monkeypatch: pytest.MonkeyPatch) -> None:
+    url = "https://example.com/a"
+    with tempfile.TemporaryDirectory() as d:
+        cache = SummaryDirCache(Path(d))
+        keydir = Path(cache.put(url, make_summary(url, title="page", html=HTML)))
+        writer = threading.Thread(
+            target=cache.put_attr, args=(url, "html_summary", "<p>new</p>")
+        )
+        read_bytes = compression.read_bytes
+
+        def _read_bytes(p: Path) -> bytes:
+            data = read_bytes(p)
+            # the file is replaced after compact read it
+            if not writer.is_alive() and writer.ident is None:
+                writer.start()
+                writer.join(timeout=0.5)
+            return data
+
+        monkeypatch.setattr(compression, "read_bytes", _read_bytes)
+        cache.compact(keydir, GZIP)
+        writer.join()
+        # the put waited for compact, so its value wasn't lost
+        s = cache.get(url)
+        assert s is not None and s.html_summary == "<p>new</p>"
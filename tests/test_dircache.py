@@ -1,6 +1,10 @@
 import os
 import shutil
 import tempfile
+import threading
+import multiprocessing
+from collections import Counter
+from typing import List
 
 from url_cache.dir_cache import DirCache
 
@@ -62,3 +66,118 @@ def test_delete() -> None:
     assert os.path.exists(d)
     shutil.rmtree(d)
     assert not os.path.exists(d)
+
+
+def test_dir_index() -> None:
+    d: str = tempfile.mkdtemp()
+    # created before the index existed
+    old_dir = DirCache(d).put("old")
+
+    index_path = os.path.join(d, "index.sqlite")
+    dd = DirCache(d, index_path=index_path)
+    assert dd.index is not None
+    # built from the directory tree, since it didn't exist
+    assert len(dd.index) == 1
+    assert dd.index.get("old") == old_dir
+    assert dd.get("old") == old_dir
+
+    new_dir = dd.put("new")
+    assert dd.index.get("new") == new_dir
+
+    # created by something which doesn't use the index
+    other_dir = DirCache(d).put("other")
+    assert dd.index.get("other") is None
+    assert dd.get("other") == other_dir
+    assert dd.index.get("other") == other_dir
+
+    # deleted by hand, index is out of date
+    shutil.rmtree(new_dir)
+    assert not dd.exists("new")
+    assert dd.index.get("new") is None
+
+    # moved by hand
+    moved = os.path.join(os.path.dirname(old_dir), "001")
+    shutil.move(old_dir, moved)
+    assert dd.get("old") == moved
+
+    assert dd.delete("other")
+    assert dd.index.get("other") is None
+    assert dd.index.rebuild() == 1
+
+    shutil.rmtree(d)
+
+
+class CollidingDirCache(DirCache):
+    """Every key hashes to the same directory"""
+
+    @staticmethod
+    def hash_key(key: str) -> str:
+        return "0" * 32
+
+
+def _put_keys(d: str, keys: List[str]) -> None:
+    dd = CollidingDirCache(d)
+    for k in keys:
+        kdir = dd.put(k)
+        with open(os.path.join(kdir, "key")) as f:
+            assert f.read() == k
+
+
+def _keys_in(d: str) -> List[str]:
+    keys = []
+    base = CollidingDirCache(d).base_dir_hashed_path("")
+    for name in os.listdir(base):
+        # no staged directories left behind
+        assert not name.startswith(".tmp-")
+        kdir = os.path.join(base, name)
+        if os.path.isdir(kdir):
+            with open(os.path.join(kdir, "key")) as f:
+                keys.append(f.read())
+    return keys
+
+
+def test_concurrent_put_processes() -> None:
+    d: str = tempfile.mkdtemp()
+    keys = [f"key{i}" for i in range(20)]
+    # each process puts all the keys (in a different order) into the same bucket
+    procs = [
+        multiprocessing.Process(target=_put_keys, args=(d, keys[i:] + keys[:i]))
+        for i in range(8)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert [p.exitcode for p in procs] == [0] * len(procs)
+
+    # one directory for each key
+    found = Counter(_keys_in(d))
+    assert sorted(found) == sorted(keys)
+    assert set(found.values()) == {1}
+    shutil.rmtree(d)
+
+
+def test_concurrent_put_threads() -> None:
+    d: str = tempfile.mkdtemp()
+    keys = [f"key{i}" for i in range(50)]
+    errors: List[BaseException] = []
+
+    def _run(ks: List[str]) -> None:
+        try:
+            _put_keys(d, ks)
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=_run, args=(keys[i * 5 :] + keys[: i * 5],))
+        for i in range(10)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    found = Counter(_keys_in(d))
+    assert sorted(found) == sorted(keys)
+    assert set(found.values()) == {1}
+    shutil.rmtree(d)
@@ -0,0 +1,55 @@
+from typing import Dict
+
+import pytest
+import requests
+
+from url_cache.core import URLCache
+from url_cache.fetch import FetchLimits, fetch_response
+
+from .fixture import ucache, pages, Page, PageServer
+
+BIG_PAGE = b"<html><head><title>Big</title></head><body>" + b"<p>text</p>" * 20000 + b"</body></html>"
+
+ROUTES: Dict[str, Page] = {
+    "/big": Page(body=BIG_PAGE),
+    "/file.iso": Page(body=b"\x00" * 200000, content_type="application/x-iso9660-image"),
+    "/unknown": Page(
+        body=b"<!DOCTYPE html><html><title>Sniffed</title></html>",
+        content_type="application/octet-stream",
+    ),
+}
+
+
+@pytest.fixture()
+def server(pages: PageServer) -> str:
+    pages.routes.update(ROUTES)
+    return pages.url
+
+
+def test_fetch_limits(server: str) -> None:
+    s = requests.Session()
+    res = fetch_response(s, server + "/big", limits=FetchLimits(max_body_size=1000))
+    assert res.mimetype == "text/html"
+    assert res.truncated
+    assert len(res.response.content) == 1000
+
+    res = fetch_response(s, server + "/big")
+    assert not res.truncated
+    assert res.response.content == BIG_PAGE
+
+    # body isn't downloaded for files
+    res = fetch_response(s, server + "/file.iso")
+    assert res.mimetype == "application/x-iso9660-image"
+    assert res.response.content == b""
+
+    # generic content type, sniffed from the body
+    res = fetch_response(s, server + "/unknown")
+    assert res.mimetype == "text/html"
+    assert b"Sniffed" in res.response.content
+
+
+def test_file_metadata(ucache: URLCache, server: str) -> None:
+    summ = ucache.get(server + "/file.iso")
+    assert summ.html_summary is None
+    assert summ.metadata["content_type"] == "application/x-iso9660-image"
+    assert summ.metadata["content_length"] == 200000
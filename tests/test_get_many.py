@@ -0,0 +1,103 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from url_cache.core import URLCache, Summary
+from url_cache.__main__ import main
+
+from .fixture import ucache, FakeRequestCache
+
+
+def test_get_many(ucache: URLCache) -> None:
+    fc = FakeRequestCache(cache_dir=ucache._base_cache_dir, sleep_time=0)
+    urls = [
+        "https://a.com/1",
+        "https://b.com/1",
+        "https://youtu.be/xvQUiX26RfE",
+        "https://a.com/2",
+        "https://broken.com/",
+        "https://www.youtube.com/watch?v=xvQUiX26RfE",
+        "https://c.com/1",
+    ]
+    # put one item in cache already, shouldn't be requested
+    fc.summary_cache.put("https://c.com/1", Summary(url="https://c.com/1"))
+
+    res = fc.get_many(urls, max_workers=4)
+
+    # returned in input order
+    assert [r.url for r in res] == urls
+    assert res[0].summary is not None
+    assert res[0].summary.metadata["title"] == "https://a.com/1"
+    assert res[6].summary is not None and res[6].summary.metadata == {}
+
+    # error is attached instead of raising
+    assert res[4].summary is None
+    assert isinstance(res[4].error, ValueError)
+
+    # deduplicated after preprocessing
+    assert res[2].summary == res[5].summary
+    requested_urls = [u for u, _, _ in fc.requested]
+    assert sorted(requested_urls) == sorted(
+        [
+            "https://a.com/1",
+            "https://a.com/2",
+            "https://b.com/1",
+            "https://www.youtube.com/watch?v=xvQUiX26RfE",
+        ]
+    )
+
+    # all requests for one host are made from the same thread, sequentially
+    a_threads = {t for u, t, _ in fc.requested if "a.com" in u}
+    assert len(a_threads) == 1
+    assert fc.in_cache("https://a.com/2")
+
+
+def test_iter_many(ucache: URLCache) -> None:
+    fc = FakeRequestCache(cache_dir=ucache._base_cache_dir, sleep_time=0)
+    urls = [f"https://site{i % 5}.com/{i}" for i in range(20)] + ["https://broken.com"]
+    urls.append(urls[0])
+
+    res = list(fc.iter_many(urls, max_workers=5))
+    # duplicate only yielded once
+    assert len(res) == 21
+    assert {r.url for r in res} == set(urls)
+    assert sum(1 for r in res if r.error is not None) == 1
+
+    # everything is cached now, so nothing else is requested
+    fc.requested.clear()
+    assert len(list(fc.iter_many(urls))) == 21
+    assert fc.requested == []
+
+    # stopping early doesn't block/request everything
+    more = [f"https://other{i}.com/" for i in range(50)]
+    it = fc.iter_many(more, max_workers=2)
+    next(it)
+    it.close()
+    assert len(fc.requested) < 50
+
+
+def test_get_cli(ucache: URLCache, monkeypatch: pytest.MonkeyPatch) -> None:
+    # the CLI creates a FakeRequestCache, so nothing is requested
+    monkeypatch.setattr("url_cache.__main__.URLCache", FakeRequestCache)
+    base = str(ucache._base_cache_dir)
+    urls = ["https://a.com/1", "https://b.com/1", "https://a.com/1", "https://c.com/1"]
+    runner = CliRunner()
+    res = runner.invoke(main, ["--cache-dir", base, "get", "-j", "2", "--jsonl", *urls])
+    assert res.exit_code == 0, res.output
+    lines = res.stdout.splitlines()
+    # one line for each unique URL
+    assert sorted(json.loads(line)["url"] for line in lines) == sorted(set(urls))
+
+    # errors are printed to stderr, the others are still printed
+    res = runner.invoke(
+        main, ["--cache-dir", base, "get", "-j", "2", "https://broken.com/", *urls]
+    )
+    assert res.exit_code == 1
+    assert "Error getting https://broken.com/" in res.stderr
+    # an array in input order, without the URL which failed
+    assert [s["url"] for s in json.loads(res.stdout)] == urls
+
+    res = runner.invoke(main, ["--cache-dir", base, "get", "--jsonl", "https://broken.com/"])
+    assert res.exit_code == 1
+    assert res.stdout == ""
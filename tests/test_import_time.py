@@ -0,0 +1,61 @@
+import os
+import sys
+import json
+import tempfile
+import subprocess
+from typing import List
+
+import pytest
+
+# modules which are only needed to request/parse URLs
+HEAVY_MODULES = [
+    "requests",
+    "urllib3",
+    "lassie",
+    "readability",
+    "lxml",
+    "bs4",
+    "pytube",
+    "logzero",
+]
+
+# seconds, to import url_cache and run a read-only command
+IMPORT_BUDGET = float(os.environ.get("URL_CACHE_IMPORT_BUDGET", 1.0))
+
+SCRIPT = """
+import sys, json, time
+
+start = time.perf_counter()
+from url_cache.__main__ import main
+
+try:
+    main(sys.argv[1:], standalone_mode=False)
+except SystemExit:
+    pass
+print(json.dumps({
+    "elapsed": time.perf_counter() - start,
+    "modules": sorted(m.split(".")[0] for m in sys.modules),
+}))
+"""
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        ["cachedir"],
+        ["list"],
+        ["in-cache", "https://youtu.be/xvQUiX26RfE"],
+    ],
+)
+def test_read_only_imports(command: List[str]) -> None:
+    d = tempfile.mkdtemp()
+    proc = subprocess.run(
+        [sys.executable, "-c", SCRIPT, "--cache-dir", d, *command],
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    # the command's output is printed first
+    res = json.loads(proc.stdout.decode().splitlines()[-1])
+    loaded = [m for m in HEAVY_MODULES if m in res["modules"]]
+    assert loaded == [], f"{command} imported {loaded}"
+    assert res["elapsed"] < IMPORT_BUDGET
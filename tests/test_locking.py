@@ -0,0 +1,86 @@
+import os
+import time
+import tempfile
+import threading
+import multiprocessing
+from typing import List
+
+import pytest
+
+from url_cache.core import URLCache, Summary
+from url_cache.locking import FileLock, SingleFlight, HAS_FCNTL
+
+from .fixture import ucache, FakeRequestCache
+
+
+def test_single_flight() -> None:
+    sf: SingleFlight[int] = SingleFlight()
+    calls: List[int] = []
+    results: List[int] = []
+
+    def work() -> int:
+        calls.append(1)
+        time.sleep(0.2)
+        return 5
+
+    threads = [
+        threading.Thread(target=lambda: results.append(sf.do("key", work)))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == [5] * 5
+
+    # once finished, the next call runs again
+    assert sf.do("key", work) == 5
+    assert len(calls) == 2
+
+
+def test_concurrent_get(ucache: URLCache) -> None:
+    fc = FakeRequestCache(cache_dir=ucache._base_cache_dir, sleep_time=0)
+    results: List[Summary] = []
+    url = "https://example.com/page"
+    threads = [
+        threading.Thread(target=lambda: results.append(fc.get(url)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(fc.requested) == 1
+    assert len(results) == 8
+    assert all(r.url == url for r in results)
+
+
+def _increment(path: str, lockpath: str) -> None:
+    for _ in range(20):
+        with FileLock(lockpath):
+            with open(path) as f:
+                val = int(f.read())
+            time.sleep(0.001)
+            with open(path, "w") as f:
+                f.write(str(val + 1))
+
+
+@pytest.mark.skipif(not HAS_FCNTL, reason="file locking requires fcntl")
+def test_file_lock_processes() -> None:
+    d = tempfile.mkdtemp()
+    counter = os.path.join(d, "counter")
+    with open(counter, "w") as f:
+        f.write("0")
+    procs = [
+        multiprocessing.Process(
+            target=_increment, args=(counter, os.path.join(d, "sub", ".lock"))
+        )
+        for _ in range(4)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    with open(counter) as f:
+        assert int(f.read()) == 80
@@ -0,0 +1,54 @@
+import os
+import time
+import tempfile
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from url_cache.core import URLCache
+from url_cache.html_utils import ReadabilitySummarizer
+from url_cache.memo import SummaryMemo, content_hash
+
+from .fixture import ucache, pages, Page, PageServer, html_page
+
+
+@pytest.fixture()
+def server(pages: PageServer) -> str:
+    # the same page on every path
+    pages.default = Page(
+        body=html_page("Mirror", "The same article text, on every path of this server.")
+    )
+    return pages.url
+
+
+def test_memo_eviction() -> None:
+    memo = SummaryMemo(Path(tempfile.mkdtemp()), max_bytes=250)
+    now = time.time()
+    for i in range(3):
+        key = content_hash(str(i))
+        memo.put(key, "x" * 100)
+        # make sure the mtimes are in order
+        os.utime(memo._path(key), (now - 100 + i, now - 100 + i))
+    # the oldest one was evicted
+    assert memo.get(content_hash("0")) is None
+    assert memo.get(content_hash("1")) == "x" * 100
+    assert memo.get(content_hash("2")) == "x" * 100
+
+
+def test_memoized_summary(
+    ucache: URLCache, server: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls: List[str] = []
+    orig = ReadabilitySummarizer.summarize
+
+    def _counting(self: ReadabilitySummarizer, html: str) -> str:
+        calls.append(html)
+        return orig(self, html)
+
+    monkeypatch.setattr(ReadabilitySummarizer, "summarize", _counting)
+    first = ucache.get(server + "/a")
+    second = ucache.get(server + "/b")
+    # same body, only summarized once
+    assert len(calls) == 1
+    assert first.html_summary == second.html_summary is not None
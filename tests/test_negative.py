@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+import pytest
+
+from url_cache.core import URLCache
+from url_cache.dir_cache import DirCacheMiss
+
+from .fixture import ucache, pages, Page, PageServer, html_page
+
+
+@pytest.fixture()
+def server(pages: PageServer) -> str:
+    pages.routes["/dead"] = Page(status=404)
+    return pages.url + "/dead"
+
+
+def test_negative_cache(ucache: URLCache, pages: PageServer, server: str) -> None:
+    summ = ucache.get(server)
+    assert summ.status["status_code"] == 404
+    assert summ.status["attempts"] == 1
+    assert summ.status["failures"] == 1
+    assert ucache.summary_cache.has_null_value(server)
+
+    # known to be dead, isn't requested again
+    cached = ucache.get(server)
+    assert cached.status == summ.status
+    assert pages.hits["/dead"] == 1
+
+    # once the negative TTL passes, its retried
+    ucache.negative_ttl = timedelta(seconds=-1)
+    retried = ucache.get(server)
+    assert pages.hits["/dead"] == 2
+    assert retried.status["failures"] == 2
+    ucache.negative_ttl = timedelta(days=1)
+    assert ucache.get(server).status["failures"] == 2
+    assert pages.hits["/dead"] == 2
+
+
+def test_expired_then_dead(ucache: URLCache, pages: PageServer, server: str) -> None:
+    pages.routes["/dead"] = Page(body=html_page())
+    summ = ucache.get(server)
+    assert summ.status["failures"] == 0
+
+    # the page expires, and is gone when its refreshed
+    ucache.expiry_duration = timedelta(hours=1)
+    assert summ.timestamp is not None
+    ucache.summary_cache.touch(server, summ.timestamp - timedelta(hours=2))
+    pages.routes["/dead"] = Page(status=404)
+    failed = ucache.get(server)
+    assert pages.hits["/dead"] == 2
+    assert failed.status["failures"] == 1
+    assert failed.metadata == summ.metadata
+
+    # the old timestamp is still expired, but the negative TTL hasn't passed
+    for _ in range(3):
+        assert ucache.get(server).status["failures"] == 1
+    assert pages.hits["/dead"] == 2
+
+
+def test_negative_ttl_growth(ucache: URLCache) -> None:
+    ucache.negative_ttl = timedelta(hours=1)
+    ucache.max_negative_ttl = timedelta(days=30)
+    assert ucache._negative_ttl(1) == timedelta(hours=1)
+    assert ucache._negative_ttl(3) == timedelta(hours=4)
+    assert ucache._negative_ttl(1000) == timedelta(days=30)
+
+    ucache.negative_ttl = None
+    assert ucache._negative_ttl(3) is None
+
+
+def test_has_null_value(ucache: URLCache) -> None:
+    with pytest.raises(DirCacheMiss):
+        ucache.summary_cache.has_null_value("https://example.com/missing")
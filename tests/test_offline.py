@@ -0,0 +1,54 @@
+import json
+from datetime import timedelta
+
+import pytest
+from click.testing import CliRunner
+
+from url_cache.core import URLCache
+from url_cache.exceptions import URLCacheOffline
+from url_cache.__main__ import main
+
+from .fixture import ucache, FakeRequestCache
+
+
+def test_offline(ucache: URLCache) -> None:
+    base = ucache._base_cache_dir
+    fc = FakeRequestCache(cache_dir=base, sleep_time=0)
+    fc.get("https://example.com/a")
+
+    oc = FakeRequestCache(
+        cache_dir=base, sleep_time=0, offline=True, options={"expiry_duration": "1s"}
+    )
+    oc.expiry_duration = timedelta(seconds=-1)
+    # expired, but still returned instead of being requested
+    assert oc.get("https://example.com/a").url == "https://example.com/a"
+    with pytest.raises(URLCacheOffline):
+        oc.get("https://example.com/b")
+    with pytest.raises(URLCacheOffline):
+        oc.refresh("https://example.com/a")
+
+    results = oc.get_many(["https://example.com/a", "https://example.com/b"])
+    assert results[0].summary is not None
+    assert isinstance(results[1].error, URLCacheOffline)
+    assert oc.requested == []
+    # never created the HTTP session
+    assert oc._session is None
+
+
+def test_offline_cli(ucache: URLCache) -> None:
+    base = str(ucache._base_cache_dir)
+    FakeRequestCache(cache_dir=base, sleep_time=0).get("https://example.com/a")
+    runner = CliRunner()
+    res = runner.invoke(
+        main,
+        ["--cache-dir", base, "--offline", "--expiry-duration", "1s", "export"],
+    )
+    assert res.exit_code == 0
+    assert [s["url"] for s in json.loads(res.output)] == ["https://example.com/a"]
+
+    res = runner.invoke(
+        main, ["--cache-dir", base, "--offline", "get", "https://example.com/b"]
+    )
+    assert res.exit_code == 1
+    # errors are printed to stderr, which is included in output
+    assert "offline" in res.output
@@ -0,0 +1,106 @@
+import os
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional
+
+import pytest
+
+from url_cache.core import URLCache
+from url_cache.model import Summary
+from url_cache.html_utils import summarize_html
+from url_cache.pipeline import SummarizerPool
+
+from .fixture import ucache, pages, Page, PageServer
+
+
+def _page(path: str) -> bytes:
+    para = f"<p>This is the article text for {path}, long enough to be kept by readability.</p>"
+    return f"<html><head><title>{path}</title></head><body><div>{para * 5}</div></body></html>".encode()
+
+
+@pytest.fixture()
+def server(pages: PageServer) -> str:
+    pages.default = lambda path: Page(body=_page(path))
+    return pages.url
+
+
+def test_summarize_workers(ucache: URLCache, server: str) -> None:
+    urls = [f"{server}/page{i}" for i in range(4)]
+    results = ucache.get_many(urls, summarize_workers=2)
+    for url, res in zip(urls, results):
+        assert res.error is None
+        assert res.summary is not None
+        path = "/" + url.rsplit("/", 1)[-1]
+        expected = summarize_html(_page(path).decode())
+        assert res.summary.html_summary == expected
+
+        # the summary replaced the full HTML in cache
+        d = ucache.get_cache_dir(url)
+        assert d is not None
+        with open(os.path.join(d, "html_summary.html")) as f:
+            assert f.read() == expected
+
+    # already cached, not summarized again
+    cached = ucache.get_many(urls, summarize_workers=2)[0].summary
+    assert cached is not None and results[0].summary is not None
+    assert cached.html_summary == results[0].summary.html_summary
+
+
+def test_failed_summary_isnt_saved(
+    ucache: URLCache, server: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def _fail(
+        self: SummarizerPool, html: str, callback: Callable[["Future[str]"], None]
+    ) -> None:
+        fut: "Future[str]" = Future()
+        fut.set_exception(RuntimeError("worker crashed"))
+        callback(fut)
+
+    monkeypatch.setattr(SummarizerPool, "submit", _fail)
+    saved: List[Optional[str]] = []
+    put = ucache.summary_cache.put
+
+    def _put(url: str, data: Summary) -> Optional[str]:
+        saved.append(data.html_summary)
+        return put(url, data)
+
+    monkeypatch.setattr(ucache.summary_cache, "put", _put)
+
+    url = f"{server}/page"
+    [res] = ucache.get_many([url], summarize_workers=1)
+    assert res.error is None and res.summary is not None
+    # the full HTML was never saved as the summary
+    assert saved == [None]
+    assert res.summary.html_summary is None
+    cached = ucache.summary_cache.get(url)
+    assert cached is not None
+    assert cached.metadata["title"] == "/page"
+    assert cached.html_summary is None
+
+
+def test_broken_summarizer_pool(
+    ucache: URLCache, server: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def _broken(
+        self: SummarizerPool, html: str, callback: Callable[["Future[str]"], None]
+    ) -> None:
+        raise BrokenProcessPool("a worker was killed")
+
+    monkeypatch.setattr(SummarizerPool, "submit", _broken)
+    urls = [f"{server}/page{i}" for i in range(2)]
+    results = ucache.get_many(urls, summarize_workers=1)
+    # summarized in the thread which requested it instead
+    for url, res in zip(urls, results):
+        assert res.error is None and res.summary is not None
+        path = "/" + url.rsplit("/", 1)[-1]
+        assert res.summary.html_summary == summarize_html(_page(path).decode())
+
+
+def test_dead_worker(ucache: URLCache, monkeypatch: pytest.MonkeyPatch) -> None:
+    def _die(*args: Any) -> None:
+        raise RuntimeError("worker died")
+
+    monkeypatch.setattr(ucache, "_get_serially", _die)
+    # raised, instead of waiting for results which never come
+    with pytest.raises(RuntimeError, match="worker died"):
+        ucache.get_many(["https://example.com/a"])
@@ -0,0 +1,40 @@
+from typing import List
+
+from url_cache.core import URLCache
+
+from .fixture import ucache, FakeRequestCache
+
+
+def test_preprocess_once(ucache: URLCache) -> None:
+    fc = FakeRequestCache(cache_dir=ucache._base_cache_dir, sleep_time=0)
+    called: List[str] = []
+    ext = fc.extractors[0]
+    orig = ext.preprocess_url
+
+    def _counting_preprocess(url: str) -> str:
+        called.append(url)
+        return orig(url)
+
+    ext.preprocess_url = _counting_preprocess  # type: ignore[assignment]
+
+    url = "https://youtu.be/xvQUiX26RfE"
+    fc.get(url)
+    # only preprocessed once, even though it wasn't in cache
+    assert called == [url]
+    assert fc.requested[0][0] == "https://www.youtube.com/watch?v=xvQUiX26RfE"
+
+    # remembered after that
+    assert fc.in_cache(url)
+    fc.get(url)
+    assert called == [url]
+
+
+def test_extractors_for(ucache: URLCache) -> None:
+    def names(url: str) -> List[str]:
+        return [type(e).__name__ for e in ucache.extractors_for(url)]
+
+    assert names("https://www.youtube.com/watch?v=xvQUiX26RfE") == ["Youtube"]
+    assert names("youtu.be/xvQUiX26RfE") == ["Youtube"]
+    assert names("https://stackoverflow.com/q/35013075") == ["StackOverflow"]
+    assert names("https://myanimelist.net/anime/1") == ["MyAnimeList"]
+    assert names("https://github.com/seanbreckenridge") == []
@@ -0,0 +1,44 @@
+from url_cache.rate_limit import RateLimit, HostLimiter, RateLimitScheduler
+
+
+def test_host_limiter() -> None:
+    hl = HostLimiter([RateLimit(calls=2, period=10)])
+    # first two are allowed immediately
+    assert hl.reserve() <= 0
+    assert hl.reserve() <= 0
+    # third has to wait for the first to be 10 seconds old
+    assert 9 < hl.reserve() <= 10
+    # fourth has to wait for the second
+    assert 9 < hl.reserve() <= 10
+
+    # no limits, never waits
+    nl = HostLimiter([RateLimit(calls=1, period=0)])
+    for _ in range(5):
+        assert nl.reserve() <= 0
+
+
+def test_multiple_limits() -> None:
+    hl = HostLimiter([RateLimit(calls=3, period=1), RateLimit(calls=5, period=60)])
+    waits = [hl.reserve() for _ in range(6)]
+    assert all(w <= 0 for w in waits[:3])
+    assert 0 < waits[3] <= 1
+    assert 0 < waits[4] <= 1
+    # sixth request is limited by the per-minute limit
+    assert 59 < waits[5] <= 60
+
+
+def test_scheduler_hosts() -> None:
+    sc = RateLimitScheduler(default=[RateLimit(calls=1, period=10)])
+    sc.configure("youtube.com", [RateLimit(calls=1, period=30)])
+
+    # different hosts don't wait on each other
+    assert sc.limiter("https://a.com/1").reserve() <= 0
+    assert sc.limiter("https://b.com/1").reserve() <= 0
+    assert sc.limiter("https://a.com/2").reserve() > 9
+
+    # subdomains share the configured budget
+    assert sc.limiter("https://www.youtube.com/watch?v=1").reserve() <= 0
+    assert sc.limiter("https://m.youtube.com/watch?v=2").reserve() > 29
+    assert sc.limiter("https://youtube.com/watch?v=2") is sc.limiter(
+        "youtube.com/watch?v=3"
+    )
@@ -0,0 +1,89 @@
+from datetime import datetime, timezone
+from typing import List
+
+import pytest
+import requests
+
+from url_cache.core import URLCache
+from url_cache.rate_limit import RateLimit, HostLimiter
+from url_cache.retry import Retrier, RetryPolicy, RetryBudget, parse_retry_after
+
+from .fixture import ucache, pages, Page, PageServer, html_page
+
+
+@pytest.fixture()
+def server(pages: PageServer) -> str:
+    # a 429 for the first request
+    pages.routes["/page"] = [
+        Page(status=429, headers={"Retry-After": "0"}),
+        Page(body=html_page(text="Some text"), content_type="text/html"),
+    ]
+    return pages.url + "/page"
+
+
+def test_parse_retry_after() -> None:
+    assert parse_retry_after("5") == 5.0
+    now = datetime(2015, 10, 21, 7, 27, tzinfo=timezone.utc)
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=now) == 60.0
+    # in the past
+    assert parse_retry_after("Wed, 21 Oct 2015 07:00:00 GMT", now=now) == 0.0
+    assert parse_retry_after("") is None
+    assert parse_retry_after(None) is None
+
+
+def test_retry_after(ucache: URLCache, pages: PageServer, server: str) -> None:
+    summ = ucache.get(server)
+    assert pages.hits["/page"] == 2
+    assert summ.status["attempts"] == 2
+    assert summ.status["status_code"] == 200
+    assert summ.metadata["title"] == "Page"
+    # slowed down after the 429, sped back up a bit after the success
+    assert 0.5 < ucache.scheduler.limiter(server).scale < 1
+
+
+def test_retry_budget() -> None:
+    budget = RetryBudget(budget=2, period=60)
+    assert budget.take("a.com")
+    assert budget.take("a.com")
+    assert not budget.take("a.com")
+    assert budget.take("b.com")
+
+
+def test_retry_exceptions() -> None:
+    calls: List[int] = []
+
+    def flaky() -> int:
+        calls.append(1)
+        if len(calls) < 3:
+            raise requests.ConnectionError("connection refused")
+        return 5
+
+    r = Retrier(policy=RetryPolicy(max_tries=3, base_delay=0))
+    assert r.call("https://a.com", flaky, retry_on=(requests.ConnectionError,)) == 5
+    assert len(calls) == 3
+
+    # not retried if it isn't in retry_on
+    calls.clear()
+    with pytest.raises(requests.ConnectionError):
+        r.call("https://a.com", flaky)
+    assert len(calls) == 1
+
+    # out of tries
+    calls.clear()
+    r = Retrier(policy=RetryPolicy(max_tries=2, base_delay=0))
+    with pytest.raises(requests.ConnectionError):
+        r.call("https://a.com", flaky, retry_on=(requests.ConnectionError,))
+    assert len(calls) == 2
+
+
+def test_aimd() -> None:
+    hl = HostLimiter([RateLimit(calls=1, period=1)])
+    hl.throttle()
+    hl.throttle()
+    assert hl.scale == 0.25
+    assert hl.reserve() <= 0
+    # period is 4x as long while throttled
+    assert 3.9 < hl.reserve() <= 4
+    for _ in range(100):
+        hl.recover()
+    assert hl.scale == 1.0
@@ -0,0 +1,80 @@
+import os
+from datetime import timedelta
+
+import pytest
+
+from url_cache.core import URLCache
+
+from .fixture import ucache, pages, Page, PageServer, html_page
+
+PAGE = Page(body=html_page(), headers={"ETag": '"v1"'})
+
+
+@pytest.fixture()
+def server(pages: PageServer) -> str:
+    pages.routes["/page"] = PAGE
+    return pages.url + "/page"
+
+
+def test_revalidate(ucache: URLCache, pages: PageServer, server: str) -> None:
+    summ = ucache.get(server)
+    assert summ.validators == {"etag": '"v1"'}
+    assert summ.html_summary is not None
+    assert pages.header("If-None-Match") == [None]
+
+    dir_full_path = ucache.get_cache_dir(server)
+    assert dir_full_path is not None
+    html_file = os.path.join(dir_full_path, "html_summary.html")
+    mtime = os.stat(html_file).st_mtime_ns
+
+    # everything is expired now
+    ucache.expiry_duration = timedelta(seconds=-1)
+    summ2 = ucache.get(server)
+
+    # made a conditional request, which returned a 304
+    assert pages.header("If-None-Match") == [None, '"v1"']
+    assert summ2.html_summary == summ.html_summary
+    assert summ2.validators == summ.validators
+    # didn't rewrite any files
+    assert os.stat(html_file).st_mtime_ns == mtime
+
+
+def test_max_age(ucache: URLCache, pages: PageServer, server: str) -> None:
+    ucache.get(server)
+    assert len(pages.requests) == 1
+    d = ucache.get_cache_dir(server)
+    assert d is not None
+    with open(os.path.join(d, "validators.json"), "w") as f:
+        f.write('{"etag": "\\"v1\\"", "max_age": 3600}')
+
+    # server said this is fresh for an hour, so doesn't make a request
+    ucache.expiry_duration = timedelta(seconds=-1)
+    ucache.get(server)
+    assert len(pages.requests) == 1
+
+
+def test_not_modified_resets_failures(
+    ucache: URLCache, pages: PageServer, server: str
+) -> None:
+    ucache.get(server)
+    ucache.expiry_duration = timedelta(seconds=-1)
+    # the page is temporarily gone
+    pages.routes["/page"] = Page(status=404)
+    failed = ucache.get(server)
+    assert failed.status["failures"] == 1
+    assert len(pages.requests) == 2
+
+    # retried once the negative TTL passes, and the page hasn't changed
+    pages.routes["/page"] = PAGE
+    ucache.negative_ttl = timedelta(seconds=-1)
+    summ = ucache.get(server)
+    assert pages.header("If-None-Match")[-1] == '"v1"'
+    assert summ.status["status_code"] == 304
+    assert summ.status["failures"] == 0
+    assert not ucache.summary_cache.has_null_value(server)
+
+    # fresh again, so isn't requested
+    ucache.expiry_duration = timedelta(hours=1)
+    for _ in range(3):
+        assert ucache.get(server).status["failures"] == 0
+    assert len(pages.requests) == 3
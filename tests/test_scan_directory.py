@@ -0,0 +1,63 @@
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from typing import List
+
+import pytest
+
+from url_cache.model import Summary
+from url_cache.summary_cache import (
+    FileParser,
+    SummaryDirCache,
+    _load_file_text,
+    _dump_file_text,
+)
+
+SUBTITLES = FileParser(
+    name="subtitles", ext=".srt", load_func=_load_file_text, dump_func=_dump_file_text
+)
+
+
+def test_scan_directory(monkeypatch: pytest.MonkeyPatch) -> None:
+    url = "https://example.com/a"
+    with tempfile.TemporaryDirectory() as d:
+        cache = SummaryDirCache(Path(d), file_parsers=[SUBTITLES], compress=True)
+        assert cache.filename_parsers["subtitles.srt"] is SUBTITLES
+        assert cache.filename_parsers["metadata.json"].name == "metadata"
+        keydir = Path(
+            cache.put(
+                url,
+                Summary(
+                    url=url,
+                    metadata={"title": "page"},
+                    html_summary="<p>text</p>",
+                    timestamp=datetime.fromtimestamp(int(datetime.now().timestamp())),
+                    data={"subtitles": "hi"},
+                ),
+            )
+        )
+        # left behind by a crashed write
+        (keydir / ".tmp-1-2-metadata.json").write_text("{")
+
+        matched: List[str] = []
+        real_matches = FileParser.matches
+
+        def _matches(self: FileParser, p: Path) -> bool:  # type: ignore[type-arg]
+            matched.append(p.name)
+            return real_matches(self, p)
+
+        monkeypatch.setattr(FileParser, "matches", _matches)
+
+        # known names are looked up, without trying each parser
+        s = cache.get(url)
+        assert s is not None
+        assert s.metadata == {"title": "page"}
+        assert s.html_summary == "<p>text</p>"
+        assert s.data == {"subtitles": "hi"}
+        assert matched == []
+
+        # other names still fall back to matching each parser
+        (keydir / "data" / "subtitles.srt").rename(keydir / "data" / "subtitles-en.srt")
+        s = cache.get(url)
+        assert s is not None and s.data == {"subtitles": "hi"}
+        assert "subtitles-en.srt" in matched
@@ -0,0 +1,167 @@
+import os
+import json
+import tempfile
+from pathlib import Path
+from typing import Generator, List
+
+import pytest
+from click.testing import CliRunner
+
+import url_cache.segment_cache
+from url_cache.dir_cache import DirCacheMiss
+from url_cache.segment_cache import SummarySegmentCache
+from url_cache.__main__ import main
+
+from .fixture import FakeRequestCache, make_summary
+
+
+@pytest.fixture()
+def segdir() -> Generator[Path, None, None]:  # type: ignore[misc]
+    with tempfile.TemporaryDirectory() as d:
+        yield Path(d) / "segments"
+
+
+HTML = "<p>" + "text " * 100 + "</p>"
+
+
+def _segment_files(segdir: Path) -> List[str]:
+    return sorted(p.name for p in segdir.glob("*.seg"))
+
+
+def test_segment_cache(segdir: Path) -> None:
+    cache = SummarySegmentCache(segdir)
+    url = "https://example.com/a"
+    assert cache.get(url) is None
+    with pytest.raises(DirCacheMiss):
+        cache.put_attr(url, "html_summary", "<p>new</p>")
+
+    cache.put(url, make_summary(url, html=HTML))
+    assert cache.get(url) == make_summary(url, html=HTML)
+    cache.put_attr(url, "html_summary", "<p>new</p>")
+    s = cache.get(url)
+    assert s is not None and s.html_summary == "<p>new</p>"
+    assert s.metadata == {"title": url}
+
+    cache.put("https://example.com/b", make_summary("https://example.com/b", html=HTML))
+    assert sorted(cache.urls()) == [url, "https://example.com/b"]
+    assert cache.delete("https://example.com/b")
+    assert not cache.delete("https://example.com/b")
+    assert not cache.has("https://example.com/b")
+
+    # without an index, reopening scans the segments
+    reopened = SummarySegmentCache(segdir)
+    assert reopened._mm is None
+    s = reopened.get(url)
+    assert s is not None and s.html_summary == "<p>new</p>"
+    assert not reopened.has("https://example.com/b")
+
+    reopened.flush()
+    indexed = SummarySegmentCache(segdir)
+    assert indexed._count == 1 and indexed._recent == {}
+    assert list(indexed.urls()) == [url]
+
+    # appended by another instance/process, found when its not in the index
+    cache.put("https://example.com/c", make_summary("https://example.com/c", html=HTML))
+    assert indexed.has("https://example.com/c")
+
+
+def test_other_writers(segdir: Path) -> None:
+    a = SummarySegmentCache(segdir, segment_size=4096, auto_compact=False)
+    b = SummarySegmentCache(segdir, segment_size=4096, auto_compact=False)
+    url = "https://example.com/a"
+    a.put(url, make_summary(url, html=HTML))
+    assert b.get(url) == make_summary(url, html=HTML)
+
+    # updated/deleted by another process, after this already read it
+    b.put(url, make_summary(url, title="new", html=HTML))
+    assert a.get(url) == make_summary(url, title="new", html=HTML)
+    b.delete(url)
+    assert a.get(url) is None
+    assert not a.has(url)
+
+    # appended to new segments
+    for i in range(10):
+        b.put(url, make_summary(url, title=str(i), html=HTML))
+    assert len(_segment_files(segdir)) > 1
+    got = a.get(url)
+    assert got is not None and got.metadata["title"] == "9"
+
+    b.compact()
+    b.put(url, make_summary(url, title="compacted", html=HTML))
+    got = a.get(url)
+    assert got is not None and got.metadata["title"] == "compacted"
+
+
+def test_torn_write(segdir: Path) -> None:
+    cache = SummarySegmentCache(segdir)
+    cache.put("https://example.com/a", make_summary("https://example.com/a", html=HTML))
+    seg = segdir / _segment_files(segdir)[-1]
+    size = seg.stat().st_size
+    # a record which was only partially written
+    with seg.open("ab") as f:
+        f.write(b"UCR1\x00\x10\x00")
+
+    reopened = SummarySegmentCache(segdir)
+    assert reopened.has("https://example.com/a")
+    # the partial record is truncated before writing the next one
+    reopened.put("https://example.com/b", make_summary("https://example.com/b", html=HTML))
+    assert SummarySegmentCache(segdir).has("https://example.com/b")
+    assert seg.stat().st_size > size
+
+
+def test_compact(segdir: Path) -> None:
+    cache = SummarySegmentCache(segdir, segment_size=4096, auto_compact=False)
+    urls = [f"https://example.com/{i}" for i in range(10)]
+    for i in range(5):
+        for url in urls:
+            cache.put(url, make_summary(url, title=str(i), html=HTML))
+    cache.delete(urls[0])
+    old_segments = _segment_files(segdir)
+    assert len(old_segments) > 1
+    assert cache.garbage_bytes > 0
+
+    before, after = cache.compact()
+    assert after < before / 4
+    assert cache.garbage_bytes == 0
+    assert not set(old_segments) & set(_segment_files(segdir))
+    assert cache.get(urls[0]) is None
+    for url in urls[1:]:
+        s = cache.get(url)
+        assert s is not None and s.metadata == {"title": "4"}
+
+    reopened = SummarySegmentCache(segdir)
+    assert sorted(reopened.urls()) == sorted(urls[1:])
+
+
+def test_background_compact(segdir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(url_cache.segment_cache, "COMPACT_MIN_BYTES", 0)
+    cache = SummarySegmentCache(segdir)
+    url = "https://example.com/a"
+    for i in range(3):
+        cache.put(url, make_summary(url, title=str(i), html=HTML))
+    assert cache._compactor is not None
+    cache._compactor.join()
+    assert cache.garbage_bytes == 0
+    s = cache.get(url)
+    assert s is not None and s.metadata == {"title": "2"}
+
+
+def test_segments_backend() -> None:
+    with tempfile.TemporaryDirectory() as d:
+        uc = FakeRequestCache(cache_dir=d, sleep_time=0, options={"backend": "segments"})
+        assert isinstance(uc.summary_cache, SummarySegmentCache)
+        uc.get("https://example.com/a")
+        assert uc.in_cache("https://example.com/a")
+        assert os.listdir(os.path.join(d, "data")) == []
+
+        runner = CliRunner()
+        res = runner.invoke(main, ["--cache-dir", d, "--backend", "segments", "compact"])
+        assert res.exit_code == 0, res.output
+        assert "Compacted segments" in res.output
+        res = runner.invoke(
+            main, ["--cache-dir", d, "--backend", "segments", "migrate", "--to", "sqlite"]
+        )
+        assert res.exit_code == 0, res.output
+        res = runner.invoke(main, ["--cache-dir", d, "--backend", "sqlite", "--offline", "export"])
+        assert res.exit_code == 0, res.output
+        assert [s["url"] for s in json.loads(res.output)] == ["https://example.com/a"]
@@ -0,0 +1,25 @@
+from requests.adapters import HTTPAdapter
+
+from url_cache.core import URLCache
+from url_cache.session import SessionConfig, build_session
+
+from .fixture import ucache
+
+
+def test_shared_session(ucache: URLCache) -> None:
+    # every extractor uses the same pooled session
+    for ext in ucache.extractors:
+        assert ext.session is ucache.session
+    assert ucache.session.scheduler is ucache.scheduler
+
+
+def test_session_config() -> None:
+    s = build_session(
+        config=SessionConfig(pool_maxsize=2, pool_block=True, timeout=5, keep_alive=False)
+    )
+    adapter = s.get_adapter("https://example.com")
+    assert isinstance(adapter, HTTPAdapter)
+    assert adapter._pool_maxsize == 2  # type: ignore[attr-defined]
+    assert adapter._pool_block is True  # type: ignore[attr-defined]
+    assert s.timeout == 5
+    assert s.headers["Connection"] == "close"
@@ -0,0 +1,128 @@
+import json
+import tempfile
+import threading
+from pathlib import Path
+from typing import Generator, List
+
+import pytest
+from click.testing import CliRunner
+
+from url_cache.model import Summary
+from url_cache.dir_cache import DirCacheMiss
+from url_cache.summary_cache import (
+    FileParser,
+    SummaryDirCache,
+    migrate,
+    _load_file_text,
+    _dump_file_text,
+)
+from url_cache.sqlite_cache import SummarySQLiteCache
+from url_cache.__main__ import main
+
+from .fixture import FakeRequestCache, make_summary
+
+# no loads/dumps functions, so goes through a temporary file
+SUBTITLES = FileParser(
+    name="subtitles", ext=".srt", load_func=_load_file_text, dump_func=_dump_file_text
+)
+
+
+@pytest.fixture()
+def db() -> Generator[SummarySQLiteCache, None, None]:  # type: ignore[misc]
+    with tempfile.TemporaryDirectory() as d:
+        yield SummarySQLiteCache(Path(d) / "cache.sqlite", file_parsers=[SUBTITLES])
+
+
+SRT = "1\n00:00:01,000 --> 00:00:02,000\nhi"
+
+
+def test_sqlite_cache(db: SummarySQLiteCache) -> None:
+    url = "https://example.com/a"
+    assert db.get(url) is None
+    assert not db.has(url)
+    with pytest.raises(DirCacheMiss):
+        db.put_attr(url, "html_summary", "<p>new</p>")
+
+    db.put(url, make_summary(url, data={"subtitles": SRT}))
+    assert db.has(url)
+    assert db.get(url) == make_summary(url, data={"subtitles": SRT})
+    assert not db.has_null_value(url)
+
+    db.put_attr(url, "html_summary", "<p>new</p>")
+    db.put_status(url, {"status_code": 404, "failures": 1})
+    s = db.get(url)
+    assert s is not None
+    assert s.html_summary == "<p>new</p>"
+    assert s.metadata == {"title": url}
+    assert db.has_null_value(url)
+
+    # an entry without any data
+    db.put("https://example.com/empty", Summary(url="https://example.com/empty"))
+    assert db.get("https://example.com/empty") == Summary(url="https://example.com/empty")
+
+    assert sorted(db.urls()) == [url, "https://example.com/empty"]
+    assert db.delete(url)
+    assert not db.delete(url)
+    assert db.get(url) is None
+
+
+def test_concurrent_readers(db: SummarySQLiteCache) -> None:
+    urls = [f"https://example.com/{i}" for i in range(50)]
+    db.put(urls[0], make_summary(urls[0], data={"subtitles": SRT}))
+    errors: List[BaseException] = []
+    done = threading.Event()
+
+    def _read() -> None:
+        try:
+            while not done.is_set():
+                s = db.get(urls[0])
+                assert s is not None and s.metadata == {"title": urls[0]}
+        except BaseException as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=_read) for _ in range(4)]
+    for th in readers:
+        th.start()
+    for url in urls:
+        db.put(url, make_summary(url, data={"subtitles": SRT}))
+    done.set()
+    for th in readers:
+        th.join()
+    assert errors == []
+    assert len(list(db.urls())) == len(urls)
+
+
+def test_migrate(db: SummarySQLiteCache) -> None:
+    urls = ["https://example.com/a", "https://example.com/b"]
+    with tempfile.TemporaryDirectory() as d:
+        dcache = SummaryDirCache(Path(d), file_parsers=[SUBTITLES])
+        for url in urls:
+            dcache.put(url, make_summary(url, data={"subtitles": SRT}))
+        assert migrate(dcache, db) == 2
+        for url in urls:
+            assert db.get(url) == make_summary(url, data={"subtitles": SRT})
+
+    with tempfile.TemporaryDirectory() as d:
+        dcache = SummaryDirCache(Path(d), file_parsers=[SUBTITLES])
+        assert migrate(db, dcache) == 2
+        for url in urls:
+            assert dcache.get(url) == make_summary(url, data={"subtitles": SRT})
+
+
+def test_backend_option() -> None:
+    with tempfile.TemporaryDirectory() as d:
+        uc = FakeRequestCache(cache_dir=d, sleep_time=0, options={"backend": "sqlite"})
+        assert isinstance(uc.summary_cache, SummarySQLiteCache)
+        uc.get("https://example.com/a")
+        assert uc.in_cache("https://example.com/a")
+        assert (Path(d) / "cache.sqlite").exists()
+        assert list((Path(d) / "data").iterdir()) == []
+        assert uc.get_cache_dir("https://example.com/a") is None
+
+        runner = CliRunner()
+        res = runner.invoke(main, ["--cache-dir", d, "--backend", "sqlite", "migrate", "--to", "dir"])
+        assert res.exit_code == 0, res.output
+        assert "Copied 1 URLs" in res.output
+        res = runner.invoke(main, ["--cache-dir", d, "--offline", "export"])
+        assert res.exit_code == 0, res.output
+        assert [s["url"] for s in json.loads(res.output)] == ["https://example.com/a"]
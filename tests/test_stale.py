@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+import pytest
+
+from url_cache.core import URLCache
+
+from .fixture import ucache, FakeRequestCache, pages, Page, PageServer, html_page
+
+
+@pytest.fixture()
+def server(pages: PageServer) -> str:
+    # returns the page once, and a 500 after that
+    pages.routes["/page"] = [Page(body=html_page()), Page(status=500, content_type=None)]
+    return pages.url + "/page"
+
+
+def test_stale_while_revalidate(ucache: URLCache) -> None:
+    fc = FakeRequestCache(
+        cache_dir=ucache._base_cache_dir,
+        sleep_time=0,
+        options={"stale_while_revalidate": True},
+    )
+    url = "https://example.com/page"
+    first = fc.get(url)
+    # so its possible to tell when its been refreshed
+    first.metadata = {"title": "old"}
+    fc.summary_cache.put(url, first)
+    assert len(fc.requested) == 1
+
+    fc.expiry_duration = timedelta(seconds=-1)
+    # returns the stale summary, refreshes in the background
+    assert fc.get(url).metadata == {"title": "old"}
+    assert fc._refresher is not None
+    fc._refresher.join()
+    assert len(fc.requested) == 2
+
+    # the refreshed summary was saved
+    cached = fc.summary_cache.get(url)
+    assert cached is not None
+    assert cached.metadata == {"title": url}
+
+
+def test_refresh_queue(ucache: URLCache) -> None:
+    fc = FakeRequestCache(
+        cache_dir=ucache._base_cache_dir,
+        sleep_time=0,
+        options={"stale_while_revalidate": True},
+        background_refresh=False,
+    )
+    urls = ["https://example.com/a", "https://example.com/b", "https://other.com/c"]
+    for url in urls:
+        fc.get(url)
+    fc.expiry_duration = timedelta(seconds=-1)
+    for url in urls + urls:
+        fc.get(url)
+    # saved to the queue instead of being requested
+    assert len(fc.requested) == 3
+    assert len(fc.refresh_queue) == 3
+
+    results = fc.refresh_queued()
+    assert sorted(r.url for r in results) == urls
+    assert all(r.error is None for r in results)
+    assert len(fc.requested) == 6
+    assert len(fc.refresh_queue) == 0
+    assert fc.refresh_queued() == []
+
+
+def test_failed_refresh_keeps_data(
+    ucache: URLCache, pages: PageServer, server: str
+) -> None:
+    summ = ucache.get(server)
+    assert summ.html_summary is not None
+
+    ucache.expiry_duration = timedelta(seconds=-1)
+    # the server errors now, the old data is kept
+    refreshed = ucache.get(server)
+    assert pages.hits["/page"] == 2
+    assert refreshed.html_summary == summ.html_summary
+    assert refreshed.metadata == summ.metadata
+
+    ucache.expiry_duration = None
+    assert ucache.get(server).html_summary == summ.html_summary
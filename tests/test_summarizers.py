@@ -0,0 +1,99 @@
+import pickle
+from typing import List
+
+import pytest
+
+from url_cache.core import URLCache
+from url_cache.exceptions import URLCacheException
+from url_cache.html_utils import (
+    AutoSummarizer,
+    LxmlTextSummarizer,
+    ReadabilitySummarizer,
+    get_summarizer,
+    summarize_html,
+)
+
+from .fixture import ucache
+
+PAGE = """<html><head><title>Title</title><style>p { color: red; }</style></head>
+<body>
+<nav><a href="/">Home</a> <a href="/about">About</a></nav>
+<script>var tracking = "nope";</script>
+<article><h1>Heading</h1><p>First   paragraph &amp; some
+text.</p><p>Second<br>line</p></article>
+<footer>Copyright</footer>
+</body></html>"""
+
+
+def test_lxml_text() -> None:
+    summary = LxmlTextSummarizer().summarize(PAGE)
+    assert summary.splitlines() == [
+        "<p>Heading</p>",
+        "<p>First paragraph &amp; some text.</p>",
+        "<p>Second</p>",
+        "<p>line</p>",
+    ]
+    for boilerplate in ["Home", "tracking", "color", "Copyright", "Title"]:
+        assert boilerplate not in summary
+
+
+def test_xml_declaration() -> None:
+    xhtml = '<?xml version="1.0" encoding="utf-8"?>\n' + PAGE
+    summary = LxmlTextSummarizer().summarize(xhtml)
+    assert summary == LxmlTextSummarizer().summarize(PAGE)
+    assert AutoSummarizer(threshold=0).summarize(xhtml) == summary
+
+
+def test_auto_threshold() -> None:
+    calls: List[str] = []
+
+    class _Recording(LxmlTextSummarizer):
+        def summarize(self, html_text: str) -> str:
+            calls.append("lxml_text")
+            return super().summarize(html_text)
+
+    auto = AutoSummarizer(threshold=len(PAGE) - 1)
+    auto.lxml_text = _Recording()
+    assert auto.summarize(PAGE).startswith("<p>Heading</p>")
+    assert calls == ["lxml_text"]
+
+    auto.threshold = len(PAGE)
+    assert "Second" in auto.summarize(PAGE)
+    assert calls == ["lxml_text"]
+
+
+def test_get_summarizer() -> None:
+    assert isinstance(get_summarizer("readability"), ReadabilitySummarizer)
+    # sent to worker processes by SummarizerPool
+    assert pickle.loads(pickle.dumps(get_summarizer("auto"))).name == "auto"
+    with pytest.raises(URLCacheException, match="Unknown summarizer"):
+        get_summarizer("nope")
+    with pytest.raises(URLCacheException, match="No html"):
+        summarize_html("  \n", "lxml_text")
+
+
+def test_summarizer_option(ucache: URLCache) -> None:
+    assert ucache.summarizer.name == "readability"
+    uc = URLCache(
+        cache_dir=ucache.cache_dir,
+        options={"summarizer": "lxml_text"},
+        summary_memo_size=0,
+    )
+    assert uc.summarizer.name == "lxml_text"
+    assert uc._summarize(PAGE).startswith("<p>Heading</p>")
+    with pytest.raises(URLCacheException):
+        URLCache(cache_dir=ucache.cache_dir, options={"summarizer": "nope"})
+
+
+def test_summarizer_fallback(ucache: URLCache, monkeypatch: pytest.MonkeyPatch) -> None:
+    def _fail(self: LxmlTextSummarizer, html_text: str) -> str:
+        raise ValueError("could not parse")
+
+    monkeypatch.setattr(LxmlTextSummarizer, "summarize", _fail)
+    uc = URLCache(
+        cache_dir=ucache.cache_dir,
+        options={"summarizer": "lxml_text"},
+        summary_memo_size=0,
+    )
+    # uses readability instead
+    assert uc._summarize(PAGE) == summarize_html(PAGE, "readability")
@@ -9,7 +9,7 @@ import pytest
 import vcr  # type: ignore[import]
 
 from url_cache.core import URLCache, Summary
-from url_cache.summary_cache import DirCache
+from url_cache.summary_cache import DirCache, SummaryDirCache
 from url_cache.sites.youtube.core import get_yt_video_id
 
 from .fixture import ucache, tests_dir
@@ -23,6 +23,11 @@ github_home = "https://github.com"
 image_file = "https://i.picsum.photos/id/1000/367/267.jpg?hmac=uO9iQNujyGpqk0Ieytv_xfwbpy3ENW4PhnIZ1gsnldI"
 
 
+def _dir_cache(ucache: URLCache) -> DirCache:
+    assert isinstance(ucache.summary_cache, SummaryDirCache)
+    return ucache.summary_cache.dir_cache
+
+
 @pytest.mark.skip(reason="pytube subtitles is broken, waiting on fix")
 @vcr.use_cassette(os.path.join(tests_dir, "vcr/youtube_subs.yaml"))  # type: ignore
 def test_youtube_has_subtitles(ucache: URLCache) -> None:
@@ -36,7 +41,7 @@ def test_youtube_has_subtitles(ucache: URLCache) -> None:
     assert "trade-off between space" in summ_resp.data["subtitles"]
 
     # make sure corresponding file exists
-    dcache = ucache.summary_cache.dir_cache
+    dcache = _dir_cache(ucache)
     assert isinstance(dcache, DirCache)
     dir_full_path = dcache.get(ucache.preprocess_url(youtube_with_cc))
     assert dir_full_path.endswith("data/2/c/7/6284b2f664f381372fab3276449b2/000")
@@ -67,7 +72,7 @@ def test_doesnt_have_subtitles(ucache: URLCache) -> None:
     # deleted for youtube by the site-specific extractor
     assert summ_resp.html_summary is None
     assert "subtitles" not in summ_resp.data
-    dir_full_path = ucache.summary_cache.dir_cache.get(
+    dir_full_path = _dir_cache(ucache).get(
         ucache.preprocess_url(youtube_without_cc)
     )
     assert not os.path.exists(os.path.join(dir_full_path, "data", "subtitles.srt"))
@@ -95,7 +100,7 @@ def test_skip_downloading_youtube_subtitles(ucache: URLCache) -> None:
     assert summ_resp.data is not None
     assert "subtitles" in summ_resp.data
     assert "coda radio" in summ_resp.data["subtitles"].casefold()
-    dir_full_path = ucache.summary_cache.dir_cache.get(youtube_with_cc_skip_subs)
+    dir_full_path = _dir_cache(ucache).get(youtube_with_cc_skip_subs)
 
     # delete, and check its deleted
     shutil.rmtree(dir_full_path)
@@ -138,7 +143,7 @@ def test_generic_url(ucache: URLCache) -> None:
     )
     assert summ_resp.metadata["url"].rstrip("/") == github_home.rstrip("/")
 
-    dir_full_path = ucache.summary_cache.dir_cache.get(github_home)
+    dir_full_path = _dir_cache(ucache).get(github_home)
     # make sure subtitles file doesn't exist for item which doesn't have subtitle
     assert not os.path.exists(os.path.join(dir_full_path, "data", "subtitles.srt"))
     assert os.path.exists(os.path.join(dir_full_path, "metadata.json"))
@@ -163,7 +168,7 @@ def test_image(ucache: URLCache) -> None:
     assert imgs[0]["src"].startswith("https://i.picsum.photos/id/")
 
     # make sure expected files exist/dont exist
-    dir_full_path = ucache.summary_cache.dir_cache.get(image_file)
+    dir_full_path = _dir_cache(ucache).get(image_file)
     assert not os.path.exists(os.path.join(dir_full_path, "summary_html.html"))
     assert os.path.exists(os.path.join(dir_full_path, "metadata.json"))
 
@@ -175,3 +180,13 @@ def test_read_from_cache(ucache: URLCache) -> None:
 
     # this should load from file instead
     ucache.get(github_home)
+
+
+def test_single_request(ucache: URLCache) -> None:
+    # the same GET response is used for metadata and the html summary
+    with vcr.use_cassette(os.path.join(tests_dir, "vcr/generic_url.yaml")) as cass:
+        summ_resp = ucache.get(github_home)
+        # previously lassie made a HEAD and a GET request
+        assert cass.play_count == 1
+    assert summ_resp.html_summary is not None
+    assert summ_resp.metadata["status_code"] == 200